@@ -0,0 +1,150 @@
+# 30天行动计划：只依赖画像和目录的纯函数，结果缓存后由页面、导出和接口共用
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+from experiments import rank_variants
+from scoring import profile_key, rank_niches, ranking_version
+
+# 缓存的计划数量上限（按利基和按画像分别计）
+PLAN_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class PlanWeek:
+    week: int
+    icon: str
+    title: str
+    goal: str
+    tasks: tuple
+    schedule: tuple
+
+
+@dataclass(frozen=True)
+class ActionPlan:
+    niche: str
+    weeks: tuple
+    score: float = None
+
+    def to_dict(self):
+        """导出用的结构化内容"""
+        return {
+            "niche": self.niche,
+            "weeks": [
+                {
+                    "week": week.week,
+                    "title": week.title,
+                    "goal": week.goal,
+                    "tasks": list(week.tasks),
+                    "schedule": list(week.schedule),
+                }
+                for week in self.weeks
+            ],
+        }
+
+
+def _source_text(source, **kwargs):
+    return source.format(**kwargs) if kwargs else source
+
+
+def build_action_plan(niche_name, niche_info, text=_source_text):
+    """根据利基的学习资源、工具推荐和启动步骤生成四周计划
+
+    text是语言包的 LocaleBundle.text，计划文字按中文原文查找译文，默认直接使用原文。
+    """
+    weeks = (
+        PlanWeek(
+            week=1, icon="📚", title=text("学习准备"), goal=text("掌握基础知识和技能"),
+            tasks=tuple(text("学习{resource}", resource=resource) for resource in niche_info["学习资源"]),
+            schedule=(text("工作日：1-2小时学习"), text("周末：3-4小时实践")),
+        ),
+        PlanWeek(
+            week=2, icon="🛠️", title=text("工具熟悉"), goal=text("熟悉相关工具和平台"),
+            tasks=tuple(text("注册并试用{tool}", tool=tool) for tool in niche_info["工具推荐"]),
+            schedule=(text("工作日：1小时工具学习"), text("周末：2-3小时深度体验")),
+        ),
+        PlanWeek(
+            week=3, icon="🚀", title=text("项目实践"), goal=text("完成第一个小项目"),
+            tasks=tuple(niche_info["启动步骤"]),
+            schedule=(text("工作日：2小时项目开发"), text("周末：4-5小时集中攻关")),
+        ),
+        PlanWeek(
+            week=4, icon="📊", title=text("市场验证"), goal=text("验证市场需求，获得反馈"),
+            tasks=tuple(text(task) for task in ("发布作品到相关平台", "收集用户反馈", "优化产品/服务", "制定下一步计划")),
+            schedule=(text("工作日：1小时反馈收集"), text("周末：3小时优化改进")),
+        ),
+    )
+    return ActionPlan(niche=niche_name, weeks=weeks)
+
+
+# 区分"没有缓存"和缓存了None（没有可行方向的画像）
+_MISSING = object()
+
+
+class _PlanCache:
+    """线程安全的LRU缓存，多个会话和导出线程共用；None也会缓存"""
+
+    def __init__(self, size=PLAN_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            plan = self._items.get(key, _MISSING)
+            if plan is not _MISSING:
+                self._items.move_to_end(key)
+                return plan
+        # 计划生成很快，重复生成一次也无妨，不在锁内构建
+        plan = build()
+        with self._lock:
+            self._items[key] = plan
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return plan
+
+
+_niche_plans = _PlanCache()
+_profile_plans = _PlanCache()
+
+
+def plan_for_niche(niche_name, catalog, bundle=None):
+    """某个利基的行动计划，按利基内容指纹和语言缓存，目录更新时只有改动过的利基重新生成
+
+    bundle是展示用的语言包，计划文字和来自利基数据的任务都换成译文；导出和接口不传，使用中文原文。
+    """
+    if bundle is None:
+        return _niche_plans.get_or_build(
+            (niche_name, catalog.fingerprints[niche_name]),
+            lambda: build_action_plan(niche_name, catalog.niches[niche_name]),
+        )
+    return _niche_plans.get_or_build(
+        (niche_name, catalog.fingerprints[niche_name], bundle.locale),
+        lambda: build_action_plan(niche_name, bundle.niche(niche_name, catalog.niches[niche_name]), bundle.text),
+    )
+
+
+def localize_plan(plan, catalog, bundle):
+    """把缓存的行动计划换成语言包的展示文字，匹配度保持不变"""
+    return replace(plan_for_niche(plan.niche, catalog, bundle), score=plan.score)
+
+
+def action_plan_for(user_profile, catalog=None, variant=None):
+    """用户最佳推荐方向的行动计划（含匹配度），按画像哈希、排名版本（目录和协同过滤因子）
+    和实验变体缓存；没有满足硬性条件的方向时返回None"""
+    if catalog is None:
+        from refresh import get_snapshot
+        catalog = get_snapshot().catalog
+
+    def build():
+        if variant is None:
+            ranked = rank_niches(user_profile, catalog)
+        else:
+            ranked = rank_variants(user_profile, catalog, (variant,))[variant.name]
+        if not ranked:
+            return None
+        best_niche_name, best_score = ranked[0]
+        return replace(plan_for_niche(best_niche_name, catalog), score=best_score)
+
+    key = (ranking_version(catalog), profile_key(user_profile))
+    return _profile_plans.get_or_build(key if variant is None else key + (variant,), build)
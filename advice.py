@@ -0,0 +1,247 @@
+# 大模型生成的个性化建议：异步请求、流式输出、磁盘缓存
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+
+from catalog import niche_fingerprint
+from locales import DEFAULT_LOCALE, get_bundle
+from outbound import get_gateway
+from scoring import PROFILE_FIELDS, profile_key
+
+logger = logging.getLogger(__name__)
+
+# 提示词有改动时递增，旧缓存自动失效
+PROMPT_VERSION = "advice-v2"
+
+ADVICE_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+ADVICE_CACHE_DIR = os.getenv("ADVICE_CACHE_DIR", os.path.join(".cache", "advice"))
+ADVICE_TIMEOUT = float(os.getenv("ADVICE_TIMEOUT_SECONDS", "60"))
+
+# 大模型服务商的配额（每秒请求数和并发数）
+OPENAI_RATE = float(os.getenv("OPENAI_RATE_PER_SEC", "3"))
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "6"))
+
+_DONE = object()
+
+
+def fallback_advice(score):
+    """无法调用大模型时使用的固定建议，返回(级别, 文案)，文案是中文原文，展示时按语言包翻译"""
+    if score >= 80:
+        return "success", "🎉 这是一个非常适合你的方向！建议优先考虑。"
+    elif score >= 60:
+        return "info", "👍 这是一个不错的选择，需要一些技能提升。"
+    return "warning", "⚠️ 这个方向需要较多准备，建议先学习相关技能。"
+
+
+def advice_enabled():
+    """配置了API密钥或本地兼容服务地址时才启用生成"""
+    return bool(os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_BASE_URL"))
+
+
+# 各语言的系统提示和用户提示模板，回答使用界面语言
+_PROMPTS = {
+    "zh-CN": (
+        "你是一名帮助AI副业新手做规划的职业顾问，回答务实、具体。",
+        "用户画像：\n{profile}\n\n"
+        "推荐方向：{niche}（匹配度 {score}%）\n"
+        "方向描述：{description}\n"
+        "所需技能：{skills}\n"
+        "缺少的技能：{missing}\n\n"
+        "请用中文给出3条针对该用户的具体建议，并说明每项缺少的技能为什么重要、"
+        "如何在30天内补上。总字数控制在200字以内。",
+        "无",
+    ),
+    "en": (
+        "You are a career advisor helping beginners plan an AI side business. Be practical and specific.",
+        "User profile:\n{profile}\n\n"
+        "Recommended niche: {niche} ({score}% match)\n"
+        "Description: {description}\n"
+        "Required skills: {skills}\n"
+        "Missing skills: {missing}\n\n"
+        "Reply in English with 3 specific suggestions for this user, explaining why each missing skill matters "
+        "and how to pick it up within 30 days. Keep the whole answer under 150 words.",
+        "none",
+    ),
+}
+
+
+def build_messages(user_profile, niche_name, niche_info, score, locale=DEFAULT_LOCALE):
+    """构造单个利基方向的对话消息，画像、方向内容和要求的回答语言都按locale给出"""
+    bundle = get_bundle(locale)
+    system, template, nothing = _PROMPTS.get(bundle.locale, _PROMPTS[DEFAULT_LOCALE])
+    shown = bundle.niche(niche_name, niche_info)
+    required = [bundle.text(skill) for skill in shown["技能要求"]]
+    skills = user_profile.get("skills", [])
+    # 是否缺少按原文比较，展示用译文
+    missing = [label for skill, label in zip(niche_info["技能要求"], required) if skill not in skills]
+
+    def value_text(value):
+        if isinstance(value, list):
+            return ", ".join(bundle.text(item) for item in value)
+        return bundle.text(value) if isinstance(value, str) else value
+
+    profile_text = "\n".join(
+        f"- {field}: {value_text(user_profile.get(field))}" for field in PROFILE_FIELDS
+    )
+    prompt = template.format(
+        profile=profile_text,
+        niche=bundle.niche_name(niche_name),
+        score=score,
+        description=shown["description"],
+        skills=", ".join(required),
+        missing=", ".join(missing) or nothing,
+    )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+
+
+class AdviceCache:
+    """按画像、方向内容、语言和提示词版本存放生成结果的磁盘缓存"""
+
+    def __init__(self, directory=ADVICE_CACHE_DIR):
+        self.directory = directory
+
+    def key(self, user_profile, niche_name, niche_info, locale=DEFAULT_LOCALE):
+        # 方向内容的指纹参与缓存键，目录中修改过的方向自动重新生成；不同语言的建议分开存放
+        raw = "|".join([
+            profile_key(user_profile), niche_name, niche_fingerprint(niche_info), get_bundle(locale).locale,
+            PROMPT_VERSION, ADVICE_MODEL,
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["text"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, text):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text, "prompt_version": PROMPT_VERSION}, f, ensure_ascii=False)
+        # 先写临时文件再替换，并发写入时读者不会看到半个文件
+        os.replace(tmp_path, path)
+
+
+class AdviceGenerator:
+    """通过外部调用网关并发请求大模型，并把输出转成同步的流
+
+    相同画像、相同方向的并发请求只发出一次，后到的会话直接拿完整结果。
+    """
+
+    def __init__(self, cache=None, client=None, gateway=None):
+        self.cache = cache or AdviceCache()
+        self.gateway = gateway or get_gateway()
+        self.gateway.configure("openai", rate=OPENAI_RATE, concurrency=OPENAI_CONCURRENCY)
+        self._client = client
+
+    @property
+    def client(self):
+        # 在网关事件循环中首次创建，客户端绑定到该循环
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY", "not-needed"),
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                timeout=ADVICE_TIMEOUT,
+            )
+        return self._client
+
+    async def _complete(self, messages, on_token):
+        stream = await self.client.chat.completions.create(
+            model=ADVICE_MODEL,
+            messages=messages,
+            stream=True,
+        )
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                on_token(token)
+        return "".join(parts)
+
+    async def _generate(self, key, messages, tokens):
+        try:
+            text = await self._complete(messages, tokens.put)
+            self.cache.put(key, text)
+            return text
+        except Exception as exc:
+            logger.warning("生成个性化建议失败: %s", exc)
+            raise
+        finally:
+            tokens.put(_DONE)
+
+    def _drain(self, tokens, future, fallback):
+        received = False
+        while True:
+            try:
+                item = tokens.get(timeout=ADVICE_TIMEOUT)
+            except queue.Empty:
+                item = _DONE
+            if item is _DONE:
+                break
+            received = True
+            yield item
+        if not received and (not future.done() or future.exception() is not None):
+            yield fallback
+
+    def _wait(self, future, fallback):
+        try:
+            yield future.result(ADVICE_TIMEOUT)
+        except Exception:
+            yield fallback
+
+    def stream_batch(self, user_profile, recommendations, bundle=None):
+        """同时发出多个方向的请求，返回与输入顺序一致的token流列表
+
+        recommendations中每项包含 利基市场、匹配度 和 info（利基数据）。
+        命中缓存的方向直接返回完整文本；bundle是界面语言的语言包，决定建议和固定建议的语言。
+        """
+        bundle = bundle or get_bundle()
+        streams = []
+        for rec in recommendations:
+            key = self.cache.key(user_profile, rec["利基市场"], rec["info"], bundle.locale)
+            fallback = bundle.text(fallback_advice(rec["匹配度"])[1])
+            cached = self.cache.get(key)
+            if cached is not None:
+                streams.append(iter([cached]))
+                continue
+            messages = build_messages(user_profile, rec["利基市场"], rec["info"], rec["匹配度"], bundle.locale)
+            tokens = queue.Queue()
+            future, leader = self.gateway.submit(
+                ("advice", key),
+                lambda key=key, messages=messages, tokens=tokens: self._generate(key, messages, tokens),
+                limit_key="openai",
+            )
+            if leader:
+                streams.append(self._drain(tokens, future, fallback))
+            else:
+                streams.append(self._wait(future, fallback))
+        return streams
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_advice_generator():
+    """进程内共享的建议生成器"""
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = AdviceGenerator()
+        return _generator
@@ -18,17 +18,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# 顶部静态HTML导航栏
-st.markdown('''<div style="text-align:center;margin-bottom:1rem;">
-    <a href="#" onclick="window.location.reload()" style="margin:0 10px;font-weight:bold;">🏠 首页</a>
-    <a href="#" onclick="window.location.hash='个人评估'" style="margin:0 10px;">📊 个人评估</a>
-    <a href="#" onclick="window.location.hash='利基分析'" style="margin:0 10px;">🎯 利基分析</a>
-    <a href="#" onclick="window.location.hash='市场趋势'" style="margin:0 10px;">📈 市场趋势</a>
-    <a href="#" onclick="window.location.hash='个性化推荐'" style="margin:0 10px;">💡 个性化推荐</a>
-    <a href="#" onclick="window.location.hash='行动计划'" style="margin:0 10px;">📋 行动计划</a>
-    <a href="#" onclick="window.location.hash='学习资源'" style="margin:0 10px;">📚 学习资源</a>
-</div>''', unsafe_allow_html=True)
-
 # 自定义CSS样式
 st.markdown("""
 <style>
@@ -71,56 +60,48 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# 顶部静态HTML导航栏的页面和图标，链接的锚点保持中文原文
+NAV_LINKS = [
+    ("🏠", "首页"), ("📊", "个人评估"), ("🎯", "利基分析"), ("📈", "市场趋势"),
+    ("💡", "个性化推荐"), ("📋", "行动计划"), ("📚", "学习资源"),
+]
+
 # 导入数据模块
-from data import AI_NICHES
+from refresh import start_scheduler
+from scoring import rank_with_breakdown
+from cohorts import get_cohort_recorder
+from event_log import get_event_log, new_event_id
+from tenants import current_catalog
+from constraints import CONSTRAINTS
+from locales import DEFAULT_LOCALE, LOCALES
 
-def calculate_compatibility_score(user_profile, niche):
-    """计算用户与利基市场的匹配度"""
-    score = 0
-    max_score = 100
-    
-    # 技能匹配度 (40分)
-    skill_match = 0
-    for skill in niche["技能要求"]:
-        if skill in user_profile.get("skills", []):
-            skill_match += 1
-    score += (skill_match / len(niche["技能要求"])) * 40
-    
-    # 时间投入匹配度 (20分)
-    time_preference = user_profile.get("time_availability", "中等")
-    time_scores = {"低": 1, "中等": 2, "高": 3}
-    niche_time = time_scores.get(niche["时间投入"], 2)
-    user_time = time_scores.get(time_preference, 2)
-    time_match = 1 - abs(niche_time - user_time) / 2
-    score += time_match * 20
-    
-    # 投资能力匹配度 (20分)
-    investment_preference = user_profile.get("investment_capacity", "中等")
-    investment_scores = {"低": 1, "中等": 2, "高": 3}
-    niche_investment = investment_scores.get(niche["投资成本"], 2)
-    user_investment = investment_scores.get(investment_preference, 2)
-    investment_match = 1 - abs(niche_investment - user_investment) / 2
-    score += investment_match * 20
+def main():
+    # 后台刷新线程在进程内只启动一次
+    start_scheduler()
     
-    # 兴趣匹配度 (20分)
-    interest_match = 0
-    for interest in user_profile.get("interests", []):
-        if interest in niche["适合人群"] or interest in niche["description"]:
-            interest_match += 1
-    score += min(interest_match * 10, 20)
+    # 界面语言：链接中的lang参数作为初始值；选项值始终是中文原文，只翻译显示，
+    # 导航菜单有固定的key，切换语言时标签变化不会把页面重置回首页
+    if "locale" not in st.session_state:
+        lang = st.query_params.get("lang")
+        st.session_state.locale = lang if lang in LOCALES else DEFAULT_LOCALE
+    # 轻量模式：链接带 ?lite=1 时默认打开，图表改用服务端渲染的静态SVG，适合手机和慢速网络
+    if "lite_mode" not in st.session_state:
+        st.session_state.lite_mode = st.query_params.get("lite") == "1"
     
-    return round(score, 1)
-
-def main():
-    st.markdown('<h1 class="main-header">🤖 AI副业利基市场确定工具</h1>', unsafe_allow_html=True)
-    st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">帮助小白找到最适合的AI副业方向</p>', unsafe_allow_html=True)
+    show_top_nav()
+    st.markdown(f'<h1 class="main-header">{tr("🤖 AI副业利基市场确定工具")}</h1>', unsafe_allow_html=True)
+    st.markdown(f'<p style="text-align: center; font-size: 1.2rem; color: #666;">{tr("帮助小白找到最适合的AI副业方向")}</p>', unsafe_allow_html=True)
     
     # 侧边栏导航菜单
-    st.sidebar.title("导航菜单")
+    st.sidebar.title(tr("导航菜单"))
     page = st.sidebar.selectbox(
-        "选择功能",
-        ["首页", "个人评估", "利基分析", "市场趋势", "个性化推荐", "行动计划", "学习资源"]
+        tr("选择功能"),
+        ["首页", "个人评估", "利基分析", "市场趋势", "个性化推荐", "行动计划", "学习资源", "人群分析"],
+        format_func=locale_bundle().text,
+        key="page"
     )
+    st.sidebar.selectbox("🌐 语言 / Language", list(LOCALES), format_func=LOCALES.get, key="locale")
+    st.sidebar.toggle(tr("📱 轻量模式"), key="lite_mode", help=tr("图表显示为静态图片，加载更快、流量更少"))
     
     # 页面路由
     if page == "首页":
@@ -137,109 +118,118 @@ def main():
         show_action_plan()
     elif page == "学习资源":
         show_learning_resources()
+    elif page == "人群分析":
+        show_cohort_analytics()
+
+def show_top_nav():
+    # 第一项是首页，点击时重新加载页面
+    links = [
+        f'''<a href="#" onclick="window.location.reload()" style="margin:0 10px;font-weight:bold;">{icon} {tr(page)}</a>'''
+        if page == "首页" else
+        f'''<a href="#" onclick="window.location.hash='{page}'" style="margin:0 10px;">{icon} {tr(page)}</a>'''
+        for icon, page in NAV_LINKS
+    ]
+    st.markdown(f'<div style="text-align:center;margin-bottom:1rem;">{"".join(links)}</div>', unsafe_allow_html=True)
 
 def show_homepage():
-    st.markdown('<h2 class="sub-header">欢迎使用AI副业利基市场确定工具</h2>', unsafe_allow_html=True)
+    st.markdown(f'<h2 class="sub-header">{tr("欢迎使用AI副业利基市场确定工具")}</h2>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("""
-        <div class="card">
-            <h3>🎯 工具功能</h3>
-            <ul>
-                <li>个人能力与兴趣评估</li>
-                <li>AI副业机会分析</li>
-                <li>市场需求趋势分析</li>
-                <li>个性化推荐系统</li>
-                <li>详细行动计划制定</li>
-                <li>学习资源推荐</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(card_html(tr("🎯 工具功能"), [
+            tr("个人能力与兴趣评估"), tr("AI副业机会分析"), tr("市场需求趋势分析"),
+            tr("个性化推荐系统"), tr("详细行动计划制定"), tr("学习资源推荐"),
+        ], heading="h3"), unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
-        <div class="card">
-            <h3>🚀 使用步骤</h3>
-            <ol>
-                <li>完成个人评估问卷</li>
-                <li>查看利基市场分析</li>
-                <li>了解市场趋势</li>
-                <li>获得个性化推荐</li>
-                <li>制定行动计划</li>
-                <li>开始学习实践</li>
-            </ol>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(card_html(tr("🚀 使用步骤"), [
+            tr("完成个人评估问卷"), tr("查看利基市场分析"), tr("了解市场趋势"),
+            tr("获得个性化推荐"), tr("制定行动计划"), tr("开始学习实践"),
+        ], heading="h3", ordered=True), unsafe_allow_html=True)
     
-    st.markdown("""
+    st.markdown(f"""
     <div class="highlight">
-        <h3>💡 为什么选择AI副业？</h3>
-        <p>AI技术正在改变各行各业，为普通人创造了大量副业机会。无论是内容创作、应用开发、还是咨询服务，AI都能帮助你提高效率、降低成本、创造价值。</p>
+        <h3>{tr("💡 为什么选择AI副业？")}</h3>
+        <p>{tr("AI技术正在改变各行各业，为普通人创造了大量副业机会。无论是内容创作、应用开发、还是咨询服务，AI都能帮助你提高效率、降低成本、创造价值。")}</p>
     </div>
     """, unsafe_allow_html=True)
     
     # 快速开始按钮
-    if st.button("🚀 开始我的AI副业之旅", type="primary", use_container_width=True):
-        st.info("请在左侧菜单选择‘个人评估’开始你的AI副业探索之旅。")
+    if st.button(tr("🚀 开始我的AI副业之旅"), type="primary", use_container_width=True):
+        st.info(tr("请在左侧菜单选择‘个人评估’开始你的AI副业探索之旅。"))
 
 def show_assessment():
-    st.markdown('<h2 class="sub-header">📊 个人能力与兴趣评估</h2>', unsafe_allow_html=True)
+    st.markdown(f'<h2 class="sub-header">{tr("📊 个人能力与兴趣评估")}</h2>', unsafe_allow_html=True)
     
     if "user_profile" not in st.session_state:
         st.session_state.user_profile = {}
     
+    # 选项值保持中文原文（评分和统计使用），format_func只翻译显示
+    option_text = locale_bundle().text
     with st.form("assessment_form"):
-        st.markdown("### 基本信息")
+        st.markdown(tr("### 基本信息"))
         
         col1, col2 = st.columns(2)
         with col1:
-            name = st.text_input("姓名（可选）")
-            age = st.selectbox("年龄段", ["18-25岁", "26-35岁", "36-45岁", "46岁以上"])
-            education = st.selectbox("教育背景", ["高中", "大专", "本科", "硕士", "博士"])
+            name = st.text_input(tr("姓名（可选）"))
+            age = st.selectbox(tr("年龄段"), ["18-25岁", "26-35岁", "36-45岁", "46岁以上"], format_func=option_text)
+            education = st.selectbox(tr("教育背景"), ["高中", "大专", "本科", "硕士", "博士"], format_func=option_text)
         
         with col2:
-            occupation = st.text_input("当前职业")
-            experience_years = st.selectbox("工作经验", ["无经验", "1-3年", "4-6年", "7-10年", "10年以上"])
-            available_time = st.selectbox("每周可用于副业的时间", ["5小时以下", "5-10小时", "10-20小时", "20小时以上"])
+            occupation = st.text_input(tr("当前职业"))
+            experience_years = st.selectbox(tr("工作经验"), ["无经验", "1-3年", "4-6年", "7-10年", "10年以上"], format_func=option_text)
+            available_time = st.selectbox(tr("每周可用于副业的时间"), ["5小时以下", "5-10小时", "10-20小时", "20小时以上"], format_func=option_text)
         
-        st.markdown("### 技能评估")
-        st.markdown("请选择你具备的技能（可多选）：")
+        st.markdown(tr("### 技能评估"))
+        st.markdown(tr("请选择你具备的技能（可多选）："))
         
         skills = st.multiselect(
-            "技能选择",
+            tr("技能选择"),
             ["编程基础", "写作能力", "设计能力", "营销能力", "项目管理", "数据分析", 
              "沟通能力", "创意思维", "学习能力", "时间管理", "客户服务", "销售能力"],
-            default=[]
+            default=[],
+            format_func=option_text
         )
         
-        st.markdown("### 兴趣偏好")
+        st.markdown(tr("### 兴趣偏好"))
         interests = st.multiselect(
-            "感兴趣的领域",
+            tr("感兴趣的领域"),
             ["技术开发", "内容创作", "教育培训", "咨询服务", "销售推广", "数据分析", 
              "创意设计", "写作编辑", "视频制作", "音频制作", "游戏开发", "电商运营"],
-            default=[]
+            default=[],
+            format_func=option_text
         )
         
-        st.markdown("### 投资能力")
+        st.markdown(tr("### 投资能力"))
         investment = st.selectbox(
-            "可用于副业的投资金额",
-            ["1000元以下", "1000-5000元", "5000-20000元", "20000元以上"]
+            tr("可用于副业的投资金额"),
+            ["1000元以下", "1000-5000元", "5000-20000元", "20000元以上"],
+            format_func=option_text
         )
         
-        st.markdown("### 目标期望")
+        st.markdown(tr("### 目标期望"))
         income_goal = st.selectbox(
-            "副业收入目标",
-            ["每月1000元以下", "每月1000-3000元", "每月3000-8000元", "每月8000元以上"]
+            tr("副业收入目标"),
+            ["每月1000元以下", "每月1000-3000元", "每月3000-8000元", "每月8000元以上"],
+            format_func=option_text
         )
         
         risk_tolerance = st.selectbox(
-            "风险承受能力",
-            ["保守型", "稳健型", "积极型", "激进型"]
+            tr("风险承受能力"),
+            ["保守型", "稳健型", "积极型", "激进型"],
+            format_func=option_text
+        )
+        
+        hard_constraints = st.multiselect(
+            tr("硬性条件（可选）"),
+            list(CONSTRAINTS),
+            default=[],
+            format_func=lambda name: option_text(CONSTRAINTS[name]),
+            help=tr("不满足勾选条件的方向不会出现在推荐中")
         )
         
-        submitted = st.form_submit_button("提交评估", type="primary")
+        submitted = st.form_submit_button(tr("提交评估"), type="primary")
         
         if submitted:
             st.session_state.user_profile = {
@@ -254,10 +244,33 @@ def show_assessment():
                 "investment_capacity": investment,
                 "income_goal": income_goal,
                 "risk_tolerance": risk_tolerance,
+                "hard_constraints": hard_constraints,
                 "assessment_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
-            st.success("✅ 评估完成！请查看个性化推荐。")
+            user_profile = st.session_state.user_profile
+            catalog = current_catalog(st.query_params.get("tenant"))
+            ranked = rank_with_breakdown(user_profile, catalog)
+            # 最佳方向与推荐页展示的第一名相同（实验变体和多样化重排之后）
+            served, _ = served_ranking(user_profile, catalog, st.session_state.get("diversify", True))
+            top = {"niche": served[0][0], "score": served[0][1]} if served else None
+            
+            # 提交和推荐结果写入事件日志（只入队，不等待写盘）
+            assessment_id = new_event_id()
+            events = get_event_log()
+            events.append("assessment_submitted", {"assessment_id": assessment_id, "profile": user_profile})
+            events.append("recommendations", {
+                "assessment_id": assessment_id,
+                "catalog_version": catalog.version,
+                "results": ranked,
+                "top": top,
+            })
+            
+            # 人群分析的聚合统计在后台线程中增量更新；没有满足硬性条件的方向时不计入
+            if top is not None:
+                get_cohort_recorder().record(user_profile, top["niche"], top["score"])
+            
+            st.success(tr("✅ 评估完成！请查看个性化推荐。"))
             st.balloons()
 
 # 导入其他页面函数
@@ -266,7 +279,12 @@ from pages import (
     show_market_trends, 
     show_personalized_recommendations,
     show_action_plan, 
-    show_learning_resources
+    show_learning_resources,
+    show_cohort_analytics,
+    served_ranking,
+    card_html,
+    locale_bundle,
+    tr
 )
 
 # 测试推送
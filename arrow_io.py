@@ -0,0 +1,126 @@
+# 批量评分结果的Arrow列式输出（IPC文件和IPC流）
+#
+# 用法：
+#   python arrow_io.py profiles.jsonl results.arrow --top-k 3
+import argparse
+import json
+
+import numpy as np
+import pyarrow as pa
+
+from scoring import SCORE_WEIGHTS, micro_batches, score_feasible_batch, top_k_rows
+
+# 每个record batch包含的画像数
+ARROW_BATCH_PROFILES = 4096
+
+SCORE_SCHEMA = pa.schema([
+    pa.field("profile_id", pa.string(), nullable=False),
+    pa.field("niche_id", pa.int32(), nullable=False),
+    pa.field("niche", pa.string(), nullable=False),
+    pa.field("rank", pa.int16(), nullable=False),
+    pa.field("score", pa.float64(), nullable=False),
+] + [
+    pa.field(f"{component}_score", pa.float64(), nullable=False) for component in SCORE_WEIGHTS
+], metadata={"score_weights": json.dumps(SCORE_WEIGHTS)})
+
+# IPC流的结束标记
+IPC_STREAM_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def _profile_id(profile, position):
+    profile_id = profile.get("id", profile.get("profile_id"))
+    return str(position if profile_id is None else profile_id)
+
+
+def score_record_batch(profiles, catalog, top_k=None, start=0):
+    """把一组画像的评分结果转成一个RecordBatch（每行是一个画像×利基）
+
+    没有id字段的画像用 start 起的序号作为profile_id。
+    """
+    if not profiles:
+        return pa.RecordBatch.from_pylist([], schema=SCORE_SCHEMA)
+
+    keep = len(catalog.names) if top_k is None else min(top_k, len(catalog.names))
+    breakdown, totals, columns, feasible = score_feasible_batch(profiles, catalog)
+    keep = min(keep, totals.shape[1])
+    # 与页面一致：按一位小数的匹配度排序，相同分数保持目录顺序
+    rows = top_k_rows(totals, keep)
+    # 不满足硬性条件的利基排在每个画像的最后，去掉后名次仍从1连续编号
+    kept = None if feasible is None else np.take_along_axis(feasible, rows, axis=1).ravel()
+
+    def select(values):
+        return values if kept is None else values[kept]
+
+    def column(component):
+        return select(np.take_along_axis(breakdown[component], rows, axis=1).ravel())
+
+    niche_ids = select((rows if columns is None else columns[rows]).ravel().astype(np.int32))
+    profile_ids = [_profile_id(profile, position) for position, profile in enumerate(profiles, start)]
+    arrays = [
+        pa.array(select(np.repeat(np.array(profile_ids, dtype=object), keep)), type=pa.string()),
+        pa.array(niche_ids),
+        pa.array(np.array(catalog.names, dtype=object)[niche_ids], type=pa.string()),
+        pa.array(select(np.tile(np.arange(1, keep + 1, dtype=np.int16), len(profiles)))),
+        pa.array(np.round(column("total"), 1)),
+    ] + [pa.array(column(component)) for component in SCORE_WEIGHTS]
+    return pa.RecordBatch.from_arrays(arrays, schema=SCORE_SCHEMA)
+
+
+def iter_record_batches(profiles, catalog, top_k=None, batch_profiles=ARROW_BATCH_PROFILES):
+    """逐批评分，任意可迭代的画像输入都只占用一个批次的内存"""
+    start = 0
+    for batch in micro_batches(profiles, batch_profiles):
+        yield score_record_batch(batch, catalog, top_k, start)
+        start += len(batch)
+
+
+def serialize_schema():
+    """IPC流开头的schema消息"""
+    return SCORE_SCHEMA.serialize().to_pybytes()
+
+
+def serialize_batch(batch):
+    """单个RecordBatch的IPC消息，拼在schema消息之后即构成合法的IPC流"""
+    return batch.serialize().to_pybytes()
+
+
+def ipc_stream_chunks(batches):
+    """生成IPC流的字节块，可直接作为HTTP分块响应写出"""
+    yield serialize_schema()
+    for batch in batches:
+        yield serialize_batch(batch)
+    yield IPC_STREAM_EOS
+
+
+def write_ipc_file(path, batches):
+    """把record batch逐个写入Arrow IPC文件（随机访问格式），返回写入的行数"""
+    rows = 0
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, SCORE_SCHEMA) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量评分并输出Arrow IPC文件")
+    parser.add_argument("profiles", help="每行一个用户画像的JSONL文件")
+    parser.add_argument("output", help="输出的.arrow文件")
+    parser.add_argument("--top-k", type=int, default=None, help="每个画像只保留前k个利基")
+    args = parser.parse_args()
+
+    from refresh import build_snapshot
+    catalog = build_snapshot(version=1).catalog
+    rows = write_ipc_file(args.output, iter_record_batches(_read_jsonl(args.profiles), catalog, args.top_k))
+    print(f"已写入 {rows} 行到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# 评分权重的离线校准：用带结果标签的历史评估，批量评估大量权重组合的排序效果
+#
+# 用法：
+#   python calibrate.py labeled.jsonl --search grid --step 5
+#   python calibrate.py labeled.jsonl --search random --samples 5000 --seed 7
+#
+# 输入每行是一个用户画像，另有一个字段记录用户实际选择（或做成）的利基方向，默认字段名为 chosen_niche。
+import argparse
+import itertools
+
+import numpy as np
+
+from export import iter_jsonl
+from scoring import SCORE_WEIGHTS, micro_batches, score_breakdown_batch
+
+COMPONENTS = list(SCORE_WEIGHTS)
+
+# 每次广播计算的元素上限（画像 × 利基 × 权重组合），控制临时数组的内存
+BLOCK_ELEMENTS = 1 << 24
+
+# 与标签方向得分相差不超过该值视为同分，同分按目录顺序排在前面的算更靠前（与页面一致）
+TIE_TOLERANCE = 1e-9
+
+
+def unit_components(profiles, catalog):
+    """各部分得分除以满分，形状为 (画像数, 利基数, 部分数)"""
+    breakdown = score_breakdown_batch(profiles, catalog)
+    return np.stack(
+        [breakdown[component] / SCORE_WEIGHTS[component] for component in COMPONENTS], axis=-1
+    ).astype(np.float32)
+
+
+def load_calibration_set(records, catalog, label_field="chosen_niche", batch_size=4096):
+    """把带标签的评估转成校准所需的数组，返回 (差值, 排在前面的掩码, 跳过的记录数)
+
+    差值是每个利基与标签利基各部分得分之差，任何权重下的分差都是它与权重的点积，
+    所以画像只需评分一次，之后评估多少组权重都不用重新评分。
+    """
+    deltas, before, skipped = [], [], 0
+    rows = {name: row for row, name in enumerate(catalog.names)}
+    columns = np.arange(len(catalog.names))
+    for batch in micro_batches(records, batch_size):
+        labels = [rows.get(record.get(label_field)) for record in batch]
+        kept = [record for record, label in zip(batch, labels) if label is not None]
+        skipped += len(batch) - len(kept)
+        if not kept:
+            continue
+        labels = np.array([label for label in labels if label is not None])
+        units = unit_components(kept, catalog)
+        deltas.append(units - units[np.arange(len(kept)), labels][:, None, :])
+        before.append(columns[None, :] < labels[:, None])
+
+    if not deltas:
+        shape = (0, len(catalog.names))
+        return np.zeros(shape + (len(COMPONENTS),), dtype=np.float32), np.zeros(shape, dtype=bool), skipped
+    return np.concatenate(deltas), np.concatenate(before), skipped
+
+
+def evaluate_weights(weights, deltas, before, k=3, block_elements=BLOCK_ELEMENTS):
+    """一次评估多组权重，weights形状为 (组数, 部分数)
+
+    返回 {"hit@k": 数组, "ndcg": 数组, "mrr": 数组}，每个数组长度等于权重组数。
+    画像 × 利基 × 权重按块广播计算，没有逐画像、逐权重的Python循环。
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    profiles, niches = before.shape
+    hits = np.zeros(len(weights))
+    gains = np.zeros(len(weights))
+    reciprocal = np.zeros(len(weights))
+    # 只有一个相关方向时，NDCG就是标签所在名次的折损
+    discount = 1 / np.log2(np.arange(niches) + 2)
+    reciprocals = 1 / np.arange(1, niches + 1)
+
+    # 排在标签之前的利基同分也算领先，比较阈值预先按位置取正负容差，只需比较一次
+    thresholds = np.where(before, -TIE_TOLERANCE, TIE_TOLERANCE).astype(np.float32)[:, :, None]
+    rank_dtype = np.uint8 if niches < 255 else np.int32
+
+    weight_block = max(1, min(len(weights), block_elements // (niches * 1024)))
+    profile_block = max(1, block_elements // max(1, niches * weight_block))
+    for start in range(0, profiles, profile_block):
+        flat = deltas[start:start + profile_block].reshape(-1, len(COMPONENTS))
+        ahead = thresholds[start:start + profile_block]
+        for w_start in range(0, len(weights), weight_block):
+            block = weights[w_start:w_start + weight_block]
+            # (画像, 利基, 权重) 的分差：利基得分减去标签利基得分
+            margins = (flat @ block.T).reshape(-1, niches, len(block))
+            ranks = (margins > ahead).view(np.uint8).sum(axis=1, dtype=rank_dtype)
+            hits[w_start:w_start + len(block)] += (ranks < k).sum(axis=0)
+            gains[w_start:w_start + len(block)] += discount[ranks].sum(axis=0)
+            reciprocal[w_start:w_start + len(block)] += reciprocals[ranks].sum(axis=0)
+
+    total = max(profiles, 1)
+    return {f"hit@{k}": hits / total, "ndcg": gains / total, "mrr": reciprocal / total}
+
+
+def grid_weights(step=5, total=100):
+    """各部分权重以step为步长、合计为total的所有组合（排序只与比例有关）"""
+    parts = len(COMPONENTS)
+    combos = [
+        combo for combo in itertools.product(range(0, total + 1, step), repeat=parts - 1)
+        if sum(combo) <= total
+    ]
+    return np.array([list(combo) + [total - sum(combo)] for combo in combos], dtype=np.float32)
+
+
+def random_weights(samples, seed=None, total=100):
+    """在单纯形上均匀随机抽取的权重组合"""
+    rng = np.random.default_rng(seed)
+    return (rng.dirichlet(np.ones(len(COMPONENTS)), size=samples) * total).astype(np.float32)
+
+
+def calibrate(deltas, before, weights, k=3, metric="ndcg"):
+    """评估全部候选权重（含当前权重），按metric从高到低返回 [(权重字典, 指标字典)]"""
+    current = np.array([[SCORE_WEIGHTS[component] for component in COMPONENTS]], dtype=np.float32)
+    weights = np.concatenate([current, weights])
+    metrics = evaluate_weights(weights, deltas, before, k)
+    key = f"hit@{k}" if metric == "hit" else metric
+    order = np.argsort(-metrics[key], kind="stable")
+    return [
+        (
+            {component: round(float(value), 2) for component, value in zip(COMPONENTS, weights[i])},
+            {name: float(values[i]) for name, values in metrics.items()},
+        )
+        for i in order
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="校准匹配度评分的各部分权重")
+    parser.add_argument("assessments", help="带结果标签的评估记录（JSONL，可为.gz）")
+    parser.add_argument("--label-field", default="chosen_niche", help="记录用户实际选择方向的字段")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--step", type=int, default=5, help="网格搜索的权重步长")
+    parser.add_argument("--samples", type=int, default=2000, help="随机搜索的权重组数")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--k", type=int, default=3, help="hit@k 中的k")
+    parser.add_argument("--metric", choices=["ndcg", "hit", "mrr"], default="ndcg", help="排序依据")
+    parser.add_argument("--top", type=int, default=10, help="输出前几组权重")
+    args = parser.parse_args()
+
+    from refresh import build_snapshot
+    catalog = build_snapshot(version=1).catalog
+    deltas, before, skipped = load_calibration_set(iter_jsonl(args.assessments), catalog, args.label_field)
+    print(f"有效记录 {len(before)} 条，标签不在目录中而跳过 {skipped} 条")
+    if not len(before):
+        return
+
+    weights = grid_weights(args.step) if args.search == "grid" else random_weights(args.samples, args.seed)
+    ranked = calibrate(deltas, before, weights, args.k, args.metric)
+    current = {component: float(value) for component, value in SCORE_WEIGHTS.items()}
+
+    header = " / ".join(COMPONENTS)
+    print(f"\n{'名次':<4} {header:<36} hit@{args.k:<5} NDCG    MRR")
+    for position, (weight, metrics) in enumerate(ranked[:args.top], 1):
+        values = " / ".join(f"{weight[component]:g}" for component in COMPONENTS)
+        print(f"{position:<6}{values:<36} {metrics[f'hit@{args.k}']:.4f}  {metrics['ndcg']:.4f}  {metrics['mrr']:.4f}")
+    for position, (weight, metrics) in enumerate(ranked, 1):
+        if weight == current:
+            print(f"\n当前权重排第 {position}/{len(ranked)}：hit@{args.k} {metrics[f'hit@{args.k}']:.4f}，"
+                  f"NDCG {metrics['ndcg']:.4f}，MRR {metrics['mrr']:.4f}")
+            break
+
+
+if __name__ == "__main__":
+    main()
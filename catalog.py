@@ -0,0 +1,218 @@
+# 利基市场目录的编译结构
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from constraints import ConstraintIndex
+from diversity import niche_similarity_matrix
+from search import SearchIndex
+from semantic import InterestMatcher
+
+# 评级映射（与利基分析页面的展示口径一致）
+LEVEL_MAP = {"极低": 0.5, "低": 1, "中等": 2, "高": 3}
+
+# 评级数值还原成文字，目录中的评级都经过校验，数值与文字一一对应
+LEVEL_LABELS = {value: label for label, value in LEVEL_MAP.items()}
+
+# 需要数值化的评级字段
+LEVEL_FIELDS = ["市场需求", "竞争程度", "收入潜力", "投资成本", "时间投入"]
+
+# 匹配度计算使用的评级映射，未列出的评级按"中等"处理
+SCORE_LEVEL_MAP = {"低": 1, "中等": 2, "高": 3}
+SCORE_LEVEL_FIELDS = ["时间投入", "投资成本"]
+
+# 兴趣语义相似度达到该值即视为匹配
+INTEREST_SIMILARITY_THRESHOLD = 0.2
+
+# 每个利基必须提供的文本字段和列表字段
+TEXT_FIELDS = ["description"]
+LIST_FIELDS = ["技能要求", "适合人群", "工具推荐", "学习资源", "启动步骤"]
+
+
+def validate_catalog(niches):
+    """检查目录数据，返回问题描述列表（为空表示通过）"""
+    problems = []
+    if not niches:
+        problems.append("目录为空")
+    for name, niche_info in niches.items():
+        if not isinstance(niche_info, dict):
+            problems.append(f"{name}：数据必须是字典")
+            continue
+        for field in TEXT_FIELDS:
+            if not isinstance(niche_info.get(field), str):
+                problems.append(f"{name}：缺少文本字段 {field}")
+        for field in LEVEL_FIELDS:
+            if niche_info.get(field) not in LEVEL_MAP:
+                problems.append(f"{name}：{field} 必须是 {'/'.join(LEVEL_MAP)} 之一")
+        for field in LIST_FIELDS:
+            value = niche_info.get(field)
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                problems.append(f"{name}：{field} 必须是字符串列表")
+        # 技能匹配度按技能数归一化，不能为空
+        if not niche_info.get("技能要求"):
+            problems.append(f"{name}：技能要求不能为空")
+    return problems
+
+
+def niche_fingerprint(niche_info):
+    """单个利基数据的内容指纹，用于增量编译和按利基失效缓存"""
+    payload = json.dumps(niche_info, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def catalog_digest(names, fingerprints):
+    """整个目录的内容摘要：按顺序拼接各利基的名称和指纹后取哈希"""
+    digest = hashlib.sha1()
+    for name in names:
+        digest.update(f"{name}\t{fingerprints[name]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _readonly(array):
+    array.setflags(write=False)
+    return array
+
+
+@dataclass(frozen=True)
+class CompiledCatalog:
+    """编译后的只读目录：评级数值、技能矩阵和检索索引，分析表在用到时生成"""
+    version: int
+    names: tuple
+    niches: MappingProxyType
+    fingerprints: MappingProxyType
+    levels: MappingProxyType
+    score_levels: MappingProxyType
+    skills: tuple
+    skill_matrix: np.ndarray
+    skill_counts: np.ndarray
+    interest_matcher: InterestMatcher
+    search_index: SearchIndex
+    # 租户目录相对于共享基础目录的改动（见tenants.py），基础目录为None
+    overlay: object = None
+
+    @cached_property
+    def constraint_index(self):
+        """硬性条件预筛选用的有序索引，第一次用到时按评级数组建立"""
+        return ConstraintIndex.build(self.levels)
+
+    @cached_property
+    def similarity_matrix(self):
+        """利基两两之间的相似度，多样化重排时查表，第一次用到时计算"""
+        return niche_similarity_matrix(self.names, self.niches)
+
+    @cached_property
+    def row_index(self):
+        """利基名称到行号"""
+        return MappingProxyType({name: row for row, name in enumerate(self.names)})
+
+    @cached_property
+    def analysis_frame(self):
+        """利基分析页面使用的数据框，第一次用到时由评级数组生成"""
+        return build_analysis_frame(self.names, self.levels)
+
+    @cached_property
+    def _identity_rows(self):
+        # 目录持有这些利基数据对象，对象存活期间id不会被复用
+        return {id(self.niches[name]): row for row, name in enumerate(self.names)}
+
+    def index_of(self, niche_name):
+        return self.row_index[niche_name]
+
+    def row_of(self, niche_info):
+        """按对象身份查找利基数据所在的行，不属于本目录时返回None"""
+        return self._identity_rows.get(id(niche_info))
+
+
+def build_analysis_frame(names, levels):
+    """利基分析页面使用的数据框，评级文字由数值还原"""
+    niches_data = []
+    for row, name in enumerate(names):
+        record = {"利基市场": name}
+        for field in LEVEL_FIELDS:
+            value = float(levels[field][row])
+            record[field] = LEVEL_LABELS[value]
+            record[f"{field}数值"] = value
+        niches_data.append(record)
+    return pd.DataFrame(niches_data)
+
+
+def diff_catalog(previous, niches):
+    """与上一版目录比较，返回 (新增, 修改, 删除) 的利基名称列表"""
+    added, changed = [], []
+    for name, niche_info in niches.items():
+        old_fingerprint = previous.fingerprints.get(name)
+        if old_fingerprint is None:
+            added.append(name)
+        elif old_fingerprint != niche_fingerprint(niche_info):
+            changed.append(name)
+    removed = [name for name in previous.names if name not in niches]
+    return added, changed, removed
+
+
+def compile_catalog(niches, version, previous=None):
+    """把AI_NICHES字典编译成评分和展示共用的结构
+
+    传入上一版目录时增量编译：内容没变的利基复用已切分好的检索和语义索引数据，
+    评级数组和技能矩阵按行重建的代价很小，直接整体生成。
+    """
+    problems = validate_catalog(niches)
+    if problems:
+        raise ValueError("目录数据有误：" + "；".join(problems))
+
+    names = tuple(niches)
+    fingerprints = {name: niche_fingerprint(niches[name]) for name in names}
+
+    # 每个利基在上一版目录中的行号，新增或修改过的为None
+    reused = None
+    if previous is not None:
+        previous_rows = {name: row for row, name in enumerate(previous.names)}
+        reused = [
+            previous_rows.get(name) if previous.fingerprints.get(name) == fingerprints[name] else None
+            for name in names
+        ]
+
+    levels = {
+        field: _readonly(np.array(
+            [LEVEL_MAP.get(niches[name][field], 2) for name in names], dtype=np.float64
+        ))
+        for field in LEVEL_FIELDS
+    }
+
+    score_levels = {
+        field: _readonly(np.array(
+            [SCORE_LEVEL_MAP.get(niches[name][field], 2) for name in names], dtype=np.float64
+        ))
+        for field in SCORE_LEVEL_FIELDS
+    }
+
+    # 技能词表按首次出现顺序编号，矩阵行是利基市场，列是技能
+    skills = tuple(dict.fromkeys(
+        skill for name in names for skill in niches[name]["技能要求"]
+    ))
+    skill_index = {skill: i for i, skill in enumerate(skills)}
+    skill_matrix = np.zeros((len(names), len(skills)), dtype=np.float64)
+    for row, name in enumerate(names):
+        for skill in niches[name]["技能要求"]:
+            skill_matrix[row, skill_index[skill]] = 1
+
+    return CompiledCatalog(
+        version=version,
+        names=names,
+        niches=MappingProxyType(dict(niches)),
+        fingerprints=MappingProxyType(fingerprints),
+        levels=MappingProxyType(levels),
+        score_levels=MappingProxyType(score_levels),
+        skills=skills,
+        skill_matrix=_readonly(skill_matrix),
+        skill_counts=_readonly(skill_matrix.sum(axis=1)),
+        interest_matcher=InterestMatcher.build(
+            names, niches, INTEREST_SIMILARITY_THRESHOLD,
+            previous.interest_matcher if previous is not None else None, reused,
+        ),
+        search_index=SearchIndex(names, niches, previous.search_index if previous is not None else None, reused),
+    )
@@ -0,0 +1,417 @@
+# 利基目录的二进制快照：构建时校验并编译一次，各进程以内存映射方式加载
+#
+# 用法：
+#   python catalog_store.py build                 # 校验data.py并写出 .cache/catalog.snapshot
+#   python catalog_store.py info .cache/catalog.snapshot
+#
+# 文件结构：按64字节对齐的数组区 + JSON元数据 + 固定长度的文件尾
+#
+# 元数据只有名称、技能词表和几项摘要；语义词表、检索倒排表和利基详情都在数组区，
+# 按有序字符串数组二分查找或按需解码，启动时间和内存与目录大小基本无关。
+import argparse
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import numpy as np
+
+from catalog import (
+    INTEREST_SIMILARITY_THRESHOLD, LEVEL_FIELDS, LEVEL_MAP, SCORE_LEVEL_FIELDS, SCORE_LEVEL_MAP,
+    CompiledCatalog, catalog_digest, compile_catalog,
+)
+from search import SEARCH_FIELDS, SearchIndex
+from semantic import NGRAM_SIZE, NICHE_TEXT_FIELDS, InterestMatcher, NgramVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# 快照格式有不兼容的改动时递增，旧文件加载时会被拒绝
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_MAGIC = b"NICHECAT"
+
+# 文件尾：元数据长度、格式版本、魔数
+_TRAILER = struct.Struct("<QI8s")
+
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", os.path.join(".cache", "catalog.snapshot"))
+
+# 数组在文件中的对齐字节数
+_ALIGNMENT = 64
+
+# 快照内容由这些模块的编译逻辑决定，代码改动后已有快照自动失效
+_BUILD_MODULES = ("catalog", "semantic", "search", "catalog_store")
+
+
+def pack_arrays(path, arrays):
+    """把多个数组按64字节对齐顺序写入一个文件，返回 {名称: (偏移, 形状, dtype)}"""
+    layout = {}
+    offset = 0
+    with open(path, "wb") as f:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+            f.seek(offset)
+            f.write(array.tobytes())
+            layout[name] = (offset, array.shape, array.dtype.str)
+            offset += array.nbytes
+    return layout
+
+
+def map_arrays(path, layout):
+    """以只读内存映射的方式打开pack_arrays写出的数组，多个进程共享同一份物理内存"""
+    arrays = {}
+    for name, (offset, shape, dtype) in layout.items():
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=tuple(shape))
+    return arrays
+
+
+def source_digest(path):
+    """目录源文件的内容摘要，用来判断快照是否过期（不需要执行源文件）"""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def build_digest():
+    """构建参数和编译代码的摘要：阈值、n-gram长度、检索字段权重、评级映射或编译逻辑
+    任何一项变化，已有快照都不再可用"""
+    digest = hashlib.sha1(json.dumps({
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "threshold": INTEREST_SIMILARITY_THRESHOLD,
+        "ngram_size": NGRAM_SIZE,
+        "niche_text_fields": NICHE_TEXT_FIELDS,
+        "search_fields": SEARCH_FIELDS,
+        "level_map": LEVEL_MAP,
+        "score_level_map": SCORE_LEVEL_MAP,
+        "level_fields": LEVEL_FIELDS,
+        "score_level_fields": SCORE_LEVEL_FIELDS,
+    }, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    for name in _BUILD_MODULES:
+        with open(sys.modules[name].__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _sorted_strings(strings):
+    """字符串排序后存成定长unicode数组，返回 (有序数组, 原下标)"""
+    order = sorted(range(len(strings)), key=strings.__getitem__)
+    width = max((len(text) for text in strings), default=1) or 1
+    return np.array([strings[i] for i in order], dtype=f"<U{width}"), np.array(order, dtype=np.int64)
+
+
+def _find(keys, text):
+    """在有序的定长字符串数组中二分查找，找不到时返回None"""
+    i = int(np.searchsorted(keys, text))
+    if i < len(keys) and keys[i] == text:
+        return i
+    return None
+
+
+class MappedVocabulary(Mapping):
+    """内存映射的n-gram词表：有序n-gram数组和对应的列号，查找是一次二分"""
+
+    def __init__(self, keys, cols):
+        self._keys = keys
+        self._cols = cols
+
+    def __getitem__(self, gram):
+        i = _find(self._keys, gram)
+        if i is None:
+            raise KeyError(gram)
+        return int(self._cols[i])
+
+    def __iter__(self):
+        return iter(self._keys.tolist())
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class MappedPostings(Mapping):
+    """内存映射的检索倒排表：n-gram -> ((行号, 权重), ...)，只解码查询用到的n-gram"""
+
+    def __init__(self, keys, offsets, rows, weights):
+        self._keys = keys
+        self._offsets = offsets
+        self._rows = rows
+        self._weights = weights
+
+    def __getitem__(self, gram):
+        i = _find(self._keys, gram)
+        if i is None:
+            raise KeyError(gram)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return tuple(zip(self._rows[start:end].tolist(), self._weights[start:end].tolist()))
+
+    def __iter__(self):
+        return iter(self._keys.tolist())
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class _RowValues(Mapping):
+    """按利基名称读取的定长字节数组，例如各利基的内容指纹"""
+
+    def __init__(self, names, rows, values):
+        self._names = names
+        self._rows = rows
+        self._values = values
+
+    def __getitem__(self, name):
+        return self._values[self._rows[name]].decode("ascii")
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class _LazyNiches(Mapping):
+    """按需解码的利基数据，只有被访问到的利基才反序列化"""
+
+    def __init__(self, names, rows, blob, offsets):
+        self._names = names
+        self._rows = rows
+        self._blob = blob
+        self._offsets = offsets
+        self._decoded = {}
+
+    def __getitem__(self, name):
+        niche_info = self._decoded.get(name)
+        if niche_info is None:
+            row = self._rows[name]
+            raw = self._blob[self._offsets[row]:self._offsets[row + 1]].tobytes()
+            # 并发解码时以先写入的为准，row_of按对象身份查找需要同一个对象
+            niche_info = self._decoded.setdefault(name, json.loads(raw))
+        return niche_info
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+def write_catalog_snapshot(catalog, path, digest=None, trends=None):
+    """把编译后的目录写成快照文件（先写临时文件再替换），返回写入的元数据
+
+    digest是目录源文件的摘要，trends是同一源文件中的趋势数据，启动时与目录一起使用。
+    租户目录不能直接写成快照，抛出TypeError：应写出其基础目录，读取方再叠加覆盖层。
+    """
+    if catalog.overlay is not None:
+        raise TypeError(
+            f"租户目录 {catalog.overlay.tenant} 不能写成快照，"
+            "请写出 catalog.overlay.base，再用 apply_overlay(base, catalog.overlay.source) 叠加"
+        )
+    encoded = [json.dumps(catalog.niches[name], ensure_ascii=False).encode("utf-8") for name in catalog.names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(raw) for raw in encoded])
+    matcher = catalog.interest_matcher
+
+    vocabulary = matcher.index.vocabulary
+    vocabulary_keys, _ = _sorted_strings(list(vocabulary))
+    postings = catalog.search_index.postings()
+    posting_keys, _ = _sorted_strings(list(postings))
+    posting_lists = [postings[gram] for gram in posting_keys.tolist()]
+    posting_offsets = np.zeros(len(posting_lists) + 1, dtype=np.int64)
+    posting_offsets[1:] = np.cumsum([len(rows) for rows in posting_lists])
+
+    arrays = {f"levels/{field}": catalog.levels[field] for field in LEVEL_FIELDS}
+    arrays.update({f"score_levels/{field}": catalog.score_levels[field] for field in SCORE_LEVEL_FIELDS})
+    arrays.update({
+        "skill_matrix": catalog.skill_matrix,
+        "skill_counts": catalog.skill_counts,
+        "interest_idf": matcher.index.idf,
+        "interest_matrix": matcher.index.matrix,
+        "vocabulary_keys": vocabulary_keys,
+        "vocabulary_cols": np.array([vocabulary[gram] for gram in vocabulary_keys.tolist()], dtype=np.int64),
+        "posting_keys": posting_keys,
+        "posting_offsets": posting_offsets,
+        "posting_rows": np.array([row for rows in posting_lists for row, _ in rows], dtype=np.int64),
+        "posting_weights": np.array([weight for rows in posting_lists for _, weight in rows], dtype=np.float64),
+        "fingerprints": np.array([catalog.fingerprints[name] for name in catalog.names], dtype="S40"),
+        "niche_offsets": offsets,
+        "niche_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    })
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    layout = pack_arrays(tmp_path, arrays)
+    meta = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "source_digest": digest,
+        "build_digest": build_digest(),
+        "content_digest": catalog_digest(catalog.names, catalog.fingerprints),
+        "built_at": time.time(),
+        "layout": layout,
+        "names": list(catalog.names),
+        "skills": list(catalog.skills),
+        "threshold": matcher.threshold,
+        "trends": trends,
+    }
+    payload = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    with open(tmp_path, "ab") as f:
+        f.write(payload)
+        f.write(_TRAILER.pack(len(payload), SNAPSHOT_FORMAT_VERSION, SNAPSHOT_MAGIC))
+    os.replace(tmp_path, path)
+    return meta
+
+
+def read_snapshot_meta(path):
+    """只读取快照的元数据，格式不符时抛出ValueError"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size < _TRAILER.size:
+            raise ValueError(f"不是目录快照文件：{path}")
+        f.seek(size - _TRAILER.size)
+        meta_length, format_version, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"不是目录快照文件：{path}")
+        if format_version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"目录快照格式版本 {format_version} 与当前版本 {SNAPSHOT_FORMAT_VERSION} 不一致")
+        f.seek(size - _TRAILER.size - meta_length)
+        return json.loads(f.read(meta_length))
+
+
+def load_catalog_snapshot(path, version=1, meta=None):
+    """内存映射快照文件并组装成CompiledCatalog
+
+    数组不复制到进程内存，词表和倒排表按需二分查找，利基数据在访问时才解码；
+    同一台机器上的进程共享页缓存。
+    """
+    meta = meta or read_snapshot_meta(path)
+    arrays = map_arrays(path, meta["layout"])
+    names = tuple(meta["names"])
+    rows = {name: row for row, name in enumerate(names)}
+    niches = _LazyNiches(names, rows, arrays["niche_blob"], arrays["niche_offsets"])
+    levels = {field: arrays[f"levels/{field}"] for field in LEVEL_FIELDS}
+
+    index = NgramVectorIndex(
+        vocabulary=MappedVocabulary(arrays["vocabulary_keys"], arrays["vocabulary_cols"]),
+        idf=arrays["interest_idf"],
+        matrix=arrays["interest_matrix"],
+    )
+    postings = MappedPostings(
+        arrays["posting_keys"], arrays["posting_offsets"], arrays["posting_rows"], arrays["posting_weights"]
+    )
+    return CompiledCatalog(
+        version=version,
+        names=names,
+        niches=MappingProxyType(niches),
+        fingerprints=MappingProxyType(_RowValues(names, rows, arrays["fingerprints"])),
+        levels=MappingProxyType(levels),
+        score_levels=MappingProxyType({field: arrays[f"score_levels/{field}"] for field in SCORE_LEVEL_FIELDS}),
+        skills=tuple(meta["skills"]),
+        skill_matrix=arrays["skill_matrix"],
+        skill_counts=arrays["skill_counts"],
+        interest_matcher=InterestMatcher.from_niches(index, names, niches, meta["threshold"]),
+        search_index=SearchIndex.from_postings(names, niches, postings),
+    )
+
+
+def snapshot_tempfile(catalog):
+    """把目录写成临时的快照文件（优先放在内存文件系统中，避免落盘），返回路径"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    fd, path = tempfile.mkstemp(prefix="niche-catalog-", suffix=".snapshot", dir=directory)
+    os.close(fd)
+    try:
+        write_catalog_snapshot(catalog, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def build_catalog_snapshot(niches, path, digest=None, trends=None):
+    """校验并编译目录，写出快照文件，校验不通过时抛出ValueError"""
+    return write_catalog_snapshot(compile_catalog(niches, version=1), path, digest, trends)
+
+
+@dataclass(frozen=True)
+class StartupCatalog:
+    """进程启动时的目录和同一源文件中的趋势数据，content_digest见catalog_digest"""
+    catalog: CompiledCatalog
+    trends: dict
+    content_digest: str
+
+
+def _stale_reason(meta, digest):
+    if meta.get("source_digest") != digest:
+        return "目录源文件已修改"
+    if meta.get("build_digest") != build_digest():
+        return "构建参数或编译代码已修改"
+    if meta.get("trends") is None:
+        return "快照中没有趋势数据"
+    return None
+
+
+def load_startup_catalog(source_path, load_source, path=CATALOG_SNAPSHOT_PATH):
+    """进程启动时的目录：快照与源文件和构建参数都一致就直接映射，不执行源文件；
+    否则调用load_source()加载源文件模块，编译并重写快照供下次使用"""
+    digest = source_digest(source_path)
+    try:
+        meta = read_snapshot_meta(path)
+        reason = _stale_reason(meta, digest)
+        if reason is None:
+            return StartupCatalog(load_catalog_snapshot(path, meta=meta), meta["trends"], meta["content_digest"])
+        logger.info("目录快照已过期（%s），重新编译", reason)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError):
+        logger.warning("目录快照无法使用，重新编译：%s", path, exc_info=True)
+
+    source = load_source()
+    catalog = compile_catalog(source.AI_NICHES, version=1)
+    trends = source.load_market_trends()
+    try:
+        write_catalog_snapshot(catalog, path, digest, trends)
+    except OSError:
+        logger.warning("无法写入目录快照：%s", path)
+    return StartupCatalog(catalog, trends, catalog_digest(catalog.names, catalog.fingerprints))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建或查看利基目录的二进制快照")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="校验data.py并写出快照")
+    build.add_argument("--output", default=CATALOG_SNAPSHOT_PATH)
+    info = subparsers.add_parser("info", help="查看快照的元数据")
+    info.add_argument("path", nargs="?", default=CATALOG_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        import data
+        try:
+            meta = build_catalog_snapshot(
+                data.AI_NICHES, args.output, source_digest(data.__file__), data.load_market_trends()
+            )
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+        print(f"已写入 {args.output}：{len(meta['names'])} 个利基，{os.path.getsize(args.output)} 字节")
+    else:
+        meta = read_snapshot_meta(args.path)
+        print(f"格式版本：{meta['format_version']}")
+        print(f"源文件摘要：{meta['source_digest']}")
+        current = "一致" if meta.get("build_digest") == build_digest() else "不一致，启动时会重新编译"
+        print(f"构建摘要：{meta.get('build_digest')}（与当前代码{current}）")
+        print(f"构建时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta['built_at']))}")
+        print(f"利基：{', '.join(meta['names'])}")
+        vocabulary = meta["layout"]["vocabulary_keys"][1][0]
+        print(f"技能词表：{len(meta['skills'])}，语义词表：{vocabulary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+# 协同过滤推荐：从历史用户的反馈中学习"画像相近的人选择并做成了哪些方向"
+#
+# 新访客没有历史记录，所以矩阵的行不是单个用户而是画像属性（如 skills=写作能力）：
+# 每条反馈给该用户的所有属性行加上权重，得到稀疏的 属性×利基 隐式反馈矩阵，
+# 用隐式反馈ALS分解。在线时用户向量是其各属性向量的平均，每个利基只做一次小向量点积，
+# 结果按 CF_BLEND_WEIGHT 与规则匹配度混合。
+#
+# 反馈来源：
+#   - 事件日志中的 niche_progress 事件（行动计划页面上进度的增加）
+#   - 带 chosen_niche 字段的标注文件（与calibrate.py相同格式），每条记1
+#
+# 用法：
+#   python cf_model.py train                            # 增量读取新事件，在上次的因子上继续迭代
+#   python cf_model.py train --labeled labeled.jsonl    # 同时导入标注文件（同一文件只导入一次）
+#   python cf_model.py train --full                     # 从头重新训练
+#   python cf_model.py train --watch 600                # 每10分钟增量训练一次
+#   python cf_model.py show --top 5                     # 各属性最偏好的方向
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+
+from cohorts import profile_attributes
+from event_log import EVENT_LOG_DIR, list_segments
+
+logger = logging.getLogger(__name__)
+
+CF_DB_PATH = os.getenv("CF_DB_PATH", os.path.join(".cache", "cf.sqlite3"))
+CF_MODEL_PATH = os.getenv("CF_MODEL_PATH", os.path.join(".cache", "cf_factors.npz"))
+
+# 最终匹配度 = (1 - w) × 规则匹配度 + w × 协同过滤得分（0-100）
+CF_BLEND_WEIGHT = float(os.getenv("CF_BLEND_WEIGHT", "0.2"))
+
+# 累计反馈条数达到该值后才参与混合，数据太少时只用规则
+CF_MIN_FEEDBACK = int(os.getenv("CF_MIN_FEEDBACK", "50"))
+
+# 因子维数、正则系数和置信度系数（置信度 = 1 + alpha × log(1 + 反馈权重)）
+CF_FACTORS = 16
+CF_REGULARIZATION = 0.1
+CF_ALPHA = 10.0
+
+# 从头训练和增量训练的ALS迭代轮数，增量训练从上次的因子继续
+FULL_SWEEPS = 15
+INCREMENTAL_SWEEPS = 3
+
+# 行动计划进度事件
+PROGRESS_EVENT = "niche_progress"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cf_feedback (
+    feature TEXT NOT NULL,
+    niche TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (feature, niche)
+);
+CREATE TABLE IF NOT EXISTS cf_sources (
+    source TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cf_meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def profile_features(user_profile):
+    """画像对应的矩阵行，与人群分析使用相同的属性"""
+    return [f"{field}={value}" for field, value in profile_attributes(user_profile)]
+
+
+class FeedbackStore:
+    """属性×利基的累计反馈和各数据源的读取位置"""
+
+    def __init__(self, path=CF_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def offsets(self):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT source, offset FROM cf_sources").fetchall())
+
+    def add(self, feedback, offsets):
+        """在一个事务中累加反馈 [(画像, 利基, 权重)] 并更新读取位置"""
+        rows = [
+            (feature, niche, weight)
+            for user_profile, niche, weight in feedback
+            for feature in profile_features(user_profile)
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO cf_feedback (feature, niche, weight) VALUES (?, ?, ?) "
+                "ON CONFLICT (feature, niche) DO UPDATE SET weight = weight + excluded.weight",
+                rows,
+            )
+            conn.executemany(
+                "INSERT INTO cf_sources (source, offset) VALUES (?, ?) "
+                "ON CONFLICT (source) DO UPDATE SET offset = excluded.offset",
+                list(offsets.items()),
+            )
+            conn.execute(
+                "INSERT INTO cf_meta (key, value) VALUES ('feedback', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+                (sum(1 for _, _, weight in feedback if weight > 0),),
+            )
+
+    def feedback_count(self):
+        """累计的正向反馈条数"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM cf_meta WHERE key = 'feedback'").fetchone()
+        return int(row[0]) if row else 0
+
+    def entries(self):
+        """权重为正的 (属性, 利基, 权重)；进度被调回时累计权重可能降到0以下，视为没有反馈"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT feature, niche, weight FROM cf_feedback WHERE weight > 0 ORDER BY feature, niche"
+            ).fetchall()
+
+
+def read_new_progress(offsets, directory=EVENT_LOG_DIR):
+    """从各分段上次读到的位置继续读取进度事件，返回 (反馈列表, 新的读取位置)
+
+    只处理以换行结尾的完整行，正在写入的半行留到下次。
+    """
+    feedback, positions = [], {}
+    for path in list_segments(directory):
+        source = f"events:{os.path.basename(path)}"
+        start = offsets.get(source, 0)
+        if os.path.getsize(path) <= start:
+            continue
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("type") != PROGRESS_EVENT:
+                continue
+            progress = event.get("data", {})
+            if isinstance(progress.get("profile"), dict) and progress.get("niche"):
+                feedback.append((progress["profile"], progress["niche"], float(progress.get("gain", 0))))
+        positions[source] = start + len(complete)
+    return feedback, positions
+
+
+def read_labeled(path, label_field="chosen_niche"):
+    """标注文件中的反馈，每条记1；返回 (反馈列表, 数据源标识)"""
+    from export import iter_jsonl
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    feedback = [
+        (record, record[label_field], 1.0) for record in iter_jsonl(path) if record.get(label_field)
+    ]
+    return feedback, f"labeled:{digest.hexdigest()}"
+
+
+def _solve_rows(entries, fixed, rows, factors, regularization, alpha):
+    """ALS的半步：固定一侧因子，逐行求解另一侧
+
+    entries[i] 是第i行有反馈的 (列号数组, 权重数组)。没有反馈的行只有YᵀY项，
+    所以每行的代价只与该行的反馈数有关。
+    """
+    gram = fixed.T @ fixed + regularization * np.eye(factors)
+    solved = np.zeros((rows, factors))
+    for row, (columns, weights) in enumerate(entries):
+        if not len(columns):
+            continue
+        confidence = alpha * np.log1p(weights)
+        selected = fixed[columns]
+        a = gram + (selected.T * confidence) @ selected
+        b = selected.T @ (1 + confidence)
+        solved[row] = np.linalg.solve(a, b)
+    return solved
+
+
+def als(entries, features, niches, previous=None, sweeps=FULL_SWEEPS, factors=CF_FACTORS,
+        regularization=CF_REGULARIZATION, alpha=CF_ALPHA, seed=0):
+    """隐式反馈ALS（Hu、Koren、Volinsky），返回 (属性因子, 利基因子)
+
+    previous是上次的CFModel时作为初值，新出现的属性和利基随机初始化。
+    """
+    feature_rows = {feature: row for row, feature in enumerate(features)}
+    niche_rows = {niche: row for row, niche in enumerate(niches)}
+    by_feature = [([], []) for _ in features]
+    by_niche = [([], []) for _ in niches]
+    for feature, niche, weight in entries:
+        f, n = feature_rows[feature], niche_rows[niche]
+        by_feature[f][0].append(n)
+        by_feature[f][1].append(weight)
+        by_niche[n][0].append(f)
+        by_niche[n][1].append(weight)
+    by_feature = [(np.array(c, dtype=np.intp), np.array(w)) for c, w in by_feature]
+    by_niche = [(np.array(c, dtype=np.intp), np.array(w)) for c, w in by_niche]
+
+    rng = np.random.default_rng(seed)
+    niche_factors = rng.normal(scale=0.01, size=(len(niches), factors))
+    if previous is not None and previous.niche_factors.shape[1] == factors:
+        for niche, row in niche_rows.items():
+            old = previous.niches.get(niche)
+            if old is not None:
+                niche_factors[row] = previous.niche_factors[old]
+    feature_factors = np.zeros((len(features), factors))
+    for _ in range(sweeps):
+        feature_factors = _solve_rows(by_feature, niche_factors, len(features), factors, regularization, alpha)
+        niche_factors = _solve_rows(by_niche, feature_factors, len(niches), factors, regularization, alpha)
+    return feature_factors, niche_factors
+
+
+@dataclass(frozen=True)
+class CFModel:
+    """训练好的因子，加载后只读"""
+    version: str
+    feedback: int
+    features: dict
+    niches: dict
+    feature_factors: np.ndarray
+    niche_factors: np.ndarray
+
+    def user_vectors(self, profiles):
+        """画像向量（已知属性向量的平均），返回 (向量, 是否有已知属性)"""
+        vectors = np.zeros((len(profiles), self.feature_factors.shape[1]))
+        known = np.zeros(len(profiles), dtype=bool)
+        for i, user_profile in enumerate(profiles):
+            rows = [self.features[f] for f in profile_features(user_profile) if f in self.features]
+            if rows:
+                vectors[i] = self.feature_factors[rows].mean(axis=0)
+                known[i] = True
+        return vectors, known
+
+    def score_batch(self, profiles, names):
+        """一批画像对names中各利基的协同过滤得分（0-1），返回 (得分, 可用掩码)
+
+        模型没见过的利基和没有已知属性的画像掩码为False，调用方只用规则匹配度。
+        """
+        columns = np.array([self.niches.get(name, -1) for name in names], dtype=np.intp)
+        vectors, known_users = self.user_vectors(profiles)
+        known_niches = columns >= 0
+        scores = vectors @ self.niche_factors[np.where(known_niches, columns, 0)].T
+        return np.clip(scores, 0, 1), known_users[:, None] & known_niches[None, :]
+
+
+def save_model(model, path=CF_MODEL_PATH):
+    """原子地写入因子文件，服务进程按修改时间重新加载"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f, version=np.array(model.version), feedback=np.array(model.feedback),
+                features=np.array(list(model.features), dtype=str), niches=np.array(list(model.niches), dtype=str),
+                feature_factors=model.feature_factors, niche_factors=model.niche_factors,
+            )
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_model(path=CF_MODEL_PATH):
+    with np.load(path, allow_pickle=False) as data:
+        feature_factors = data["feature_factors"]
+        niche_factors = data["niche_factors"]
+        feature_factors.setflags(write=False)
+        niche_factors.setflags(write=False)
+        return CFModel(
+            version=str(data["version"]),
+            feedback=int(data["feedback"]),
+            features={feature: row for row, feature in enumerate(data["features"].tolist())},
+            niches={niche: row for row, niche in enumerate(data["niches"].tolist())},
+            feature_factors=feature_factors,
+            niche_factors=niche_factors,
+        )
+
+
+def train(store=None, model_path=CF_MODEL_PATH, labeled=None, full=False, event_dir=EVENT_LOG_DIR):
+    """读取新的反馈并更新因子，返回 (新反馈数, 模型)；没有新反馈且不是从头训练时不重新计算"""
+    store = store or FeedbackStore()
+    offsets = store.offsets()
+    feedback, positions = read_new_progress(offsets, event_dir)
+    if labeled:
+        labeled_feedback, source = read_labeled(labeled)
+        if source not in offsets:
+            feedback += labeled_feedback
+            positions[source] = len(labeled_feedback)
+    if positions:
+        store.add(feedback, positions)
+
+    previous = None
+    if not full and os.path.exists(model_path):
+        try:
+            previous = load_model(model_path)
+        except (OSError, ValueError, KeyError):
+            logger.exception("读取上次的协同过滤因子失败，从头训练")
+    if previous is not None and not feedback:
+        return 0, previous
+
+    entries = store.entries()
+    features = sorted({feature for feature, _, _ in entries})
+    niches = sorted({niche for _, niche, _ in entries})
+    sweeps = FULL_SWEEPS if previous is None else INCREMENTAL_SWEEPS
+    feature_factors, niche_factors = als(entries, features, niches, previous, sweeps)
+    model = CFModel(
+        version=time.strftime("%Y%m%d%H%M%S"),
+        feedback=store.feedback_count(),
+        features={feature: row for row, feature in enumerate(features)},
+        niches={niche: row for row, niche in enumerate(niches)},
+        feature_factors=feature_factors,
+        niche_factors=niche_factors,
+    )
+    save_model(model, model_path)
+    return len(feedback), model
+
+
+_model = None
+_model_mtime = None
+_model_lock = threading.Lock()
+
+
+def get_cf_model():
+    """进程内共享的协同过滤模型，因子文件更新后自动重新加载；没有模型或反馈太少时返回None"""
+    global _model, _model_mtime
+    try:
+        mtime = os.stat(CF_MODEL_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if mtime != _model_mtime:
+        with _model_lock:
+            if mtime != _model_mtime:
+                try:
+                    _model = load_model(CF_MODEL_PATH)
+                except (OSError, ValueError, KeyError):
+                    logger.exception("加载协同过滤因子失败，只使用规则匹配度")
+                    _model = None
+                _model_mtime = mtime
+    if _model is None or _model.feedback < CF_MIN_FEEDBACK or CF_BLEND_WEIGHT <= 0:
+        return None
+    return _model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练和查看协同过滤推荐模型")
+    parser.add_argument("command", choices=["train", "show"])
+    parser.add_argument("--labeled", help="带 chosen_niche 字段的JSONL标注文件")
+    parser.add_argument("--full", action="store_true", help="从头重新训练")
+    parser.add_argument("--watch", type=float, help="每隔这么多秒增量训练一次")
+    parser.add_argument("--top", type=int, default=3, help="show：每个属性显示的方向数")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        model = load_model()
+        print(f"版本 {model.version}，{model.feedback} 条反馈，{len(model.features)} 个属性，{len(model.niches)} 个方向")
+        names = list(model.niches)
+        scores = model.feature_factors @ model.niche_factors.T
+        for feature, row in model.features.items():
+            best = np.argsort(-scores[row])[:args.top]
+            print(f"{feature}: " + "、".join(f"{names[i]}({scores[row, i]:.2f})" for i in best))
+        return
+
+    store = FeedbackStore()
+    full = args.full
+    while True:
+        started = time.perf_counter()
+        added, model = train(store, labeled=args.labeled, full=full)
+        print(
+            f"新反馈 {added} 条，累计 {model.feedback} 条、{len(model.niches)} 个方向，"
+            f"用时 {time.perf_counter() - started:.2f}s"
+        )
+        if not args.watch:
+            return
+        full = False
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# 人群分析：每次提交评估时增量更新的计数和匹配度分布，看板只读取聚合结果
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+COHORT_DB_PATH = os.getenv("COHORT_DB_PATH", os.path.join(".cache", "cohorts.sqlite3"))
+
+# 参与分组统计的单选字段及展示名称（与个人评估表单一致）
+COHORT_FIELDS = {
+    "age": "年龄段",
+    "education": "教育背景",
+    "experience_years": "工作经验",
+    "time_availability": "每周可用时间",
+    "investment_capacity": "投资金额",
+    "income_goal": "收入目标",
+    "risk_tolerance": "风险承受能力",
+}
+
+# 多选字段，每个选项分别计数
+COHORT_MULTI_FIELDS = {
+    "skills": "技能",
+    "interests": "感兴趣的领域",
+}
+
+# 匹配度分布的分桶宽度
+SCORE_BUCKET_WIDTH = 10
+
+# 待写入统计的评估数上限，写入跟不上时丢弃新记录而不是阻塞提交
+COHORT_QUEUE_SIZE = 10000
+
+# 记录总数使用的特殊字段名
+_TOTAL = ""
+
+_STOP = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cohort_counts (
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    niche TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (field, value, niche)
+);
+CREATE TABLE IF NOT EXISTS score_histogram (
+    niche TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (niche, bucket)
+);
+"""
+
+
+def score_bucket(score):
+    """匹配度所在分桶的下限，100分并入最后一个桶"""
+    return min(int(score // SCORE_BUCKET_WIDTH) * SCORE_BUCKET_WIDTH, 100 - SCORE_BUCKET_WIDTH)
+
+
+def profile_attributes(user_profile):
+    """画像中参与统计的 (字段, 取值) 列表，缺失的字段不计"""
+    attributes = []
+    for field in COHORT_FIELDS:
+        value = user_profile.get(field)
+        if value:
+            attributes.append((field, str(value)))
+    for field in COHORT_MULTI_FIELDS:
+        for value in dict.fromkeys(user_profile.get(field) or []):
+            attributes.append((field, str(value)))
+    return attributes
+
+
+class CohortStats:
+    """按画像属性和最佳推荐方向累计的计数表
+
+    每次提交只做几十次累加，看板查询的行数只与字段取值数和方向数有关，与评估总数无关。
+    """
+
+    def __init__(self, path=COHORT_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL模式下写入不阻塞其他会话的读取
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # 每次操作使用独立连接，多个会话线程之间不共享连接
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, user_profile, top_niche, score):
+        """同步累加一次评估：最佳推荐方向在各画像属性下的计数和匹配度分布（页面经 CohortRecorder 在后台调用）"""
+        self.record_batch([(user_profile, top_niche, score)])
+
+    def record_batch(self, entries):
+        """在一个事务中累加多次评估，entries是 (画像, 最佳方向, 匹配度) 的列表"""
+        counts = []
+        buckets = []
+        for user_profile, top_niche, score in entries:
+            counts.append((_TOTAL, _TOTAL, top_niche))
+            counts.extend((field, value, top_niche) for field, value in profile_attributes(user_profile))
+            buckets.append((top_niche, score_bucket(score)))
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO cohort_counts (field, value, niche, count) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (field, value, niche) DO UPDATE SET count = count + 1",
+                    counts,
+                )
+                conn.executemany(
+                    "INSERT INTO score_histogram (niche, bucket, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT (niche, bucket) DO UPDATE SET count = count + 1",
+                    buckets,
+                )
+        except sqlite3.Error:
+            # 统计失败不影响用户提交评估
+            logger.exception("记录人群统计失败")
+
+    def reset(self):
+        """清空全部统计（从事件日志重建前调用）"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cohort_counts")
+            conn.execute("DELETE FROM score_histogram")
+
+    def niche_totals(self):
+        """各方向作为最佳推荐的次数 {方向: 次数}"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT niche, count FROM cohort_counts WHERE field = ? ORDER BY count DESC", (_TOTAL,)
+            ).fetchall()
+        return dict(rows)
+
+    def breakdown(self, field):
+        """某个画像字段下各取值的最佳推荐分布 [(取值, 方向, 次数)]"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT value, niche, count FROM cohort_counts WHERE field = ? ORDER BY value, niche",
+                (field,),
+            ).fetchall()
+
+    def score_histogram(self):
+        """各方向的匹配度分布 [(方向, 分桶下限, 次数)]"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT niche, bucket, count FROM score_histogram ORDER BY niche, bucket"
+            ).fetchall()
+
+
+def replay_events(events, stats, batch_size=1000):
+    """用事件日志重建统计：清空后按提交事件和对应的推荐结果重新累加，返回回放的评估数"""
+    from scoring import micro_batches
+
+    def entries():
+        profiles = {}
+        for event in events:
+            data = event.get("data", {})
+            if event.get("type") == "assessment_submitted":
+                profiles[data["assessment_id"]] = data["profile"]
+            elif event.get("type") == "recommendations" and data.get("results"):
+                user_profile = profiles.pop(data["assessment_id"], None)
+                if user_profile is not None:
+                    # 旧事件没有记录展示的第一名，用规则排名的第一名
+                    best = data.get("top") or data["results"][0]
+                    yield user_profile, best["niche"], best["score"]
+
+    stats.reset()
+    replayed = 0
+    for batch in micro_batches(entries(), batch_size):
+        stats.record_batch(batch)
+        replayed += len(batch)
+    return replayed
+
+
+class CohortRecorder:
+    """在后台线程中更新统计表
+
+    record() 只把评估放入队列立即返回，提交路径不等待SQLite事务；后台线程每次取出
+    积压的全部评估，用一个事务 record_batch 写入。
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.counts = Counter()
+        self._queue = queue.Queue(maxsize=COHORT_QUEUE_SIZE)
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._done = 0
+        self._thread = threading.Thread(target=self._run, name="cohort-stats", daemon=True)
+        self._thread.start()
+
+    def record(self, user_profile, top_niche, score):
+        """提交评估时调用；队列已满时丢弃并返回False"""
+        with self._cond:
+            try:
+                self._queue.put_nowait((user_profile, top_niche, score))
+            except queue.Full:
+                self.counts["dropped"] += 1
+                return False
+            self._enqueued += 1
+        return True
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            entries = [entry for entry in batch if entry is not _STOP]
+            if entries:
+                # record_batch 自己记录失败，统计失败不影响提交
+                self.stats.record_batch(entries)
+                self.counts["recorded"] += len(entries)
+                self.counts["batches"] += 1
+                with self._cond:
+                    self._done += len(entries)
+                    self._cond.notify_all()
+            if batch[-1] is _STOP:
+                return
+
+    def flush(self, timeout=None):
+        """等待此前记录的评估全部写入统计表，超时返回False"""
+        with self._cond:
+            target = self._enqueued
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self, timeout=5):
+        """写完队列中剩余的评估后停止后台线程"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+
+_cohort_stats = None
+_cohort_recorder = None
+_cohort_lock = threading.Lock()
+
+
+def get_cohort_stats():
+    """进程内共享的统计表"""
+    global _cohort_stats
+    with _cohort_lock:
+        if _cohort_stats is None:
+            _cohort_stats = CohortStats()
+        return _cohort_stats
+
+
+def get_cohort_recorder():
+    """进程内共享的后台统计写入器，进程退出前写完剩余的评估"""
+    global _cohort_recorder
+    stats = get_cohort_stats()
+    with _cohort_lock:
+        if _cohort_recorder is None:
+            _cohort_recorder = CohortRecorder(stats)
+            atexit.register(_cohort_recorder.close)
+        return _cohort_recorder
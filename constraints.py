@@ -0,0 +1,120 @@
+# 硬性条件预筛选：预算、每周时间、风险承受能力、收入目标明显不满足的利基在评分前直接排除
+#
+# 评估表单的每个选项对应一个数值上限（收入目标是下限），利基的评级折算成同样单位的估计值；
+# 每个属性的估计值按升序排好，一次二分查找就得到满足条件的全部行。
+# 画像的 hard_constraints 字段列出要启用的条件，未设置时行为与以前完全相同。
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+# 画像中列出启用条件的字段
+CONSTRAINT_FIELD = "hard_constraints"
+
+# 可选的硬性条件及其显示名称
+CONSTRAINTS = {"budget": "预算", "hours": "每周时间", "risk": "风险承受能力", "income": "收入目标"}
+
+# 表单选项的数值：预算（元）、每周时间（小时）、可承受的风险等级是上限
+BUDGET_LIMITS = {"1000元以下": 1000, "1000-5000元": 5000, "5000-20000元": 20000, "20000元以上": math.inf}
+HOURS_LIMITS = {"5小时以下": 5, "5-10小时": 10, "10-20小时": 20, "20小时以上": math.inf}
+RISK_LIMITS = {"保守型": 1, "稳健型": 2, "积极型": 3, "激进型": 3}
+# 月收入目标（元）是下限
+INCOME_GOALS = {"每月1000元以下": 0, "每月1000-3000元": 1000, "每月3000-8000元": 3000, "每月8000元以上": 8000}
+
+# 条件对应的画像字段和选项数值
+PROFILE_LIMITS = {
+    "budget": ("investment_capacity", BUDGET_LIMITS),
+    "hours": ("time_availability", HOURS_LIMITS),
+    "risk": ("risk_tolerance", RISK_LIMITS),
+    "income": ("income_goal", INCOME_GOALS),
+}
+
+# 利基评级（LEVEL_MAP的数值）折算的估计值：启动资金、每周时间、月收入上限、风险等级
+NICHE_STARTUP_COST = {0.5: 0, 1: 1000, 2: 5000, 3: 20000}
+NICHE_WEEKLY_HOURS = {0.5: 2, 1: 5, 2: 10, 3: 20}
+NICHE_INCOME_CEILING = {0.5: 1000, 1: 3000, 2: 8000, 3: math.inf}
+# 风险取竞争程度和投资成本中较高的一项
+NICHE_RISK = {0.5: 1, 1: 1, 2: 2, 3: 3}
+
+
+def active_constraints(user_profile):
+    """画像启用的硬性条件名称，忽略不认识的条件"""
+    names = user_profile.get(CONSTRAINT_FIELD)
+    if not isinstance(names, list):
+        return []
+    return [name for name in CONSTRAINTS if name in names]
+
+
+@dataclass(frozen=True)
+class RangeIndex:
+    """一个属性的有序索引：values升序排列，rows是对应的目录行号"""
+    values: np.ndarray
+    rows: np.ndarray
+
+    @classmethod
+    def build(cls, values):
+        order = np.argsort(values, kind="stable")
+        sorted_values = values[order]
+        sorted_values.setflags(write=False)
+        order.setflags(write=False)
+        return cls(sorted_values, order)
+
+    def at_most(self, limit):
+        """估计值不超过limit的行"""
+        return self.rows[:np.searchsorted(self.values, limit, side="right")]
+
+    def above(self, minimum):
+        """估计值大于minimum的行"""
+        return self.rows[np.searchsorted(self.values, minimum, side="right"):]
+
+
+def _estimates(levels, table):
+    return np.array([table.get(float(level), table[2]) for level in levels], dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class ConstraintIndex:
+    """目录各属性的有序索引，按评级数组建立"""
+    size: int
+    budget: RangeIndex
+    hours: RangeIndex
+    risk: RangeIndex
+    income: RangeIndex
+
+    @classmethod
+    def build(cls, levels):
+        risk_levels = np.maximum(levels["竞争程度"], levels["投资成本"])
+        return cls(
+            size=len(levels["投资成本"]),
+            budget=RangeIndex.build(_estimates(levels["投资成本"], NICHE_STARTUP_COST)),
+            hours=RangeIndex.build(_estimates(levels["时间投入"], NICHE_WEEKLY_HOURS)),
+            risk=RangeIndex.build(_estimates(risk_levels, NICHE_RISK)),
+            income=RangeIndex.build(_estimates(levels["收入潜力"], NICHE_INCOME_CEILING)),
+        )
+
+    def _allowed(self, name, value):
+        index = getattr(self, name)
+        rows = index.above(value) if name == "income" else index.at_most(value)
+        allowed = np.zeros(self.size, dtype=bool)
+        allowed[rows] = True
+        return allowed
+
+    def feasible_mask(self, profiles):
+        """一批画像各自可行的利基，形状为 (画像数, 利基数)；批内都没有启用条件时返回None"""
+        if not any(active_constraints(user_profile) for user_profile in profiles):
+            return None
+        mask = np.ones((len(profiles), self.size), dtype=bool)
+        # 同一批画像的选项组合有限，每种 (条件, 数值) 只查找一次
+        allowed = {}
+        for i, user_profile in enumerate(profiles):
+            for name in active_constraints(user_profile):
+                field, table = PROFILE_LIMITS[name]
+                option = user_profile.get(field)
+                value = table.get(option) if isinstance(option, str) else None
+                # 选项不在表中（旧画像或接口传入的自定义值）时该条件不生效
+                if value is None:
+                    continue
+                if (name, value) not in allowed:
+                    allowed[name, value] = self._allowed(name, value)
+                mask[i] &= allowed[name, value]
+        return mask
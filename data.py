@@ -108,4 +108,20 @@ AI_NICHES = {
             "开始推广销售"
         ]
     }
-} 
\ No newline at end of file
+} 
+
+# 模拟市场趋势数据（市场需求指数）
+MARKET_TRENDS = {
+    "月份": ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"],
+    "内容创作": [100, 120, 140, 160, 180, 200],
+    "AI应用开发": [80, 100, 130, 170, 220, 280],
+    "AI咨询服务": [60, 80, 110, 150, 200, 250],
+    "AI教育培训": [90, 110, 130, 150, 170, 190],
+    "AI数据标注": [70, 75, 80, 85, 90, 95],
+    "AI产品代理": [50, 70, 90, 120, 150, 180]
+}
+
+
+def load_market_trends():
+    """加载市场趋势数据，接入真实市场数据API时替换这里"""
+    return {key: list(values) for key, values in MARKET_TRENDS.items()}
@@ -0,0 +1,72 @@
+# 多样化top-k：按MMR重排前几名，避免推荐出几个几乎相同的子方向
+#
+# 利基两两之间的相似度由技能要求、适合人群和工具推荐的重合程度算出，
+# 每个目录版本只算一次；重排时只查表，k个名额 × 候选数次查找。
+import os
+
+import numpy as np
+
+# 参与相似度计算的列表字段，各字段的余弦相似度取平均
+SIMILARITY_FIELDS = ("技能要求", "适合人群", "工具推荐")
+
+# MMR中匹配度的权重，1表示完全按匹配度排序，越小越看重差异
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# 只在匹配度最高的这些候选中挑选
+MMR_CANDIDATES = 50
+
+
+def niche_similarity_matrix(names, niches):
+    """利基两两之间的相似度，形状为 (利基数, 利基数)，取值0到1，对角线为1"""
+    similarity = np.zeros((len(names), len(names)), dtype=np.float32)
+    for field in SIMILARITY_FIELDS:
+        vocabulary = {}
+        for name in names:
+            for item in niches[name][field]:
+                vocabulary.setdefault(item, len(vocabulary))
+        features = np.zeros((len(names), len(vocabulary)), dtype=np.float32)
+        for row, name in enumerate(names):
+            features[row, [vocabulary[item] for item in niches[name][field]]] = 1
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        np.divide(features, norms, out=features, where=norms > 0)
+        similarity += features @ features.T
+    similarity /= len(SIMILARITY_FIELDS)
+    np.fill_diagonal(similarity, 1)
+    similarity.setflags(write=False)
+    return similarity
+
+
+def mmr_order(rows, scores, similarity, k, weight=MMR_LAMBDA):
+    """按MMR从候选中挑出k个，返回它们在候选中的下标
+
+    rows是候选的目录行号，scores是对应的匹配度（0-100）。每一步选
+    weight × 匹配度/100 − (1 − weight) × 与已选利基的最大相似度 最大的候选，
+    同分时取排在前面的候选。
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    relevance = np.asarray(scores, dtype=np.float64) / 100
+    closest = np.zeros(len(rows))
+    available = np.ones(len(rows), dtype=bool)
+    picked = []
+    for _ in range(min(k, len(rows))):
+        gain = np.where(available, weight * relevance - (1 - weight) * closest, -np.inf)
+        best = int(np.argmax(gain))
+        picked.append(best)
+        available[best] = False
+        # 只查新选中利基那一行，更新每个候选与已选集合的最大相似度
+        np.maximum(closest, similarity[rows[best], rows], out=closest)
+    return picked
+
+
+def diversify_ranking(ranked, catalog, k=3, weight=MMR_LAMBDA):
+    """把按匹配度排好的 [(利基名称, 匹配度)] 的前k名换成MMR挑出的k个，其余保持原顺序"""
+    candidates = ranked[:MMR_CANDIDATES]
+    if len(candidates) <= 1 or weight >= 1:
+        return list(ranked)
+    row_of = catalog.row_index
+    picked = mmr_order(
+        [row_of[name] for name, _ in candidates], [score for _, score in candidates],
+        catalog.similarity_matrix, k, weight,
+    )
+    chosen = set(picked)
+    return [candidates[i] for i in picked] + [item for i, item in enumerate(ranked) if i not in chosen]
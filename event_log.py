@@ -0,0 +1,216 @@
+# 评估事件日志：提交路径只入队，后台线程批量写入JSONL分段文件并合并fsync
+#
+# 用法：
+#   python event_log.py summary                  # 各分段文件和各类事件的数量
+#   python event_log.py replay-cohorts           # 从日志重建人群分析的聚合统计
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", os.path.join(".cache", "events"))
+
+# 单个分段文件写到这么大后切换到下一个
+SEGMENT_MAX_BYTES = int(os.getenv("EVENT_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# 待写入事件的上限，写盘跟不上时丢弃新事件而不是阻塞提交
+EVENT_QUEUE_SIZE = 100000
+
+# 每批最多合并的事件数
+BATCH_MAX_EVENTS = 4096
+
+_SEGMENT_PREFIX = "events-"
+_SEGMENT_SUFFIX = ".jsonl"
+_STOP = object()
+
+
+def new_event_id():
+    return uuid.uuid4().hex
+
+
+def list_segments(directory=EVENT_LOG_DIR):
+    """按顺序返回日志目录中的分段文件路径"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    segments = sorted(
+        name for name in names if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+    )
+    return [os.path.join(directory, name) for name in segments]
+
+
+def _segment_path(directory, sequence):
+    return os.path.join(directory, f"{_SEGMENT_PREFIX}{sequence:08d}{_SEGMENT_SUFFIX}")
+
+
+def iter_events(directory=EVENT_LOG_DIR, types=None):
+    """按写入顺序读出事件，types为空时返回全部类型
+
+    进程崩溃时最后一行可能只写了一半，读取时跳过无法解析的行。
+    """
+    for path in list_segments(directory):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if types is None or event.get("type") in types:
+                    yield event
+
+
+class EventLog:
+    """追加写入的事件日志
+
+    append() 在调用线程中完成序列化后放入队列立即返回；后台线程每次取出队列中
+    积压的全部事件，一次写入、一次fsync（组提交），写盘越慢每批合并得越多。
+    """
+
+    def __init__(self, directory=EVENT_LOG_DIR, segment_max_bytes=SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._durable = 0
+        self.stats = Counter()
+        self._file = None
+        self._sequence = 0
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def _open_segment(self):
+        # 每个进程启动时都从新的分段开始：上次崩溃留下的半行不会和新事件拼在一起，
+        # 多个进程也不会写同一个文件
+        segments = list_segments(self.directory)
+        if segments:
+            last = os.path.basename(segments[-1])
+            self._sequence = int(last[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+        self._next_segment()
+
+    def _next_segment(self):
+        while True:
+            self._sequence += 1
+            try:
+                self._file = open(_segment_path(self.directory, self._sequence), "xb")
+                return
+            except FileExistsError:
+                continue
+
+    def _rotate(self):
+        self._file.close()
+        self._next_segment()
+        self.stats["segments_rotated"] += 1
+
+    def append(self, event_type, data):
+        """追加一条事件，返回事件id；队列已满时丢弃并返回None"""
+        event_id = new_event_id()
+        line = json.dumps(
+            {"id": event_id, "type": event_type, "ts": time.time(), "data": data}, ensure_ascii=False
+        ).encode("utf-8") + b"\n"
+        with self._cond:
+            try:
+                self._queue.put_nowait(line)
+            except queue.Full:
+                self.stats["dropped"] += 1
+                return None
+            self._enqueued += 1
+        return event_id
+
+    def _take_batch(self):
+        first = self._queue.get()
+        batch = [first]
+        while len(batch) < BATCH_MAX_EVENTS:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            stop = batch[-1] is _STOP
+            lines = [line for line in batch if line is not _STOP]
+            if lines:
+                try:
+                    self._write(lines)
+                except OSError:
+                    logger.exception("写入事件日志失败，丢弃 %d 条事件", len(lines))
+                    self.stats["lost"] += len(lines)
+                with self._cond:
+                    self._durable += len(lines)
+                    self._cond.notify_all()
+            if stop:
+                return
+
+    def _write(self, lines):
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.stats["events"] += len(lines)
+        self.stats["batches"] += 1
+        if self._file.tell() >= self.segment_max_bytes:
+            self._rotate()
+
+    def flush(self, timeout=None):
+        """等待此前追加的事件全部落盘，超时返回False"""
+        with self._cond:
+            target = self._enqueued
+            return self._cond.wait_for(lambda: self._durable >= target, timeout)
+
+    def close(self, timeout=5):
+        """写完队列中剩余的事件后关闭当前分段"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._file.close()
+
+
+_event_log = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """进程内共享的事件日志，进程退出前写完剩余事件"""
+    global _event_log
+    with _event_log_lock:
+        if _event_log is None:
+            _event_log = EventLog()
+            atexit.register(_event_log.close)
+        return _event_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看和回放评估事件日志")
+    parser.add_argument("command", choices=["summary", "replay-cohorts"])
+    parser.add_argument("--dir", default=EVENT_LOG_DIR, help="日志目录")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        for path in list_segments(args.dir):
+            print(f"{os.path.basename(path)}  {os.path.getsize(path)} 字节")
+        counts = Counter(event.get("type") for event in iter_events(args.dir))
+        for event_type, count in counts.most_common():
+            print(f"{event_type}: {count}")
+    else:
+        from cohorts import CohortStats, replay_events
+        stats = CohortStats()
+        replayed = replay_events(iter_events(args.dir), stats)
+        print(f"已回放 {replayed} 次评估到 {stats.path}")
+
+
+if __name__ == "__main__":
+    main()
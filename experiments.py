@@ -0,0 +1,319 @@
+# 评分规则的A/B实验：会话按哈希稳定分桶，所有变体的得分在同一次批量评分中算出
+#
+# 实验定义放在 EXPERIMENT_PATH（默认 experiment.json），文件不存在时不做实验：
+#   {
+#     "name": "skills-weight",
+#     "variants": [
+#       {"name": "control", "share": 50},
+#       {"name": "skills60", "share": 50, "weights": {"skills": 60, "time": 10, "investment": 10, "interests": 20}},
+#       {"name": "rules-only", "share": 0, "cf": false}
+#     ]
+#   }
+# 变体由各部分满分（weights，省略的部分与 SCORE_WEIGHTS 相同）和规则开关（cf：是否混合协同过滤）组成；
+# share是分流比例，为0的是影子变体，只计算和记录，不展示给用户。
+# 各部分得分和协同过滤得分只算一次，每个变体的总分只是按自己的权重缩放后求和，
+# 多一个变体只多几次逐元素运算。
+#
+# 每次展示推荐记一条 experiment_exposure 事件，带上所有变体的前几名；结果是同一会话
+# （链接中的uid）之后的 niche_progress 事件。离线汇总：
+#   python experiments.py report
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+
+from cf_model import PROGRESS_EVENT, get_cf_model
+from event_log import EVENT_LOG_DIR, iter_events
+from scoring import SCORE_WEIGHTS, blend_scores, blend_totals, rank_niches, score_breakdown_batch
+
+logger = logging.getLogger(__name__)
+
+EXPERIMENT_PATH = os.getenv("EXPERIMENT_PATH", "experiment.json")
+
+EXPOSURE_EVENT = "experiment_exposure"
+
+# 分桶数，share按这个粒度折算
+BUCKETS = 10000
+
+# 曝光事件中每个变体记录的前几名
+EXPOSURE_TOP_K = 3
+
+COMPONENTS = tuple(SCORE_WEIGHTS)
+
+
+@dataclass(frozen=True)
+class Variant:
+    name: str
+    share: float
+    # 各部分满分，顺序与 COMPONENTS 一致
+    weights: tuple
+    cf: bool = True
+
+
+@dataclass(frozen=True)
+class Experiment:
+    name: str
+    variants: tuple
+
+    def assign(self, unit):
+        """会话分到的变体：同一实验中同一unit总是落在同一个桶"""
+        total = sum(variant.share for variant in self.variants)
+        if total <= 0:
+            return self.variants[0]
+        point = bucket_of(self.name, unit) * total / BUCKETS
+        served = [variant for variant in self.variants if variant.share > 0]
+        for variant in served:
+            point -= variant.share
+            if point < 0:
+                return variant
+        return served[-1]
+
+
+def bucket_of(experiment_name, unit):
+    """unit在实验中的桶号，0到BUCKETS-1；实验名参与哈希，不同实验的分组互不相关"""
+    digest = hashlib.sha256(f"{experiment_name}:{unit}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % BUCKETS
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+def parse_experiment(payload):
+    """把实验JSON转成Experiment，结构不对时抛出ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("实验定义必须是JSON对象")
+    name = payload.get("name")
+    variants = payload.get("variants")
+    if not isinstance(name, str) or not name:
+        raise ValueError("实验必须有名称")
+    if not isinstance(variants, list) or not variants:
+        raise ValueError(f"{name}：至少需要一个变体")
+    problems, parsed = [], []
+    for i, item in enumerate(variants):
+        if not isinstance(item, dict) or not isinstance(item.get("name"), str) or not item.get("name"):
+            problems.append(f"第{i + 1}个变体必须是带名称的对象")
+            continue
+        weights = item.get("weights", {})
+        if not isinstance(weights, dict):
+            problems.append(f"{item['name']}：weights必须是对象")
+            continue
+        for component, value in weights.items():
+            if component not in SCORE_WEIGHTS:
+                problems.append(f"{item['name']}：未知的得分部分 {component}")
+            elif not _number(value):
+                problems.append(f"{item['name']}：{component} 必须是非负数")
+        share = item.get("share", 0)
+        if not _number(share):
+            problems.append(f"{item['name']}：share必须是非负数")
+        if not isinstance(item.get("cf", True), bool):
+            problems.append(f"{item['name']}：cf必须是true或false")
+        parsed.append(Variant(
+            name=item["name"],
+            share=share,
+            weights=tuple(weights.get(component, SCORE_WEIGHTS[component]) for component in COMPONENTS),
+            cf=item.get("cf", True),
+        ))
+    names = [variant.name for variant in parsed]
+    if len(set(names)) != len(names):
+        problems.append("变体名称不能重复")
+    if problems:
+        raise ValueError(f"{name}：实验定义有误：" + "；".join(problems))
+    return Experiment(name=name, variants=tuple(parsed))
+
+
+def load_experiment(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_experiment(json.load(f))
+
+
+def score_variants_batch(profiles, catalog, variants):
+    """一批画像在各变体下的总分，返回 (总分, 列对应的利基名称)，总分形状为 (画像数, 列数, 变体数)
+
+    与 score_feasible_batch 一样先按硬性条件预筛选，不可行的位置是-inf。
+    权重与 SCORE_WEIGHTS 相同且开启cf的变体，得分与 rank_niches 完全一致。
+    """
+    feasible = catalog.constraint_index.feasible_mask(profiles)
+    columns = None
+    names = catalog.names
+    if feasible is not None:
+        columns = np.flatnonzero(feasible.any(axis=0))
+        feasible = feasible[:, columns]
+        names = [catalog.names[column] for column in columns.tolist()]
+    breakdown = score_breakdown_batch(profiles, catalog, columns)
+
+    # 按与total相同的顺序累加，缩放系数为1的变体结果逐位相同
+    scales = np.array(
+        [[weight / SCORE_WEIGHTS[component] for component, weight in zip(COMPONENTS, variant.weights)]
+         for variant in variants]
+    )
+    totals = breakdown[COMPONENTS[0]][..., None] * scales[:, 0]
+    for i, component in enumerate(COMPONENTS[1:], 1):
+        totals = totals + breakdown[component][..., None] * scales[:, i]
+
+    blended = np.array([variant.cf for variant in variants])
+    model = get_cf_model()
+    if model is not None and blended.any():
+        learned, known = model.score_batch(profiles, names)
+        totals = np.where(known[..., None] & blended, blend_scores(totals, learned[..., None]), totals)
+    if feasible is not None:
+        totals = np.where(feasible[..., None], totals, -np.inf)
+    return totals, names
+
+
+def served_totals(breakdown, profiles, names, variant=None):
+    """把各部分得分按变体的权重和规则开关合成展示用的总分，形状为 (画像数, len(names))
+
+    breakdown的各部分可以按画像广播；variant为None时是当前规则，与 rank_niches 的总分逐位相同。
+    """
+    weights = tuple(SCORE_WEIGHTS.values()) if variant is None else variant.weights
+    scales = [weight / SCORE_WEIGHTS[component] for component, weight in zip(COMPONENTS, weights)]
+    # 按与total相同的顺序累加
+    totals = breakdown[COMPONENTS[0]] * scales[0]
+    for component, scale in zip(COMPONENTS[1:], scales[1:]):
+        totals = totals + breakdown[component] * scale
+    totals = np.broadcast_to(totals, (len(profiles), len(names)))
+    if variant is None or variant.cf:
+        totals = blend_totals(totals, profiles, names)
+    return totals
+
+
+def rank_variants(user_profile, catalog, variants):
+    """各变体下的排名 {变体名称: [(利基名称, 匹配度)]}，排序规则与 rank_niches 相同"""
+    totals, names = score_variants_batch([user_profile], catalog, variants)
+    rankings = {}
+    for i, variant in enumerate(variants):
+        ranked = [
+            (name, round(total, 1))
+            for name, total in zip(names, totals[0, :, i].tolist()) if total != -np.inf
+        ]
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        rankings[variant.name] = ranked
+    return rankings
+
+
+_experiment = None
+_experiment_mtime = None
+_experiment_lock = threading.Lock()
+
+
+def get_experiment():
+    """当前进行中的实验，定义文件更新后自动重新加载；没有实验或定义有误时返回None"""
+    global _experiment, _experiment_mtime
+    try:
+        mtime = os.stat(EXPERIMENT_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if mtime != _experiment_mtime:
+        with _experiment_lock:
+            if mtime != _experiment_mtime:
+                try:
+                    _experiment = load_experiment(EXPERIMENT_PATH)
+                except (OSError, ValueError):
+                    logger.exception("加载实验定义失败，使用当前评分规则")
+                    _experiment = None
+                _experiment_mtime = mtime
+    return _experiment
+
+
+def assigned_variant(unit):
+    """会话在当前实验中分到的变体，没有实验时返回None"""
+    experiment = get_experiment()
+    return None if experiment is None else experiment.assign(unit)
+
+
+def serve_ranking(user_profile, catalog, unit):
+    """展示给该会话的排名和对应的曝光记录；没有实验时就是 rank_niches 的结果，曝光记录为None"""
+    experiment = get_experiment()
+    if experiment is None:
+        return rank_niches(user_profile, catalog), None
+    variant = experiment.assign(unit)
+    rankings = rank_variants(user_profile, catalog, experiment.variants)
+    exposure = {
+        "experiment": experiment.name,
+        "unit": unit,
+        "variant": variant.name,
+        "profile": user_profile,
+        "catalog_version": catalog.version,
+        "rankings": {
+            name: [niche for niche, _ in ranked[:EXPOSURE_TOP_K]] for name, ranked in rankings.items()
+        },
+    }
+    return rankings[variant.name], exposure
+
+
+def summarize(events):
+    """按实验和变体汇总曝光与结果
+
+    返回 {实验: {变体: 统计}}。served/progressed/gain只统计分到该变体、真正看到其排名的会话；
+    hit_rate对所有变体（包括影子变体）计算：有进度的会话中，推进的方向出现在该变体前几名的比例。
+    看到的排名会影响用户的选择，展示中的变体的hit_rate偏高，只宜在影子变体之间比较。
+    """
+    exposures = {}
+    units = defaultdict(set)
+    outcomes = defaultdict(lambda: defaultdict(float))
+    for event in events:
+        data = event.get("data", {})
+        if event.get("type") == EXPOSURE_EVENT:
+            key = (data["experiment"], data["unit"])
+            # 同一会话以第一次曝光为准，只统计之后的进度
+            if key not in exposures:
+                exposures[key] = data
+                units[data["unit"]].add(data["experiment"])
+        elif event.get("type") == PROGRESS_EVENT and data.get("unit") in units:
+            for experiment in units[data["unit"]]:
+                outcomes[experiment, data["unit"]][data["niche"]] += data["gain"]
+
+    stats = defaultdict(lambda: defaultdict(lambda: {"served": 0, "progressed": 0, "gain": 0.0, "hits": 0}))
+    for key, exposure in exposures.items():
+        progressed = {niche for niche, gain in outcomes.get(key, {}).items() if gain > 0}
+        served = stats[exposure["experiment"]][exposure["variant"]]
+        served["served"] += 1
+        served["gain"] += sum(max(gain, 0) for gain in outcomes.get(key, {}).values())
+        if not progressed:
+            continue
+        served["progressed"] += 1
+        for name, top in exposure["rankings"].items():
+            stats[exposure["experiment"]][name]["hits"] += bool(progressed & set(top))
+
+    totals = {}
+    for experiment, variants in stats.items():
+        progressed_units = sum(variant["progressed"] for variant in variants.values())
+        totals[experiment] = {
+            name: {
+                "served": variant["served"],
+                "progressed": variant["progressed"],
+                "mean_gain": variant["gain"] / variant["served"] if variant["served"] else 0.0,
+                "hit_rate": variant["hits"] / progressed_units if progressed_units else 0.0,
+            }
+            for name, variant in variants.items()
+        }
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="汇总评分规则A/B实验的曝光和结果")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--dir", default=EVENT_LOG_DIR, help="事件日志目录")
+    args = parser.parse_args()
+
+    report = summarize(iter_events(args.dir, types={EXPOSURE_EVENT, PROGRESS_EVENT}))
+    if not report:
+        print("还没有实验曝光记录")
+    for experiment, variants in report.items():
+        print(f"实验 {experiment}")
+        for name, variant in variants.items():
+            print(
+                f"  {name}: 曝光 {variant['served']}，有进度 {variant['progressed']}，"
+                f"人均进度 {variant['mean_gain']:.3f}，前{EXPOSURE_TOP_K}名命中率 {variant['hit_rate']:.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
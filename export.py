@@ -0,0 +1,211 @@
+# 推荐结果和行动计划的流式导出（CSV / JSONL / Parquet）
+#
+# 用法：
+#   python export.py assessments.jsonl recommendations.parquet --top-k 3
+#   python export.py assessments.jsonl recommendations.csv.gz
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+
+from action_plan import plan_for_niche
+from scoring import SCORE_WEIGHTS, iter_scores, micro_batches
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+# 每次写出的用户数，内存占用只与它有关
+EXPORT_CHUNK_SIZE = 5000
+
+# 表格格式（CSV / Parquet）的列，每行是一个用户的一个推荐方向
+EXPORT_COLUMNS = ["profile_id", "rank", "niche", "score"] + [
+    f"{component}_score" for component in SCORE_WEIGHTS
+] + ["action_plan"]
+
+
+def detect_format(path):
+    """根据文件名判断导出格式和是否gzip压缩"""
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    for fmt in EXPORT_FORMATS:
+        if name.endswith(f".{fmt}"):
+            return fmt, compressed
+    raise ValueError(f"无法从文件名判断导出格式：{path}")
+
+
+def _profile_id(profile, position):
+    profile_id = profile.get("id", profile.get("profile_id"))
+    return str(position if profile_id is None else profile_id)
+
+
+def iter_export_records(profiles, catalog=None, top_k=3):
+    """逐个产出用户的导出记录：推荐列表、各部分得分和最佳方向的行动计划"""
+    if catalog is None:
+        from refresh import get_snapshot
+        catalog = get_snapshot().catalog
+    for position, (profile, ranked) in enumerate(iter_scores(profiles, catalog, top_k)):
+        # 没有满足硬性条件的方向时推荐列表为空，也没有行动计划
+        yield {
+            "profile_id": _profile_id(profile, position),
+            "catalog_version": catalog.version,
+            "recommendations": ranked,
+            "action_plan": plan_for_niche(ranked[0]["niche"], catalog).to_dict() if ranked else None,
+        }
+
+
+def _table_rows(record):
+    plan = json.dumps(record["action_plan"], ensure_ascii=False)
+    for rank, rec in enumerate(record["recommendations"], 1):
+        row = {
+            "profile_id": record["profile_id"],
+            "rank": rank,
+            "niche": rec["niche"],
+            "score": rec["score"],
+            "action_plan": plan if rank == 1 else "",
+        }
+        for component, value in rec["breakdown"].items():
+            row[f"{component}_score"] = value
+        yield row
+
+
+class _TextWriter:
+    def __init__(self, path, compressed):
+        raw = gzip.open(path, "wb") if compressed else open(path, "wb")
+        self.stream = io.TextIOWrapper(raw, encoding=self.encoding, newline="")
+
+    def close(self):
+        self.stream.close()
+
+
+class _CSVWriter(_TextWriter):
+    # 带BOM，方便Excel直接打开中文
+    encoding = "utf-8-sig"
+
+    def __init__(self, path, compressed):
+        super().__init__(path, compressed)
+        self.writer = csv.DictWriter(self.stream, fieldnames=EXPORT_COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, records):
+        for record in records:
+            self.writer.writerows(_table_rows(record))
+
+
+class _JSONLWriter(_TextWriter):
+    encoding = "utf-8"
+
+    def write(self, records):
+        self.stream.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+class _ParquetWriter:
+    def __init__(self, path, compressed):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema(
+            [("profile_id", pa.string()), ("rank", pa.int16()), ("niche", pa.string()), ("score", pa.float64())]
+            + [(f"{component}_score", pa.float64()) for component in SCORE_WEIGHTS]
+            + [("action_plan", pa.string())]
+        )
+        # Parquet自带列压缩，每个分块写成一个row group
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, records):
+        rows = [row for record in records for row in _table_rows(record)]
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+_WRITERS = {"csv": _CSVWriter, "jsonl": _JSONLWriter, "parquet": _ParquetWriter}
+
+
+def export_recommendations(profiles, path, fmt=None, top_k=3, catalog=None,
+                           chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """把画像流的推荐结果分块写入文件，返回导出的用户数
+
+    fmt为空时根据文件名判断，.gz结尾的CSV/JSONL使用gzip压缩。
+    progress(已导出用户数) 在每个分块写完后调用。
+    """
+    detected, compressed = detect_format(path) if fmt is None else (fmt, path.lower().endswith(".gz"))
+    if detected not in _WRITERS:
+        raise ValueError(f"不支持的导出格式：{detected}")
+    writer = _WRITERS[detected](path, compressed)
+    exported = 0
+    try:
+        for chunk in micro_batches(iter_export_records(profiles, catalog, top_k), chunk_size):
+            writer.write(chunk)
+            exported += len(chunk)
+            if progress:
+                progress(exported)
+    finally:
+        writer.close()
+    return exported
+
+
+def export_bytes(profiles, fmt, top_k=3, catalog=None):
+    """单个用户或少量用户的导出内容，供页面下载按钮使用"""
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        export_recommendations(profiles, path, fmt, top_k, catalog)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+class ExportJob(threading.Thread):
+    """后台导出任务，页面只轮询进度，不阻塞会话"""
+
+    def __init__(self, profiles, path, fmt=None, top_k=3, catalog=None):
+        super().__init__(name="export", daemon=True)
+        self._export_args = (profiles, path, fmt, top_k, catalog)
+        self.exported = 0
+        self.error = None
+
+    def _progress(self, exported):
+        self.exported = exported
+
+    def run(self):
+        profiles, path, fmt, top_k, catalog = self._export_args
+        try:
+            export_recommendations(profiles, path, fmt, top_k, catalog, progress=self._progress)
+        except Exception as exc:
+            self.error = exc
+
+
+def iter_jsonl(path):
+    """逐行读取JSONL文件中的评估记录"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出推荐结果和30天行动计划")
+    parser.add_argument("assessments", help="每行一个用户画像的JSONL文件（可为.gz）")
+    parser.add_argument("output", help="输出文件：.csv / .jsonl / .parquet，CSV和JSONL可加.gz")
+    parser.add_argument("--top-k", type=int, default=3, help="每个用户导出的推荐数量")
+    args = parser.parse_args()
+
+    from refresh import build_snapshot
+    catalog = build_snapshot(version=1).catalog
+    exported = export_recommendations(
+        iter_jsonl(args.assessments), args.output, top_k=args.top_k, catalog=catalog,
+        progress=lambda n: print(f"\r已导出 {n} 个用户", end="", flush=True),
+    )
+    print(f"\n完成：{exported} 个用户 -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
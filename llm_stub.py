@@ -0,0 +1,110 @@
+# 本地大模型桩服务：实现 /v1/chat/completions 的最小兼容接口，用于联调和测试
+#
+# 用法：
+#   python llm_stub.py --port 8008
+#   OPENAI_BASE_URL=http://127.0.0.1:8008/v1 streamlit run app.py
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_reply(messages):
+    """根据最后一条用户消息生成确定性的回复"""
+    prompt = messages[-1]["content"] if messages else ""
+    niche = ""
+    for line in prompt.splitlines():
+        if line.startswith("推荐方向："):
+            niche = line[len("推荐方向："):].split("（")[0]
+    return f"【桩服务】关于{niche or '该方向'}的建议：1. 先完成基础学习；2. 做一个小项目；3. 收集反馈持续改进。"
+
+
+def _chunks(text, size=4):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests.append(request)
+        text = stub_reply(request.get("messages", []))
+        model = request.get("model", "stub")
+        created = int(time.time())
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+            })
+            return
+
+        # 流式响应使用SSE格式，与官方接口一致
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for piece in list(_chunks(text)) + [None]:
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": piece} if piece else {},
+                    "finish_reason": None if piece else "stop",
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if self.token_delay:
+                time.sleep(self.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def make_server(host="127.0.0.1", port=8008, token_delay=0.0):
+    """创建桩服务（port为0时自动分配端口），server.requests 按顺序记录收到的请求体"""
+    handler = type("Handler", (StubHandler,), {"token_delay": token_delay})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.requests = []
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地大模型桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="每个token之间的延迟（秒）")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.token_delay)
+    print(f"桩服务已启动：http://{args.host}:{server.server_port}/v1")
+    server.serve_forever()
@@ -0,0 +1,93 @@
+# 多语言：评分只使用与语言无关的编译目录，页面展示的文字按语言包替换
+#
+# 语言包是 locales/<语言>.json：
+#   {"messages": {"中文原文": "译文", ...},
+#    "niches": {"利基名称": {"name": "译名", "description": "...", "技能要求": [...], ...}}}
+# 页面文字以中文原文为键，语言包中没有的条目显示原文；中文不需要语言包。
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from catalog import LIST_FIELDS, TEXT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+LOCALE_DIR = os.getenv("LOCALE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales"))
+
+DEFAULT_LOCALE = "zh-CN"
+
+# 可选语言及其在切换菜单中的名称；语言包只有在该语言第一次被使用时才读取
+LOCALES = {"zh-CN": "中文", "en": "English"}
+
+# 语言包可以翻译的利基字段
+NICHE_TEXT_FIELDS = TEXT_FIELDS + LIST_FIELDS
+
+
+@dataclass(frozen=True)
+class LocaleBundle:
+    """一种语言的展示文字，加载后只读，所有会话共用"""
+    locale: str
+    messages: MappingProxyType
+    niches: MappingProxyType
+
+    def text(self, source, **kwargs):
+        """界面文字的译文，没有译文时使用中文原文；kwargs填入文字中的 {占位符}"""
+        translated = self.messages.get(source, source)
+        return translated.format(**kwargs) if kwargs else translated
+
+    def niche_name(self, niche_name):
+        translated = self.niches.get(niche_name)
+        return translated.get("name", niche_name) if translated else niche_name
+
+    def niche(self, niche_name, niche_info):
+        """展示用的利基数据：有译文的文本字段替换成译文，评级等其余字段保持原样"""
+        translated = self.niches.get(niche_name)
+        if not translated:
+            return niche_info
+        return {**niche_info, **{field: translated[field] for field in NICHE_TEXT_FIELDS if field in translated}}
+
+
+def _empty_bundle(locale):
+    return LocaleBundle(locale, MappingProxyType({}), MappingProxyType({}))
+
+
+def load_bundle(locale, directory=LOCALE_DIR):
+    """读取一种语言的语言包，文件不存在时返回空语言包（全部显示原文）"""
+    path = os.path.join(directory, f"{locale}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except FileNotFoundError:
+        return _empty_bundle(locale)
+    return LocaleBundle(
+        locale=locale,
+        messages=MappingProxyType(dict(payload.get("messages", {}))),
+        niches=MappingProxyType({name: dict(info) for name, info in payload.get("niches", {}).items()}),
+    )
+
+
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+
+def get_bundle(locale=DEFAULT_LOCALE):
+    """进程内共享的语言包，第一次使用某种语言时才加载；未知语言按默认语言处理"""
+    if locale not in LOCALES:
+        locale = DEFAULT_LOCALE
+    bundle = _bundles.get(locale)
+    if bundle is None:
+        with _bundles_lock:
+            bundle = _bundles.get(locale)
+            if bundle is None:
+                bundle = _empty_bundle(locale)
+                # 页面原文就是中文，默认语言不读文件
+                if locale != DEFAULT_LOCALE:
+                    try:
+                        bundle = load_bundle(locale)
+                    except (OSError, ValueError):
+                        logger.exception("加载语言包 %s 失败，使用原文", locale)
+                _bundles[locale] = bundle
+    return bundle
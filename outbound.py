@@ -0,0 +1,185 @@
+# 外部调用网关：相同请求合并、令牌桶限流、并发上限和排队指标
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+# 默认限流参数，可按调用方（limit_key）单独配置
+DEFAULT_RATE = float(os.getenv("OUTBOUND_RATE_PER_SEC", "5"))
+DEFAULT_BURST = int(os.getenv("OUTBOUND_BURST", "10"))
+DEFAULT_CONCURRENCY = int(os.getenv("OUTBOUND_CONCURRENCY", "8"))
+
+
+class TokenBucket:
+    """令牌桶：平均速率rate，允许capacity的突发（只在网关事件循环中使用）"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class LimitStats:
+    """单个调用方的计数"""
+    requests: int = 0
+    coalesced: int = 0
+    upstream_calls: int = 0
+    errors: int = 0
+    queued: int = 0
+    active: int = 0
+    max_queued: int = 0
+    total_wait: float = 0.0
+
+
+@dataclass
+class _Limit:
+    bucket: TokenBucket
+    semaphore: asyncio.Semaphore
+    stats: LimitStats = field(default_factory=LimitStats)
+
+
+class OutboundGateway:
+    """所有外部请求的统一出口
+
+    submit() 用请求键合并正在进行中的相同请求，所有等待者共享同一个结果；
+    真正发出的请求先经过令牌桶，再受并发上限约束。
+    协程在网关自己的事件循环线程中执行，任何线程都可以提交。
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, concurrency=DEFAULT_CONCURRENCY):
+        self.defaults = (rate, burst, concurrency)
+        self._settings = {}
+        self._limits = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="outbound-loop", daemon=True)
+        self._thread.start()
+
+    def configure(self, limit_key, rate=None, burst=None, concurrency=None):
+        """为某个调用方设置限流参数（需在首次请求前调用）"""
+        default_rate, default_burst, default_concurrency = self.defaults
+        self._settings[limit_key] = (
+            rate or default_rate, burst or default_burst, concurrency or default_concurrency
+        )
+
+    def _limit(self, limit_key):
+        # 只在事件循环线程中调用，Semaphore需要在所属循环中创建
+        limit = self._limits.get(limit_key)
+        if limit is None:
+            rate, burst, concurrency = self._settings.get(limit_key, self.defaults)
+            limit = _Limit(TokenBucket(rate, burst), asyncio.Semaphore(concurrency))
+            self._limits[limit_key] = limit
+        return limit
+
+    async def _call(self, limit_key, coro_factory):
+        limit = self._limit(limit_key)
+        stats = limit.stats
+        stats.queued += 1
+        stats.max_queued = max(stats.max_queued, stats.queued)
+        enqueued = time.monotonic()
+        started = False
+        try:
+            await limit.bucket.acquire()
+            async with limit.semaphore:
+                stats.queued -= 1
+                stats.active += 1
+                stats.upstream_calls += 1
+                stats.total_wait += time.monotonic() - enqueued
+                started = True
+                try:
+                    return await coro_factory()
+                except Exception:
+                    stats.errors += 1
+                    raise
+                finally:
+                    stats.active -= 1
+        finally:
+            if not started:
+                stats.queued -= 1
+
+    def _forget(self, request_key, future):
+        with self._lock:
+            if self._inflight.get(request_key) is future:
+                del self._inflight[request_key]
+
+    def _count(self, limit_key, coalesced):
+        def update():
+            stats = self._limit(limit_key).stats
+            stats.requests += 1
+            stats.coalesced += coalesced
+        self._loop.call_soon_threadsafe(update)
+
+    def submit(self, request_key, coro_factory, limit_key="default"):
+        """提交请求，返回 (concurrent.futures.Future, 是否由本次调用实际发出)
+
+        coro_factory 是无参函数，返回要执行的协程；被合并的请求不会调用它。
+        """
+        with self._lock:
+            future = self._inflight.get(request_key)
+            leader = future is None
+            if leader:
+                future = asyncio.run_coroutine_threadsafe(
+                    self._call(limit_key, coro_factory), self._loop
+                )
+                self._inflight[request_key] = future
+        self._count(limit_key, 0 if leader else 1)
+        if leader:
+            future.add_done_callback(lambda f: self._forget(request_key, f))
+        return future, leader
+
+    def call(self, request_key, coro_factory, limit_key="default", timeout=None):
+        """同步调用，阻塞到结果返回"""
+        future, _ = self.submit(request_key, coro_factory, limit_key)
+        return future.result(timeout)
+
+    def metrics(self):
+        """各调用方的请求数、合并数、排队深度等指标"""
+        async def collect():
+            result = {}
+            for limit_key, limit in self._limits.items():
+                stats = limit.stats
+                result[limit_key] = {
+                    "requests": stats.requests,
+                    "coalesced": stats.coalesced,
+                    "upstream_calls": stats.upstream_calls,
+                    "errors": stats.errors,
+                    "queue_depth": stats.queued,
+                    "active": stats.active,
+                    "max_queue_depth": stats.max_queued,
+                    "avg_wait_ms": round(stats.total_wait / stats.upstream_calls * 1000, 2)
+                    if stats.upstream_calls else 0.0,
+                }
+            with self._lock:
+                result["_inflight"] = len(self._inflight)
+            return result
+        return asyncio.run_coroutine_threadsafe(collect(), self._loop).result()
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """进程内共享的网关，所有会话的外部请求都经过它"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = OutboundGateway()
+        return _gateway
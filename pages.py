@@ -2,7 +2,148 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from data import AI_NICHES
+from refresh import get_snapshot
+from advice import advice_enabled, fallback_advice, get_advice_generator
+from diversity import diversify_ranking
+from scoring import profile_key, ranking_version
+from export import export_bytes
+from action_plan import action_plan_for, localize_plan
+from skill_gap import skill_uplift
+from cohorts import COHORT_FIELDS, COHORT_MULTI_FIELDS, get_cohort_stats
+from cf_model import PROGRESS_EVENT
+from event_log import get_event_log
+from experiments import EXPOSURE_EVENT, assigned_variant, serve_ranking
+from progress import get_progress_tracker, new_user_id
+from tenants import current_catalog
+from locales import DEFAULT_LOCALE, get_bundle
+from static_charts import bubble_svg, line_svg, radar_svg
+
+
+def _page_catalog():
+    """当前页面使用的目录，链接带tenant参数时叠加该租户的改动"""
+    return current_catalog(st.query_params.get("tenant"))
+
+
+def locale_bundle():
+    """当前会话所选语言的语言包"""
+    return get_bundle(st.session_state.get("locale", DEFAULT_LOCALE))
+
+
+def tr(text, **kwargs):
+    """当前语言的界面文字，语言包中没有时显示中文原文"""
+    return locale_bundle().text(text, **kwargs)
+
+
+def _lite_mode():
+    """轻量模式下图表用服务端渲染好的SVG，不加载交互式图表"""
+    return st.session_state.get("lite_mode", False)
+
+
+@st.cache_data(max_entries=64)
+def _niche_matrix_figure(version, locale, _catalog):
+    """利基机会矩阵图，按数据版本和语言缓存"""
+    bundle = get_bundle(locale)
+    frame = _catalog.analysis_frame.assign(
+        利基市场=[bundle.niche_name(name) for name in _catalog.analysis_frame["利基市场"]],
+        投资成本=[bundle.text(level) for level in _catalog.analysis_frame["投资成本"]],
+    )
+    fig = px.scatter(
+        frame, 
+        x="竞争程度数值", 
+        y="市场需求数值",
+        size="收入潜力数值",
+        color="投资成本",
+        hover_name="利基市场",
+        title=bundle.text("AI副业机会分析矩阵"),
+        labels={field: bundle.text(label) for field, label in {
+            "竞争程度数值": "竞争程度", "市场需求数值": "市场需求", "收入潜力数值": "收入潜力", "投资成本": "投资成本"
+        }.items()}
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+@st.cache_data(max_entries=64)
+def _niche_matrix_svg(version, locale, _catalog):
+    """轻量模式的利基机会矩阵，每个数据版本和语言只渲染一次"""
+    bundle = get_bundle(locale)
+    frame = _catalog.analysis_frame
+    points = [
+        (bundle.niche_name(row["利基市场"]), row["竞争程度数值"], row["市场需求数值"],
+         row["收入潜力数值"], bundle.text(row["投资成本"]))
+        for row in frame.to_dict("records")
+    ]
+    return bubble_svg(points, bundle.text("AI副业机会分析矩阵"), bundle.text("竞争程度"), bundle.text("市场需求"))
+
+
+@st.cache_data(max_entries=8)
+def _market_trends_svg(version, locale, _snapshot):
+    """轻量模式的市场趋势图，每个数据版本和语言只渲染一次"""
+    bundle = get_bundle(locale)
+    trends = _snapshot.trends
+    series = {bundle.niche_name(niche): trends[niche].tolist() for niche in trends.columns.drop("月份")}
+    return line_svg(
+        trends["月份"].tolist(), series, bundle.text("AI副业市场趋势（2024年上半年）"),
+        bundle.text("月份"), bundle.text("市场需求指数"),
+    )
+
+
+@st.cache_data(max_entries=256)
+def _radar_svg(categories, scores, locale):
+    """轻量模式的前3名匹配度雷达图，相同的推荐结果只渲染一次"""
+    return radar_svg(list(categories), list(scores), get_bundle(locale).text("前3个推荐方向的匹配度分析"))
+
+
+@st.cache_data(max_entries=8)
+def _market_trends_figure(version, locale, _snapshot):
+    """市场趋势折线图，按数据版本和语言缓存"""
+    bundle = get_bundle(locale)
+    df_trends = _snapshot.trends
+    fig = go.Figure()
+    
+    for niche in df_trends.columns.drop("月份"):
+        fig.add_trace(go.Scatter(
+            x=df_trends["月份"],
+            y=df_trends[niche],
+            mode='lines+markers',
+            name=bundle.niche_name(niche),
+            line=dict(width=3)
+        ))
+    
+    fig.update_layout(
+        title=bundle.text("AI副业市场趋势（2024年上半年）"),
+        xaxis_title=bundle.text("月份"),
+        yaxis_title=bundle.text("市场需求指数"),
+        height=500,
+        hovermode='x unified'
+    )
+    return fig
+
+
+@st.cache_data(max_entries=64)
+def _plan_export(key, version, fmt, _user_profile, _catalog):
+    """单个用户的导出文件，按画像哈希和数据版本缓存，拖动进度条时不重新生成"""
+    return export_bytes([_user_profile], fmt, catalog=_catalog)
+
+
+def card_html(title, items, css="card", heading="h4", ordered=False):
+    """静态说明卡片，title和items是已经翻译好的文字（可以包含HTML标签）"""
+    tag = "ol" if ordered else "ul"
+    entries = "".join(f"<li>{item}</li>" for item in items)
+    return f"""
+        <div class="{css}">
+            <{heading}>{title}</{heading}>
+            <{tag}>{entries}</{tag}>
+        </div>
+        """
+
+
+def _growth_list_html(title, niches, growth):
+    bundle = locale_bundle()
+    return card_html(title, [
+        f"<strong>{bundle.niche_name(niche)}</strong> - {bundle.text('增长{percent}%', percent=growth[niche])}"
+        for niche in niches
+    ])
 
 def show_homepage():
     st.markdown('<h2 class="sub-header">欢迎使用AI副业利基市场确定工具</h2>', unsafe_allow_html=True)
@@ -50,210 +191,222 @@ def show_homepage():
     if st.button("🚀 开始我的AI副业之旅", type="primary", use_container_width=True):
         st.info("请在左侧菜单选择'个人评估'开始你的AI副业探索之旅。")
 
+def _search_niches(catalog, query, fields=None):
+    """按搜索词筛选并排序利基市场，返回 [(利基名称, 命中条目)]"""
+    if not query:
+        return [(niche_name, ()) for niche_name in catalog.names]
+    results = []
+    for hit in catalog.search_index.search(query):
+        matches = tuple(m for m in hit.matches if fields is None or m[0] in fields)
+        if fields is None or matches:
+            results.append((hit.niche_name, matches))
+    if not results:
+        st.info(tr("没有找到相关内容，换个关键词试试。"))
+    return results
+
 def show_niche_analysis():
-    st.markdown('<h2 class="sub-header">🎯 AI副业利基市场分析</h2>', unsafe_allow_html=True)
-    
-    # 定义评级映射
-    level_map = {"极低": 0.5, "低": 1, "中等": 2, "高": 3}
-    
-    # 创建数据框用于可视化
-    niches_data = []
-    for niche_name, niche_info in AI_NICHES.items():
-        niches_data.append({
-            "利基市场": niche_name,
-            "市场需求": niche_info["市场需求"],
-            "市场需求数值": level_map.get(niche_info["市场需求"], 2),
-            "竞争程度": niche_info["竞争程度"],
-            "竞争程度数值": level_map.get(niche_info["竞争程度"], 2),
-            "收入潜力": niche_info["收入潜力"],
-            "收入潜力数值": level_map.get(niche_info["收入潜力"], 2),
-            "投资成本": niche_info["投资成本"],
-            "投资成本数值": level_map.get(niche_info["投资成本"], 2),
-            "时间投入": niche_info["时间投入"],
-            "时间投入数值": level_map.get(niche_info["时间投入"], 2)
-        })
+    st.markdown(f'<h2 class="sub-header">{tr("🎯 AI副业利基市场分析")}</h2>', unsafe_allow_html=True)
     
-    df = pd.DataFrame(niches_data)
-    
-    # 市场需求 vs 竞争程度散点图，size用收入潜力数值
-    fig1 = px.scatter(
-        df, 
-        x="竞争程度数值", 
-        y="市场需求数值",
-        size="收入潜力数值",
-        color="投资成本",
-        hover_name="利基市场",
-        title="AI副业机会分析矩阵",
-        labels={"竞争程度数值": "竞争程度", "市场需求数值": "市场需求", "收入潜力数值": "收入潜力", "投资成本": "投资成本"}
-    )
-    fig1.update_layout(height=500)
-    st.plotly_chart(fig1, use_container_width=True)
+    # 只读取当前快照，渲染时不做加载和计算
+    catalog = _page_catalog()
+    bundle = locale_bundle()
+    if _lite_mode():
+        st.image(_niche_matrix_svg(catalog.version, bundle.locale, catalog), use_container_width=True)
+    else:
+        st.plotly_chart(_niche_matrix_figure(catalog.version, bundle.locale, catalog), use_container_width=True)
     
     # 详细分析表格
-    st.markdown("### 详细市场分析")
+    st.markdown(tr("### 详细市场分析"))
+    
+    query = st.text_input(tr("🔍 搜索利基市场"), placeholder=tr("输入关键词，如：视频、Python、学生"))
     
-    for niche_name, niche_info in AI_NICHES.items():
-        with st.expander(f"📊 {niche_name}"):
+    for niche_name, _ in _search_niches(catalog, query):
+        niche_info = bundle.niche(niche_name, catalog.niches[niche_name])
+        with st.expander(f"📊 {bundle.niche_name(niche_name)}", expanded=bool(query)):
             col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown(f"**描述：** {niche_info['description']}")
-                st.markdown(f"**技能要求：** {', '.join(niche_info['技能要求'])}")
-                st.markdown(f"**适合人群：** {', '.join(niche_info['适合人群'])}")
+                st.markdown(f"**{tr('描述：')}** {niche_info['description']}")
+                st.markdown(f"**{tr('技能要求：')}** {', '.join(tr(skill) for skill in niche_info['技能要求'])}")
+                st.markdown(f"**{tr('适合人群：')}** {', '.join(niche_info['适合人群'])}")
                 
             with col2:
                 metrics_col1, metrics_col2 = st.columns(2)
                 with metrics_col1:
-                    st.metric("市场需求", niche_info["市场需求"])
-                    st.metric("收入潜力", niche_info["收入潜力"])
+                    st.metric(tr("市场需求"), tr(niche_info["市场需求"]))
+                    st.metric(tr("收入潜力"), tr(niche_info["收入潜力"]))
                 with metrics_col2:
-                    st.metric("竞争程度", niche_info["竞争程度"])
-                    st.metric("投资成本", niche_info["投资成本"])
+                    st.metric(tr("竞争程度"), tr(niche_info["竞争程度"]))
+                    st.metric(tr("投资成本"), tr(niche_info["投资成本"]))
             
-            st.markdown("**推荐工具：**")
+            st.markdown(f"**{tr('推荐工具：')}**")
             for tool in niche_info["工具推荐"]:
                 st.markdown(f"- {tool}")
             
-            st.markdown("**启动步骤：**")
+            st.markdown(f"**{tr('启动步骤：')}**")
             for i, step in enumerate(niche_info["启动步骤"], 1):
                 st.markdown(f"{i}. {step}")
 
 def show_market_trends():
-    st.markdown('<h2 class="sub-header">📈 AI副业市场趋势分析</h2>', unsafe_allow_html=True)
-    
-    # 模拟市场趋势数据
-    trends_data = {
-        "月份": ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"],
-        "内容创作": [100, 120, 140, 160, 180, 200],
-        "AI应用开发": [80, 100, 130, 170, 220, 280],
-        "AI咨询服务": [60, 80, 110, 150, 200, 250],
-        "AI教育培训": [90, 110, 130, 150, 170, 190],
-        "AI数据标注": [70, 75, 80, 85, 90, 95],
-        "AI产品代理": [50, 70, 90, 120, 150, 180]
-    }
-    
-    df_trends = pd.DataFrame(trends_data)
-    
-    # 趋势线图
-    fig = go.Figure()
-    
-    for niche in ["内容创作", "AI应用开发", "AI咨询服务", "AI教育培训", "AI数据标注", "AI产品代理"]:
-        fig.add_trace(go.Scatter(
-            x=df_trends["月份"],
-            y=df_trends[niche],
-            mode='lines+markers',
-            name=niche,
-            line=dict(width=3)
-        ))
+    st.markdown(f'<h2 class="sub-header">{tr("📈 AI副业市场趋势分析")}</h2>', unsafe_allow_html=True)
     
-    fig.update_layout(
-        title="AI副业市场趋势（2024年上半年）",
-        xaxis_title="月份",
-        yaxis_title="市场需求指数",
-        height=500,
-        hovermode='x unified'
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    snapshot = get_snapshot()
+    bundle = locale_bundle()
+    locale = bundle.locale
+    if _lite_mode():
+        st.image(_market_trends_svg(snapshot.version, locale, snapshot), use_container_width=True)
+    else:
+        st.plotly_chart(_market_trends_figure(snapshot.version, locale, snapshot), use_container_width=True)
     
     # 市场洞察
-    st.markdown("### 📊 市场洞察")
+    st.markdown(tr("### 📊 市场洞察"))
     
+    insights = snapshot.insights
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("""
-        <div class="card">
-            <h4>🔥 快速增长领域</h4>
-            <ul>
-                <li><strong>AI应用开发</strong> - 增长250%</li>
-                <li><strong>AI咨询服务</strong> - 增长317%</li>
-                <li><strong>AI产品代理</strong> - 增长260%</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_growth_list_html(tr("🔥 快速增长领域"), insights["fast"], insights["growth"]), unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
-        <div class="card">
-            <h4>📈 稳定增长领域</h4>
-            <ul>
-                <li><strong>内容创作</strong> - 增长100%</li>
-                <li><strong>AI教育培训</strong> - 增长111%</li>
-                <li><strong>AI数据标注</strong> - 增长36%</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_growth_list_html(tr("📈 稳定增长领域"), insights["stable"], insights["growth"]), unsafe_allow_html=True)
     
     # 未来预测
-    st.markdown("### 🔮 未来趋势预测")
-    st.markdown("""
-    <div class="highlight">
-        <h4>2024年下半年预测</h4>
-        <ul>
-            <li><strong>AI应用开发</strong>将继续保持高速增长，预计增长300%</li>
-            <li><strong>AI咨询服务</strong>需求将进一步扩大，企业AI转型需求激增</li>
-            <li><strong>内容创作</strong>将更加智能化，AI辅助创作工具普及</li>
-            <li><strong>教育培训</strong>市场将出现更多细分领域</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(tr("### 🔮 未来趋势预测"))
+    st.markdown(card_html(tr("2024年下半年预测"), [
+        tr("{niche}将继续保持高速增长，预计增长300%", niche=f"<strong>{bundle.niche_name('AI应用开发')}</strong>"),
+        tr("{niche}需求将进一步扩大，企业AI转型需求激增", niche=f"<strong>{bundle.niche_name('AI咨询服务')}</strong>"),
+        tr("{niche}将更加智能化，AI辅助创作工具普及", niche=f"<strong>{bundle.niche_name('内容创作')}</strong>"),
+        tr("{niche}市场将出现更多细分领域", niche=f"<strong>{tr('教育培训')}</strong>"),
+    ], css="highlight"), unsafe_allow_html=True)
 
 def show_personalized_recommendations():
-    st.markdown('<h2 class="sub-header">💡 个性化推荐</h2>', unsafe_allow_html=True)
+    st.markdown(f'<h2 class="sub-header">{tr("💡 个性化推荐")}</h2>', unsafe_allow_html=True)
     
     if "user_profile" not in st.session_state or not st.session_state.user_profile:
-        st.warning("⚠️ 请先完成个人评估以获得个性化推荐")
-        if st.button("去完成评估"):
+        st.warning(tr("⚠️ 请先完成个人评估以获得个性化推荐"))
+        if st.button(tr("去完成评估")):
             st.session_state.current_page = "assessment"
             st.rerun()
         return
     
     user_profile = st.session_state.user_profile
-    
-    # 计算匹配度
+    catalog = _page_catalog()
+    bundle = locale_bundle()
+    
+    # 前3名默认按MMR多样化，避免几个几乎相同的子方向占满
+    diversify = st.checkbox(tr("🎨 前3名优先展示不同类型的方向"), value=True, key="diversify")
+    ranked, exposure = served_ranking(user_profile, catalog, diversify)
+    if exposure is not None:
+        # 页面每次交互都会重跑，同一会话对同一画像、目录版本和变体只记一次曝光
+        exposure_key = (exposure["experiment"], exposure["variant"], profile_key(user_profile), catalog.version)
+        if st.session_state.get("experiment_exposure") != exposure_key:
+            get_event_log().append(EXPOSURE_EVENT, exposure)
+            st.session_state.experiment_exposure = exposure_key
     recommendations = []
-    for niche_name, niche_info in AI_NICHES.items():
-        score = calculate_compatibility_score(user_profile, niche_info)
+    for niche_name, score in ranked:
+        niche_info = catalog.niches[niche_name]
         recommendations.append({
             "利基市场": niche_name,
+            "名称": bundle.niche_name(niche_name),
             "匹配度": score,
-            "描述": niche_info["description"],
+            "描述": bundle.niche(niche_name, niche_info)["description"],
             "技能要求": niche_info["技能要求"],
             "收入潜力": niche_info["收入潜力"],
-            "投资成本": niche_info["投资成本"]
+            "投资成本": niche_info["投资成本"],
+            "info": niche_info
         })
     
-    # 按匹配度排序
-    recommendations.sort(key=lambda x: x["匹配度"], reverse=True)
+    if not recommendations:
+        st.warning(tr("⚠️ 没有同时满足所有硬性条件的方向，请在个人评估中放宽条件"))
+        return
     
     # 显示推荐结果
-    st.markdown("### 🎯 为你推荐的AI副业方向")
+    st.markdown(tr("### 🎯 为你推荐的AI副业方向"))
+    excluded = len(catalog.names) - len(recommendations)
+    if excluded:
+        st.caption(tr("已按你设置的硬性条件排除 {count} 个方向", count=excluded))
 
     # 输出一句最优推荐语
     best_rec = recommendations[0]
-    st.success(f"根据你的兴趣和技能，最适合你的AI副业方向是：{best_rec['利基市场']}。")
+    st.success(tr("根据你的兴趣和技能，最适合你的AI副业方向是：{niche}。", niche=best_rec["名称"]))
 
     # 支付宝二维码和感谢文案
     st.markdown("<div style='text-align:center;margin:2rem 0;'>", unsafe_allow_html=True)
-    st.image("alipay_qr.png", caption="支付宝扫码支持作者", width=220)
-    st.markdown("<p style='text-align:center;color:#1f77b4;'>如果本工具对你有帮助，欢迎扫码打赏支持！</p>", unsafe_allow_html=True)
+    st.image("alipay_qr.png", caption=tr("支付宝扫码支持作者"), width=220)
+    st.markdown(f"<p style='text-align:center;color:#1f77b4;'>{tr('如果本工具对你有帮助，欢迎扫码打赏支持！')}</p>", unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
-    st.markdown("前3个推荐方向的匹配度分析")
+    st.markdown(tr("前3个推荐方向的匹配度分析"))
 
     # 雷达图
     top_3 = recommendations[:3]
-    categories = [rec["利基市场"] for rec in top_3]
+    categories = [rec["名称"] for rec in top_3]
     scores = [rec["匹配度"] for rec in top_3]
     
+    if _lite_mode():
+        st.image(_radar_svg(tuple(categories), tuple(scores), locale_bundle().locale))
+    else:
+        _radar_chart(categories, scores)
+    
+    # 前3个方向的建议一次性并发请求，逐个流式展示
+    advice_streams = None
+    if advice_enabled():
+        advice_streams = get_advice_generator().stream_batch(user_profile, top_3, locale_bundle())
+    
+    # 详细推荐
+    for i, rec in enumerate(recommendations[:3], 1):
+        label = tr("🥇 第{rank}名：{niche} (匹配度: {score}%)", rank=i, niche=rec["名称"], score=rec["匹配度"])
+        with st.expander(label, expanded=i==1):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown(f"**{tr('描述：')}** {rec['描述']}")
+                st.markdown(f"**{tr('收入潜力：')}** {tr(rec['收入潜力'])}")
+                st.markdown(f"**{tr('投资成本：')}** {tr(rec['投资成本'])}")
+                
+            with col2:
+                st.markdown(f"**{tr('所需技能：')}**")
+                for skill in rec['技能要求']:
+                    if skill in user_profile.get('skills', []):
+                        st.markdown(f"✅ {tr(skill)}")
+                    else:
+                        st.markdown(f"❌ {tr(skill)}")
+            
+            # 个性化建议
+            st.markdown(f"**{tr('💡 个性化建议：')}**")
+            if advice_streams:
+                st.write_stream(advice_streams[i - 1])
+            else:
+                level, text = fallback_advice(rec['匹配度'])
+                getattr(st, level)(tr(text))
+    
+    # 下一步学什么：所有未掌握技能的提升一次算出
+    st.markdown(tr("### 🧭 下一步学什么"))
+    variant = assigned_variant(_progress_user_id())
+    uplifts = [item for item in skill_uplift(user_profile, catalog, variant=variant) if item.best_uplift > 0]
+    if not uplifts:
+        st.info(tr("👍 推荐方向需要的技能你都已掌握，可以直接进入行动计划。"))
+    for i, item in enumerate(uplifts[:5], 1):
+        st.markdown(f"**{i}. {tr(item.skill)}**：" + tr(
+            "前3名平均匹配度 +{gain}，对 {count} 个方向有帮助（{niche} +{uplift}）",
+            gain=item.top_k_gain, count=item.benefited,
+            niche=bundle.niche_name(item.best_niche), uplift=item.best_uplift,
+        ))
+        if item.new_entries:
+            st.markdown("　" + tr(
+                "学会后新进入前3名：{niches}", niches="、".join(bundle.niche_name(name) for name in item.new_entries)
+            ))
+
+
+def _radar_chart(categories, scores):
+    """前3名匹配度的交互式雷达图"""
     fig = go.Figure()
     
     fig.add_trace(go.Scatterpolar(
         r=scores,
         theta=categories,
         fill='toself',
-        name='匹配度',
+        name=tr('匹配度'),
         line_color='rgb(32, 201, 151)'
     ))
     
@@ -264,270 +417,241 @@ def show_personalized_recommendations():
                 range=[0, 100]
             )),
         showlegend=False,
-        title="前3个推荐方向的匹配度分析"
+        title=tr("前3个推荐方向的匹配度分析")
     )
     
     st.plotly_chart(fig, use_container_width=True)
-    
-    # 详细推荐
-    for i, rec in enumerate(recommendations[:3], 1):
-        with st.expander(f"🥇 第{i}名：{rec['利基市场']} (匹配度: {rec['匹配度']}%)", expanded=i==1):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown(f"**描述：** {rec['描述']}")
-                st.markdown(f"**收入潜力：** {rec['收入潜力']}")
-                st.markdown(f"**投资成本：** {rec['投资成本']}")
-                
-            with col2:
-                st.markdown("**所需技能：**")
-                for skill in rec['技能要求']:
-                    if skill in user_profile.get('skills', []):
-                        st.markdown(f"✅ {skill}")
-                    else:
-                        st.markdown(f"❌ {skill}")
-            
-            # 个性化建议
-            st.markdown("**💡 个性化建议：**")
-            if rec['匹配度'] >= 80:
-                st.success("🎉 这是一个非常适合你的方向！建议优先考虑。")
-            elif rec['匹配度'] >= 60:
-                st.info("👍 这是一个不错的选择，需要一些技能提升。")
-            else:
-                st.warning("⚠️ 这个方向需要较多准备，建议先学习相关技能。")
+
+
+def served_ranking(user_profile, catalog, diversify=True):
+    """推荐页展示的排名和曝光记录：有进行中的实验时按会话分到的变体排序，diversify时再做多样化重排"""
+    ranked, exposure = serve_ranking(user_profile, catalog, _progress_user_id())
+    if diversify:
+        ranked = diversify_ranking(ranked, catalog)
+    return ranked, exposure
+
+
+def _progress_user_id():
+    """进度按链接中的uid保存，用同一链接再次打开时恢复"""
+    user_id = st.query_params.get("uid")
+    if not user_id or len(user_id) > 64:
+        user_id = new_user_id()
+        st.query_params["uid"] = user_id
+    return user_id
 
 def show_action_plan():
-    st.markdown('<h2 class="sub-header">📋 个性化行动计划</h2>', unsafe_allow_html=True)
+    st.markdown(f'<h2 class="sub-header">{tr("📋 个性化行动计划")}</h2>', unsafe_allow_html=True)
     
     if "user_profile" not in st.session_state or not st.session_state.user_profile:
-        st.warning("⚠️ 请先完成个人评估以获得个性化行动计划")
+        st.warning(tr("⚠️ 请先完成个人评估以获得个性化行动计划"))
         return
     
     user_profile = st.session_state.user_profile
+    catalog = _page_catalog()
     
-    # 获取最佳推荐
-    recommendations = []
-    for niche_name, niche_info in AI_NICHES.items():
-        score = calculate_compatibility_score(user_profile, niche_info)
-        recommendations.append((niche_name, niche_info, score))
-    
-    recommendations.sort(key=lambda x: x[2], reverse=True)
-    best_niche_name, best_niche_info, best_score = recommendations[0]
+    # 计划只在画像或目录版本变化时生成，页面重跑直接复用；推荐方向与推荐页使用同一个实验变体
+    user_id = _progress_user_id()
+    plan = action_plan_for(user_profile, catalog, assigned_variant(user_id))
+    if plan is None:
+        st.warning(tr("⚠️ 没有同时满足所有硬性条件的方向，请在个人评估中放宽条件"))
+        return
+    plan = localize_plan(plan, catalog, locale_bundle())
     
-    st.markdown(f"### 🎯 基于你的评估，推荐方向：{best_niche_name}")
-    st.markdown(f"**匹配度：{best_score}%**")
+    st.markdown(tr("### 🎯 基于你的评估，推荐方向：{niche}", niche=locale_bundle().niche_name(plan.niche)))
+    st.markdown(tr("**匹配度：{score}%**", score=plan.score))
     
     # 30天行动计划
-    st.markdown("### 📅 30天启动行动计划")
-    
-    # 第一周：学习准备
-    with st.expander("📚 第1周：学习准备", expanded=True):
-        st.markdown("**目标：** 掌握基础知识和技能")
-        st.markdown("**具体任务：**")
-        
-        for i, resource in enumerate(best_niche_info["学习资源"], 1):
-            st.markdown(f"{i}. 学习{resource}")
-        
-        st.markdown("**每日时间安排：**")
-        st.markdown("- 工作日：1-2小时学习")
-        st.markdown("- 周末：3-4小时实践")
-        
-        # 进度追踪
-        week1_progress = st.slider("第1周完成度", 0, 100, 0, key="week1")
-        if week1_progress >= 80:
-            st.success("🎉 第1周目标完成！")
-    
-    # 第二周：工具熟悉
-    with st.expander("🛠️ 第2周：工具熟悉"):
-        st.markdown("**目标：** 熟悉相关工具和平台")
-        st.markdown("**具体任务：**")
-        
-        for i, tool in enumerate(best_niche_info["工具推荐"], 1):
-            st.markdown(f"{i}. 注册并试用{tool}")
-        
-        st.markdown("**每日时间安排：**")
-        st.markdown("- 工作日：1小时工具学习")
-        st.markdown("- 周末：2-3小时深度体验")
-        
-        week2_progress = st.slider("第2周完成度", 0, 100, 0, key="week2")
-        if week2_progress >= 80:
-            st.success("🎉 第2周目标完成！")
-    
-    # 第三周：项目实践
-    with st.expander("🚀 第3周：项目实践"):
-        st.markdown("**目标：** 完成第一个小项目")
-        st.markdown("**具体任务：**")
-        
-        for i, step in enumerate(best_niche_info["启动步骤"], 1):
-            st.markdown(f"{i}. {step}")
-        
-        st.markdown("**每日时间安排：**")
-        st.markdown("- 工作日：2小时项目开发")
-        st.markdown("- 周末：4-5小时集中攻关")
-        
-        week3_progress = st.slider("第3周完成度", 0, 100, 0, key="week3")
-        if week3_progress >= 80:
-            st.success("🎉 第3周目标完成！")
-    
-    # 第四周：市场验证
-    with st.expander("📊 第4周：市场验证"):
-        st.markdown("**目标：** 验证市场需求，获得反馈")
-        st.markdown("**具体任务：**")
-        st.markdown("1. 发布作品到相关平台")
-        st.markdown("2. 收集用户反馈")
-        st.markdown("3. 优化产品/服务")
-        st.markdown("4. 制定下一步计划")
-        
-        st.markdown("**每日时间安排：**")
-        st.markdown("- 工作日：1小时反馈收集")
-        st.markdown("- 周末：3小时优化改进")
-        
-        week4_progress = st.slider("第4周完成度", 0, 100, 0, key="week4")
-        if week4_progress >= 80:
-            st.success("🎉 第4周目标完成！")
+    st.markdown(tr("### 📅 30天启动行动计划"))
+    
+    # 进度先从写回缓存恢复；滑块改动只更新内存，由后台线程合并后批量写入
+    tracker = get_progress_tracker()
+    saved = tracker.load(user_id, plan.niche)
+    owner_changed = st.session_state.get("plan_progress_owner") != (user_id, plan.niche)
+    for week in plan.weeks:
+        if owner_changed or f"week{week.week}" not in st.session_state:
+            st.session_state[f"week{week.week}"] = saved.get(week.week, 0)
+    st.session_state.plan_progress_owner = (user_id, plan.niche)
+    
+    progress = []
+    for week in plan.weeks:
+        with st.expander(f"{week.icon} " + tr("第{week}周：{title}", week=week.week, title=week.title), expanded=week.week == 1):
+            st.markdown(f"**{tr('目标：')}** {week.goal}")
+            st.markdown(f"**{tr('具体任务：')}**")
+            
+            for i, task in enumerate(week.tasks, 1):
+                st.markdown(f"{i}. {task}")
+            
+            st.markdown(f"**{tr('每日时间安排：')}**")
+            for item in week.schedule:
+                st.markdown(f"- {item}")
+            
+            # 进度追踪
+            week_progress = st.slider(tr("第{week}周完成度", week=week.week), 0, 100, key=f"week{week.week}")
+            tracker.update(user_id, plan.niche, week.week, week_progress)
+            # 进度的变化作为协同过滤的反馈，整个计划做完累计为1
+            gain = week_progress - saved.get(week.week, 0)
+            if gain:
+                get_event_log().append(PROGRESS_EVENT, {
+                    "profile": user_profile,
+                    "unit": user_id,
+                    "niche": plan.niche,
+                    "gain": gain / (100 * len(plan.weeks)),
+                })
+            if week_progress >= 80:
+                st.success(tr("🎉 第{week}周目标完成！", week=week.week))
+            progress.append(week_progress)
     
     # 总体进度
-    total_progress = (week1_progress + week2_progress + week3_progress + week4_progress) / 4
-    st.markdown(f"### 📈 总体进度：{total_progress:.1f}%")
+    total_progress = sum(progress) / len(progress)
+    st.markdown(tr("### 📈 总体进度：{progress:.1f}%", progress=total_progress))
     
     if total_progress >= 80:
-        st.success("🎉 恭喜！你已经完成了启动计划，可以开始正式运营你的AI副业了！")
+        st.success(tr("🎉 恭喜！你已经完成了启动计划，可以开始正式运营你的AI副业了！"))
     elif total_progress >= 60:
-        st.info("👍 进度不错，继续加油！")
+        st.info(tr("👍 进度不错，继续加油！"))
     else:
-        st.warning("⚠️ 需要加快进度，建议增加学习时间。")
+        st.warning(tr("⚠️ 需要加快进度，建议增加学习时间。"))
+    
+    # 数据导出
+    st.markdown(tr("### 💾 导出推荐和行动计划"))
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            tr("下载CSV"), _plan_export(profile_key(user_profile), ranking_version(catalog), "csv", user_profile, catalog),
+            file_name="ai_niche_plan.csv", mime="text/csv", use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            tr("下载JSONL"), _plan_export(profile_key(user_profile), ranking_version(catalog), "jsonl", user_profile, catalog),
+            file_name="ai_niche_plan.jsonl", mime="application/json", use_container_width=True
+        )
 
 def show_learning_resources():
-    st.markdown('<h2 class="sub-header">📚 学习资源推荐</h2>', unsafe_allow_html=True)
+    st.markdown(f'<h2 class="sub-header">{tr("📚 学习资源推荐")}</h2>', unsafe_allow_html=True)
     
     # 通用AI学习资源
-    st.markdown("### 🤖 通用AI学习资源")
+    st.markdown(tr("### 🤖 通用AI学习资源"))
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("""
-        <div class="card">
-            <h4>📖 入门书籍</h4>
-            <ul>
-                <li>《人工智能：一种现代方法》</li>
-                <li>《深度学习》- Ian Goodfellow</li>
-                <li>《Python机器学习》</li>
-                <li>《AI商业应用指南》</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(card_html(tr("📖 入门书籍"), [
+            tr("《人工智能：一种现代方法》"), tr("《深度学习》- Ian Goodfellow"),
+            tr("《Python机器学习》"), tr("《AI商业应用指南》"),
+        ]), unsafe_allow_html=True)
         
-        st.markdown("""
-        <div class="card">
-            <h4>🎥 在线课程</h4>
-            <ul>
-                <li>吴恩达机器学习课程</li>
-                <li>CS50 AI课程</li>
-                <li>Fast.ai深度学习</li>
-                <li>李宏毅机器学习</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(card_html(tr("🎥 在线课程"), [
+            tr("吴恩达机器学习课程"), tr("CS50 AI课程"), tr("Fast.ai深度学习"), tr("李宏毅机器学习"),
+        ]), unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
-        <div class="card">
-            <h4>🌐 学习平台</h4>
-            <ul>
-                <li>Coursera - 机器学习专项课程</li>
-                <li>edX - AI和机器学习</li>
-                <li>Udacity - AI纳米学位</li>
-                <li>B站 - AI相关教程</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(card_html(tr("🌐 学习平台"), [
+            tr("Coursera - 机器学习专项课程"), tr("edX - AI和机器学习"),
+            tr("Udacity - AI纳米学位"), tr("B站 - AI相关教程"),
+        ]), unsafe_allow_html=True)
         
-        st.markdown("""
-        <div class="card">
-            <h4>🔧 实践工具</h4>
-            <ul>
-                <li>Google Colab - 免费GPU</li>
-                <li>Kaggle - 数据科学竞赛</li>
-                <li>Hugging Face - 模型库</li>
-                <li>GitHub - 开源项目</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(card_html(tr("🔧 实践工具"), [
+            tr("Google Colab - 免费GPU"), tr("Kaggle - 数据科学竞赛"),
+            tr("Hugging Face - 模型库"), tr("GitHub - 开源项目"),
+        ]), unsafe_allow_html=True)
     
     # 各利基市场专项资源
-    st.markdown("### 🎯 专项学习资源")
+    st.markdown(tr("### 🎯 专项学习资源"))
+    
+    catalog = _page_catalog()
+    bundle = locale_bundle()
+    query = st.text_input(tr("🔍 搜索工具和学习资源"), placeholder=tr("输入关键词，如：ChatGPT、编程、营销"))
     
-    for niche_name, niche_info in AI_NICHES.items():
-        with st.expander(f"📚 {niche_name}专项资源"):
+    for niche_name, matches in _search_niches(catalog, query, fields=("工具推荐", "学习资源", "启动步骤")):
+        niche_info = bundle.niche(niche_name, catalog.niches[niche_name])
+        with st.expander(tr("📚 {niche}专项资源", niche=bundle.niche_name(niche_name)), expanded=bool(query)):
+            if matches:
+                st.markdown(f"**{tr('🔍 相关内容：')}** " + "、".join(item for _, item in matches))
             col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown("**推荐工具：**")
+                st.markdown(f"**{tr('推荐工具：')}**")
                 for tool in niche_info["工具推荐"]:
                     st.markdown(f"- {tool}")
                 
-                st.markdown("**学习资源：**")
+                st.markdown(f"**{tr('学习资源：')}**")
                 for resource in niche_info["学习资源"]:
                     st.markdown(f"- {resource}")
             
             with col2:
-                st.markdown("**启动步骤：**")
+                st.markdown(f"**{tr('启动步骤：')}**")
                 for i, step in enumerate(niche_info["启动步骤"], 1):
                     st.markdown(f"{i}. {step}")
     
     # 社区和论坛
-    st.markdown("### 👥 社区和论坛")
-    st.markdown("""
-    <div class="highlight">
-        <h4>加入这些社区，与同行交流学习：</h4>
-        <ul>
-            <li><strong>知乎</strong> - AI相关话题讨论</li>
-            <li><strong>CSDN</strong> - 技术博客和教程</li>
-            <li><strong>掘金</strong> - 前端和AI开发</li>
-            <li><strong>V2EX</strong> - 程序员社区</li>
-            <li><strong>Reddit</strong> - r/MachineLearning</li>
-            <li><strong>Discord</strong> - AI开发者社区</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(tr("### 👥 社区和论坛"))
+    communities = [
+        ("知乎", "AI相关话题讨论"), ("CSDN", "技术博客和教程"), ("掘金", "前端和AI开发"),
+        ("V2EX", "程序员社区"), ("Reddit", "r/MachineLearning"), ("Discord", "AI开发者社区"),
+    ]
+    st.markdown(card_html(
+        tr("加入这些社区，与同行交流学习："),
+        [f"<strong>{tr(name)}</strong> - {tr(topic)}" for name, topic in communities],
+        css="highlight",
+    ), unsafe_allow_html=True)
+
 
-def calculate_compatibility_score(user_profile, niche):
-    """计算用户与利基市场的匹配度"""
-    score = 0
-    max_score = 100
-    
-    # 技能匹配度 (40分)
-    skill_match = 0
-    for skill in niche["技能要求"]:
-        if skill in user_profile.get("skills", []):
-            skill_match += 1
-    score += (skill_match / len(niche["技能要求"])) * 40
-    
-    # 时间投入匹配度 (20分)
-    time_preference = user_profile.get("time_availability", "中等")
-    time_scores = {"低": 1, "中等": 2, "高": 3}
-    niche_time = time_scores.get(niche["时间投入"], 2)
-    user_time = time_scores.get(time_preference, 2)
-    time_match = 1 - abs(niche_time - user_time) / 2
-    score += time_match * 20
-    
-    # 投资能力匹配度 (20分)
-    investment_preference = user_profile.get("investment_capacity", "中等")
-    investment_scores = {"低": 1, "中等": 2, "高": 3}
-    niche_investment = investment_scores.get(niche["投资成本"], 2)
-    user_investment = investment_scores.get(investment_preference, 2)
-    investment_match = 1 - abs(niche_investment - user_investment) / 2
-    score += investment_match * 20
-    
-    # 兴趣匹配度 (20分)
-    interest_match = 0
-    for interest in user_profile.get("interests", []):
-        if interest in niche["适合人群"] or interest in niche["description"]:
-            interest_match += 1
-    score += min(interest_match * 10, 20)
-    
-    return round(score, 1)
+def show_cohort_analytics():
+    st.markdown(f'<h2 class="sub-header">{tr("👥 人群分析")}</h2>', unsafe_allow_html=True)
+    
+    # 只读取提交评估时累加好的统计，查询量与评估总数无关
+    stats = get_cohort_stats()
+    niche_totals = stats.niche_totals()
+    total = sum(niche_totals.values())
+    if not total:
+        st.info(tr("还没有评估数据，用户提交评估后这里会显示统计。"))
+        return
+    
+    # 统计表里是中文原文，展示时再翻译方向名称、字段名和选项
+    bundle = locale_bundle()
+    niche_label, count_label = tr("推荐方向"), tr("人数")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(tr("累计评估数"), total)
+    with col2:
+        top_niche = next(iter(niche_totals))
+        st.metric(tr("最常被推荐的方向"), bundle.niche_name(top_niche), f"{niche_totals[top_niche] / total:.0%}")
+    
+    # 最佳推荐方向分布
+    st.markdown(tr("### 🎯 最佳推荐方向分布"))
+    fig = px.bar(
+        x=[bundle.niche_name(niche) for niche in niche_totals], y=list(niche_totals.values()),
+        labels={"x": niche_label, "y": count_label},
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # 按画像属性分组
+    st.markdown(tr("### 📊 不同人群的推荐方向"))
+    dimensions = {**COHORT_FIELDS, **COHORT_MULTI_FIELDS}
+    field = st.selectbox(tr("分组维度"), list(dimensions), format_func=lambda field: bundle.text(dimensions[field]))
+    dimension = tr(dimensions[field])
+    breakdown = pd.DataFrame(stats.breakdown(field), columns=[dimension, niche_label, count_label])
+    if breakdown.empty:
+        st.info(tr("该维度暂无数据"))
+    else:
+        breakdown[dimension] = breakdown[dimension].map(bundle.text)
+        breakdown[niche_label] = breakdown[niche_label].map(bundle.niche_name)
+        fig = px.bar(
+            breakdown, x=dimension, y=count_label, color=niche_label, barmode="stack",
+            title=tr("按{dimension}分组的最佳推荐方向", dimension=dimension),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        if field in COHORT_MULTI_FIELDS:
+            st.markdown(tr("注：多选字段每个选项分别计数，各组人数之和会超过评估总数。"))
+    
+    # 匹配度分布
+    st.markdown(tr("### 📈 最佳推荐的匹配度分布"))
+    bucket_label = tr("匹配度区间")
+    histogram = pd.DataFrame(stats.score_histogram(), columns=[niche_label, bucket_label, count_label])
+    histogram[niche_label] = histogram[niche_label].map(bundle.niche_name)
+    histogram[bucket_label] = histogram[bucket_label].map(lambda low: f"{low}-{low + 10}")
+    fig = px.bar(histogram, x=bucket_label, y=count_label, color=niche_label, barmode="stack")
+    st.plotly_chart(fig, use_container_width=True)
 
 def show_assessment():
     st.markdown('<h2 class="sub-header">📊 个人能力与兴趣评估</h2>', unsafe_allow_html=True)
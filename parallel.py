@@ -0,0 +1,101 @@
+# 多进程分片评分：利基矩阵放在内存映射文件中，各工作进程零拷贝共享
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from catalog_store import load_catalog_snapshot, snapshot_tempfile
+from scoring import micro_batches, score_feasible_batch, top_k_rows
+from tenants import apply_overlay
+
+# 每个分片的画像数
+SHARD_SIZE = 2048
+
+
+# ---- 工作进程 ----
+
+_worker_catalog = None
+
+
+def _attach(path, version, overlay=None):
+    global _worker_catalog
+    _worker_catalog = load_catalog_snapshot(path, version)
+    # 租户目录：映射基础目录的快照，再叠加同一份覆盖层
+    if overlay is not None:
+        _worker_catalog = apply_overlay(_worker_catalog, overlay)
+
+
+def _score_shard(profiles, top_k):
+    # 与 rank_niches 相同：硬性条件预筛选后按混合协同过滤的总分排序，不可行的位置是-inf
+    _, totals, columns, _ = score_feasible_batch(profiles, _worker_catalog)
+    cols = top_k_rows(totals, top_k)
+    scores = np.round(np.take_along_axis(totals, cols, axis=1), 1)
+    rows = cols if columns is None else columns[cols]
+    rows = np.where(np.isneginf(scores), -1, rows).astype(np.int32)
+    # 可行的利基不足k个时补-1和-inf，各分片形状一致
+    missing = top_k - rows.shape[1]
+    if missing:
+        rows = np.pad(rows, ((0, 0), (0, missing)), constant_values=-1)
+        scores = np.pad(scores, ((0, 0), (0, missing)), constant_values=-np.inf)
+    return rows, scores
+
+
+class ParallelScorer:
+    """进程池评分器：画像分片并行评分，再按原顺序合并各分片的top-k
+
+    with ParallelScorer(catalog, workers=8) as scorer:
+        rows, scores = scorer.top_k(profiles, k=3)
+    """
+
+    def __init__(self, catalog, workers=None, shard_size=SHARD_SIZE):
+        self.catalog = catalog
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        base, overlay = catalog, None
+        if catalog.overlay is not None:
+            base, overlay = catalog.overlay.base, catalog.overlay.source
+        self.path = snapshot_tempfile(base)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_attach, initargs=(self.path, base.version, overlay)
+        )
+
+    def top_k(self, profiles, k=3):
+        """返回 (利基行号, 匹配度)，形状均为 (画像数, k)，顺序与输入一致
+
+        排序与 rank_niches 相同；满足硬性条件的利基不足k个时，多出的位置行号为-1、匹配度为-inf。
+        """
+        k = min(k, len(self.catalog.names))
+        pending, rows, scores = [], [], []
+        for shard in micro_batches(profiles, self.shard_size):
+            pending.append(self.pool.submit(_score_shard, shard, k))
+            # 在途分片数有上限，输入可以是任意长的迭代器
+            if len(pending) >= self.workers * 2:
+                shard_rows, shard_scores = pending.pop(0).result()
+                rows.append(shard_rows)
+                scores.append(shard_scores)
+        for future in pending:
+            shard_rows, shard_scores = future.result()
+            rows.append(shard_rows)
+            scores.append(shard_scores)
+        if not rows:
+            return np.zeros((0, k), dtype=np.int32), np.zeros((0, k))
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def close(self):
+        self.pool.shutdown()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def score_cohort(profiles, catalog, k=3, workers=None):
+    """一次性并行评分整批画像，返回 (利基行号, 匹配度)"""
+    with ParallelScorer(catalog, workers) as scorer:
+        return scorer.top_k(profiles, k)
@@ -0,0 +1,215 @@
+# 行动计划进度：内存中合并滑块的频繁改动，后台线程防抖后批量写入SQLite
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_DB_PATH = os.getenv("PROGRESS_DB_PATH", os.path.join(".cache", "progress.sqlite3"))
+
+# 最后一次改动后静默这么久才写入，拖动滑块产生的连续改动只写最后的值
+PROGRESS_DEBOUNCE_SECONDS = float(os.getenv("PROGRESS_DEBOUNCE_SECONDS", "2"))
+
+# 持续有改动时，最早的未写入改动最多等待这么久
+PROGRESS_MAX_DELAY_SECONDS = float(os.getenv("PROGRESS_MAX_DELAY_SECONDS", "10"))
+
+# 内存中缓存进度的用户计划数上限
+PROGRESS_CACHE_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan_progress (
+    user_id TEXT NOT NULL,
+    niche TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, niche, week)
+);
+"""
+
+
+def new_user_id():
+    return uuid.uuid4().hex
+
+
+class ProgressStore:
+    """按 (用户, 利基, 周) 保存完成度的本地存储"""
+
+    def __init__(self, path=PROGRESS_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, user_id, niche):
+        """某个用户某个计划的进度 {周: 完成度}"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT week, value FROM plan_progress WHERE user_id = ? AND niche = ?", (user_id, niche)
+            ).fetchall()
+        return dict(rows)
+
+    def save_batch(self, rows):
+        """在一个事务中写入多条 (用户, 利基, 周, 完成度)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO plan_progress (user_id, niche, week, value, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, niche, week) DO UPDATE SET value = excluded.value, "
+                "updated_at = excluded.updated_at",
+                [(user_id, niche, week, value, now) for user_id, niche, week, value in rows],
+            )
+
+
+class ProgressTracker:
+    """进度的写回缓存
+
+    update() 只改内存并记下待写入的值，同一周的多次改动合并成一次；
+    后台线程在改动静默 debounce 秒后（或最早的改动已等待 max_delay 秒时）
+    把所有用户的待写入进度放在一个事务中写入。读取时待写入的值覆盖存储中的值。
+    """
+
+    def __init__(self, store=None, debounce=PROGRESS_DEBOUNCE_SECONDS, max_delay=PROGRESS_MAX_DELAY_SECONDS):
+        self.store = store or ProgressStore()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.stats = Counter()
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._first_change = None
+        self._last_change = None
+        self._closed = False
+        self._cond = threading.Condition()
+        # 后台写入和flush()串行执行，较早的批次不会覆盖较新的批次
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._thread.start()
+
+    def load(self, user_id, niche):
+        """某个计划的进度 {周: 完成度}，包括尚未写入的改动"""
+        key = (user_id, niche)
+        with self._cond:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return dict(cached)
+        saved = self.store.load(user_id, niche)
+        with self._cond:
+            cached = self._cache.setdefault(key, saved)
+            cached.update(self._pending.get(key, {}))
+            self._cache.move_to_end(key)
+            while len(self._cache) > PROGRESS_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return dict(cached)
+
+    def update(self, user_id, niche, week, value):
+        """记录一周的完成度，与当前值相同时什么都不做"""
+        key = (user_id, niche)
+        current = self.load(user_id, niche)
+        if current.get(week) == value:
+            return
+        with self._cond:
+            cached = self._cache.get(key)
+            if cached is not None:
+                cached[week] = value
+            pending = self._pending.setdefault(key, {})
+            if week in pending:
+                self.stats["coalesced"] += 1
+            pending[week] = value
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+            self.stats["updates"] += 1
+            self._cond.notify_all()
+
+    def _due(self):
+        return min(self._last_change + self.debounce, self._first_change + self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending:
+                        remaining = self._due() - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self):
+        """立即写入全部待写入的进度"""
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                self._first_change = self._last_change = None
+            if not batch:
+                return
+            rows = [
+                (user_id, niche, week, value)
+                for (user_id, niche), weeks in batch.items()
+                for week, value in weeks.items()
+            ]
+            try:
+                self.store.save_batch(rows)
+            except sqlite3.Error:
+                logger.exception("写入计划进度失败，稍后重试 %d 条", len(rows))
+                self._requeue(batch)
+                return
+            self.stats["rows_written"] += len(rows)
+            self.stats["batches"] += 1
+
+    def _requeue(self, batch):
+        # 写入失败的值放回队列，期间产生的更新的值优先
+        with self._cond:
+            for key, weeks in batch.items():
+                pending = self._pending.setdefault(key, {})
+                for week, value in weeks.items():
+                    pending.setdefault(week, value)
+            now = time.monotonic()
+            self._first_change = self._first_change or now
+            self._last_change = self._last_change or now
+
+    def close(self, timeout=5):
+        """写入剩余的进度后停止后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+
+_progress_tracker = None
+_progress_lock = threading.Lock()
+
+
+def get_progress_tracker():
+    """进程内共享的进度缓存，进程退出前写入剩余的进度"""
+    global _progress_tracker
+    with _progress_lock:
+        if _progress_tracker is None:
+            _progress_tracker = ProgressTracker()
+            atexit.register(_progress_tracker.close)
+        return _progress_tracker
@@ -0,0 +1,202 @@
+# 后台数据刷新：在请求路径之外构建快照并原子替换
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType, ModuleType
+
+import pandas as pd
+
+from catalog import CompiledCatalog, catalog_digest, compile_catalog, diff_catalog, niche_fingerprint
+from catalog_store import load_startup_catalog
+
+logger = logging.getLogger(__name__)
+
+# 刷新间隔（秒），可通过环境变量调整
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL_SECONDS", "600"))
+
+# 检查目录源文件（data.py）是否被修改的间隔（秒）
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL_SECONDS", "2"))
+
+# 快速增长领域展示的数量
+FAST_GROWTH_COUNT = 3
+
+# 目录源文件的路径，只查找不导入：快照可用时启动过程不执行data.py
+DATA_SOURCE_PATH = importlib.util.find_spec("data").origin
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """一次刷新的完整结果，发布后不再修改"""
+    version: int
+    catalog: CompiledCatalog
+    trends: pd.DataFrame
+    insights: MappingProxyType
+    fingerprint: str
+    built_at: float
+
+
+def compute_trend_insights(trends):
+    """根据趋势数据计算各方向的增长率和快速/稳定增长分组"""
+    growth = {}
+    for niche, values in trends.items():
+        if niche == "月份" or not values or not values[0]:
+            continue
+        growth[niche] = round((values[-1] - values[0]) / values[0] * 100)
+
+    ranked = sorted(growth, key=growth.get, reverse=True)
+    return MappingProxyType({
+        "growth": MappingProxyType(growth),
+        "fast": tuple(ranked[:FAST_GROWTH_COUNT]),
+        "stable": tuple(ranked[FAST_GROWTH_COUNT:]),
+    })
+
+
+def _fingerprint(content_digest, trends):
+    """目录内容摘要（见catalog_digest）和趋势数据合起来的指纹，不变时不发布新版本"""
+    payload = json.dumps([content_digest, trends], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def build_snapshot(version, niches=None, trends=None, previous=None, catalog=None, content_digest=None):
+    """加载数据并构建新快照（耗时操作，只在后台线程调用）
+
+    传入上一版快照时目录增量编译，只重新处理内容变化的利基；
+    catalog是已经编译或从目录快照文件加载好的目录，content_digest是它的内容摘要。
+    """
+    if (niches is None and catalog is None) or trends is None:
+        import data
+        niches = data.AI_NICHES if niches is None else niches
+        trends = data.load_market_trends() if trends is None else trends
+    if catalog is None:
+        catalog = compile_catalog(niches, version, previous.catalog if previous is not None else None)
+    if content_digest is None:
+        content_digest = catalog_digest(catalog.names, catalog.fingerprints)
+    return Snapshot(
+        version=version,
+        catalog=catalog,
+        trends=pd.DataFrame(trends),
+        insights=compute_trend_insights(trends),
+        fingerprint=_fingerprint(content_digest, trends),
+        built_at=time.time(),
+    )
+
+
+def _source_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_catalog_source(path):
+    """重新执行目录源文件，返回新的模块对象
+
+    不改动sys.modules中的data模块，Streamlit的文件监视和其他导入方都不受影响；
+    直接编译源码而不走字节码缓存，同一秒内的两次保存也能读到最新内容。
+    """
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    module = ModuleType("_catalog_source")
+    module.__file__ = path
+    exec(compile(source, path, "exec"), module.__dict__)
+    return module
+
+
+class RefreshScheduler(threading.Thread):
+    """定时刷新数据的后台线程，内容变化时才发布新版本
+
+    目录源文件被修改后会在几秒内重新加载并增量发布，不需要重启服务。
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL, watch_interval=CATALOG_WATCH_INTERVAL,
+                 source_path=DATA_SOURCE_PATH):
+        super().__init__(name="data-refresh", daemon=True)
+        self.interval = interval
+        self.watch_interval = watch_interval
+        self._stop_event = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._source_path = source_path
+        self._source_mtime = _source_mtime(self._source_path)
+        # 启动时优先映射已构建好的目录快照文件，快照可用时不执行源文件、不重新编译；
+        # 趋势数据用快照中的一份，之后按刷新间隔更新
+        startup = load_startup_catalog(self._source_path, lambda: load_catalog_source(self._source_path))
+        self._current = build_snapshot(
+            version=1, trends=startup.trends, catalog=startup.catalog, content_digest=startup.content_digest
+        )
+
+    @property
+    def snapshot(self):
+        # 引用赋值是原子的，读者永远拿到完整的快照
+        return self._current
+
+    def source_changed(self):
+        """目录源文件自上次检查以来是否被修改过"""
+        mtime = _source_mtime(self._source_path)
+        if mtime == self._source_mtime:
+            return False
+        # 先记下修改时间，文件保存到一半出错时不会反复重试，下次保存再加载
+        self._source_mtime = mtime
+        return True
+
+    def refresh(self):
+        """重新执行源文件并发布快照，返回当前生效的快照
+
+        源文件模块用完即丢弃，不常驻内存；内容和趋势都没变时不发布新版本。
+        """
+        with self._refresh_lock:
+            current = self._current
+            source = load_catalog_source(self._source_path)
+            niches = source.AI_NICHES
+            trends = source.load_market_trends()
+            content_digest = catalog_digest(niches, {name: niche_fingerprint(info) for name, info in niches.items()})
+            if _fingerprint(content_digest, trends) == current.fingerprint:
+                return current
+            added, changed, removed = diff_catalog(current.catalog, niches)
+            self._current = build_snapshot(
+                current.version + 1, niches, trends, previous=current, content_digest=content_digest
+            )
+            logger.info(
+                "数据快照已更新到版本 %d（新增%d、修改%d、删除%d个利基）",
+                self._current.version, len(added), len(changed), len(removed),
+            )
+            return self._current
+
+    def run(self):
+        last_refresh = time.monotonic()
+        while not self._stop_event.wait(self.watch_interval):
+            try:
+                due = time.monotonic() - last_refresh >= self.interval
+                if self.source_changed() or due:
+                    self.refresh()
+                    last_refresh = time.monotonic()
+            except Exception:
+                # 加载或刷新失败时继续使用旧快照
+                logger.exception("数据刷新失败")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler(interval=REFRESH_INTERVAL, watch_interval=CATALOG_WATCH_INTERVAL):
+    """启动进程内唯一的刷新线程（重复调用无副作用）"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RefreshScheduler(interval, watch_interval)
+            _scheduler.start()
+        return _scheduler
+
+
+def get_snapshot():
+    """页面读取当前快照的唯一入口"""
+    scheduler = _scheduler or start_scheduler()
+    return scheduler.snapshot
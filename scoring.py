@@ -0,0 +1,288 @@
+# 匹配度评分：单个利基的计算和整个目录的向量化计算
+import hashlib
+import itertools
+import json
+
+import numpy as np
+
+from catalog import SCORE_LEVEL_MAP
+from cf_model import CF_BLEND_WEIGHT, get_cf_model
+from constraints import CONSTRAINT_FIELD, active_constraints
+
+# 各部分满分：技能40、时间20、投资20、兴趣20
+SCORE_WEIGHTS = {"skills": 40, "time": 20, "investment": 20, "interests": 20}
+
+# 每匹配一个兴趣得10分
+INTEREST_POINTS = 10
+
+# 流式评分时每个微批的画像数
+STREAM_BATCH_SIZE = 1024
+
+# 决定推荐结果的画像字段（姓名、评估时间等不参与）
+PROFILE_FIELDS = [
+    "age", "education", "occupation", "experience_years", "time_availability",
+    "skills", "interests", "investment_capacity", "income_goal", "risk_tolerance"
+]
+
+
+def encode_profile(user_profile):
+    """把用户画像编码成稳定的JSON字符串"""
+    encoded = {}
+    for field in PROFILE_FIELDS:
+        value = user_profile.get(field)
+        if isinstance(value, list):
+            value = sorted(value)
+        encoded[field] = value
+    # 硬性条件是后加的可选字段，未设置时不参与编码，已有的缓存键保持不变
+    constraints = active_constraints(user_profile)
+    if constraints:
+        encoded[CONSTRAINT_FIELD] = constraints
+    return json.dumps(encoded, ensure_ascii=False, sort_keys=True)
+
+
+def profile_key(user_profile):
+    """用户画像的哈希值，用作缓存键"""
+    return hashlib.sha256(encode_profile(user_profile).encode("utf-8")).hexdigest()[:32]
+
+
+def _current_catalog():
+    from refresh import get_snapshot
+    return get_snapshot().catalog
+
+
+def _user_level(user_profile, field):
+    return SCORE_LEVEL_MAP.get(user_profile.get(field, "中等"), 2)
+
+
+def score_breakdown(user_profile, catalog, rows=None):
+    """一次算出用户对目录中所有利基的各部分得分，返回 {部分: 数组}，含total"""
+    batch = score_breakdown_batch([user_profile], catalog, rows)
+    return {component: values[0] for component, values in batch.items()}
+
+
+def _user_levels(profiles, field):
+    return np.array([_user_level(user_profile, field) for user_profile in profiles], dtype=np.float64)
+
+
+def score_breakdown_batch(profiles, catalog, rows=None):
+    """一批用户对所有利基的各部分得分，每个数组形状为 (用户数, 利基数)
+
+    rows是升序的目录行号时只计算这些利基，数组的列与rows一一对应。
+    """
+    if catalog.overlay is not None:
+        breakdown = _overlay_breakdown_batch(profiles, catalog)
+        # 租户目录由共享数组拼接而成，整体算完再取列
+        return breakdown if rows is None else {component: values[:, rows] for component, values in breakdown.items()}
+
+    def columns(values):
+        return values if rows is None else values[rows]
+
+    skill_index = {skill: i for i, skill in enumerate(catalog.skills)}
+    skill_vectors = np.zeros((len(profiles), len(catalog.skills)))
+    for row, user_profile in enumerate(profiles):
+        for skill in user_profile.get("skills", []):
+            col = skill_index.get(skill)
+            if col is not None:
+                skill_vectors[row, col] = 1
+    user_time = _user_levels(profiles, "time_availability")
+    user_investment = _user_levels(profiles, "investment_capacity")
+
+    skill_score = (
+        (skill_vectors @ columns(catalog.skill_matrix).T) / columns(catalog.skill_counts) * SCORE_WEIGHTS["skills"]
+    )
+    time_match = 1 - np.abs(columns(catalog.score_levels["时间投入"]) - user_time[:, None]) / 2
+    time_score = time_match * SCORE_WEIGHTS["time"]
+    investment_match = 1 - np.abs(columns(catalog.score_levels["投资成本"]) - user_investment[:, None]) / 2
+    investment_score = investment_match * SCORE_WEIGHTS["investment"]
+    interest_count = catalog.interest_matcher.match_counts_batch(
+        [user_profile.get("interests", []) for user_profile in profiles], rows
+    )
+    interest_score = np.minimum(interest_count * INTEREST_POINTS, SCORE_WEIGHTS["interests"]).astype(np.float64)
+
+    return {
+        "skills": skill_score,
+        "time": time_score,
+        "investment": investment_score,
+        "interests": interest_score,
+        "total": skill_score + time_score + investment_score + interest_score,
+    }
+
+
+def _overlay_breakdown_batch(profiles, catalog):
+    """租户目录的评分：基础目录部分直接用共享的数组计算，只重算改过时间或投资评级的行，
+    新增的利基单独评分后拼在后面"""
+    overlay = catalog.overlay
+    breakdown = score_breakdown_batch(profiles, overlay.base)
+    rows = overlay.rescored_rows
+    if len(rows):
+        for component, field, profile_field in (
+            ("time", "时间投入", "time_availability"),
+            ("investment", "投资成本", "investment_capacity"),
+        ):
+            match = 1 - np.abs(catalog.score_levels[field][rows] - _user_levels(profiles, profile_field)[:, None]) / 2
+            breakdown[component][:, rows] = match * SCORE_WEIGHTS[component]
+        breakdown["total"][:, rows] = (
+            breakdown["skills"][:, rows] + breakdown["time"][:, rows]
+            + breakdown["investment"][:, rows] + breakdown["interests"][:, rows]
+        )
+    if overlay.extension is not None:
+        extra = score_breakdown_batch(profiles, overlay.extension)
+        breakdown = {component: np.hstack([values, extra[component]]) for component, values in breakdown.items()}
+    return breakdown
+
+
+def top_k_rows(totals, k):
+    """每行按一位小数的匹配度取前k个列号，同分保持目录顺序"""
+    order = np.argsort(-np.round(totals, 1), axis=-1, kind="stable")
+    return order[..., :k]
+
+
+def feasible_rows(user_profile, catalog):
+    """满足画像硬性条件的目录行号（升序），画像没有启用条件时返回None"""
+    mask = catalog.constraint_index.feasible_mask([user_profile])
+    return None if mask is None else np.flatnonzero(mask[0])
+
+
+def rank_niches(user_profile, catalog=None):
+    """按匹配度从高到低返回 [(利基名称, 匹配度)]，不满足硬性条件的利基不参与评分"""
+    catalog = catalog or _current_catalog()
+    rows = feasible_rows(user_profile, catalog)
+    names = catalog.names if rows is None else [catalog.names[row] for row in rows.tolist()]
+    totals = blend_totals(score_breakdown(user_profile, catalog, rows)["total"][None, :], [user_profile], names)[0]
+    ranked = [(name, round(float(total), 1)) for name, total in zip(names, totals)]
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    return ranked
+
+
+def calculate_compatibility_score(user_profile, niche, catalog=None):
+    """计算用户与利基市场的匹配度"""
+    catalog = catalog or _current_catalog()
+    score = 0
+
+    # 技能匹配度 (40分)
+    skill_match = 0
+    for skill in niche["技能要求"]:
+        if skill in user_profile.get("skills", []):
+            skill_match += 1
+    score += (skill_match / len(niche["技能要求"])) * SCORE_WEIGHTS["skills"]
+
+    # 目录中的利基直接使用编译好的评级数值
+    row = catalog.row_of(niche)
+
+    def niche_level(field):
+        if row is not None:
+            return float(catalog.score_levels[field][row])
+        return SCORE_LEVEL_MAP.get(niche[field], 2)
+
+    # 时间投入匹配度 (20分)
+    niche_time = niche_level("时间投入")
+    user_time = _user_level(user_profile, "time_availability")
+    time_match = 1 - abs(niche_time - user_time) / 2
+    score += time_match * SCORE_WEIGHTS["time"]
+
+    # 投资能力匹配度 (20分)
+    niche_investment = niche_level("投资成本")
+    user_investment = _user_level(user_profile, "investment_capacity")
+    investment_match = 1 - abs(niche_investment - user_investment) / 2
+    score += investment_match * SCORE_WEIGHTS["investment"]
+
+    # 兴趣匹配度 (20分)：字面命中或语义相近
+    interest_match = catalog.interest_matcher.match_count_for(
+        user_profile.get("interests", []), niche, row=row
+    )
+    score += min(interest_match * INTEREST_POINTS, SCORE_WEIGHTS["interests"])
+
+    return round(score, 1)
+
+
+def score_feasible_batch(profiles, catalog):
+    """按硬性条件预筛选后评分，返回 (各部分得分, 排序用总分, 列对应的目录行号, 可行掩码)
+
+    只给批内至少一个画像可行的利基评分，其余在评分前就排除；排序用总分中
+    不可行的位置是-inf，排在最后。批内都没有启用条件时列号和掩码为None，结果与整表评分相同。
+    """
+    feasible = catalog.constraint_index.feasible_mask(profiles)
+    if feasible is None:
+        breakdown = _blended(score_breakdown_batch(profiles, catalog), profiles, catalog.names)
+        return breakdown, breakdown["total"], None, None
+    columns = np.flatnonzero(feasible.any(axis=0))
+    feasible = feasible[:, columns]
+    names = [catalog.names[column] for column in columns.tolist()]
+    breakdown = _blended(score_breakdown_batch(profiles, catalog, columns), profiles, names)
+    return breakdown, np.where(feasible, breakdown["total"], -np.inf), columns, feasible
+
+
+def blend_totals(totals, profiles, names):
+    """规则匹配度与协同过滤得分按 CF_BLEND_WEIGHT 混合，形状为 (画像数, len(names))
+
+    没有训练好的模型时原样返回；模型没见过的利基和画像只用规则匹配度。
+    """
+    model = get_cf_model()
+    if model is None:
+        return totals
+    learned, known = model.score_batch(profiles, names)
+    return np.where(known, blend_scores(totals, learned), totals)
+
+
+def blend_scores(totals, learned):
+    """规则匹配度（0-100）与协同过滤得分（0-1）的加权和"""
+    return (1 - CF_BLEND_WEIGHT) * totals + CF_BLEND_WEIGHT * 100 * learned
+
+
+def _blended(breakdown, profiles, names):
+    # 各部分得分仍是规则的拆分，只有总分混合了协同过滤
+    return {**breakdown, "total": blend_totals(breakdown["total"], profiles, names)}
+
+
+def ranking_version(catalog):
+    """决定排名结果的版本：目录版本和协同过滤因子版本，用作排名相关缓存的键"""
+    model = get_cf_model()
+    return catalog.version, model.version if model is not None else None
+
+
+def micro_batches(items, size):
+    """把任意可迭代对象切成最多size个元素的列表，不会一次读完输入"""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_scores(profiles, catalog=None, top_k=None, batch_size=STREAM_BATCH_SIZE):
+    """流式评分：逐个产出 (画像, 排名列表)
+
+    输入按batch_size切成微批走向量化路径，内存只与批大小有关；
+    调用方处理得慢时生成器自然暂停，不会预读后面的画像。
+    整个流使用开始时的目录版本。画像启用了硬性条件时，不满足的利基不出现在排名中。
+    """
+    catalog = catalog or _current_catalog()
+    keep = len(catalog.names) if top_k is None else min(top_k, len(catalog.names))
+    for batch in micro_batches(profiles, batch_size):
+        breakdown, totals, columns, feasible = score_feasible_batch(batch, catalog)
+        names = catalog.names if columns is None else [catalog.names[column] for column in columns.tolist()]
+        rows = top_k_rows(totals, min(keep, len(names)))
+        # 先整体取出前k列再转成Python数值，避免逐个元素访问numpy数组
+        picked = {
+            component: np.take_along_axis(values, rows, axis=1).tolist()
+            for component, values in breakdown.items()
+        }
+        picked_feasible = None if feasible is None else np.take_along_axis(feasible, rows, axis=1).tolist()
+        for i, user_profile in enumerate(batch):
+            yield user_profile, [
+                {
+                    "niche": names[row],
+                    "score": round(picked["total"][i][j], 1),
+                    "breakdown": {
+                        component: round(picked[component][i][j], 2) for component in SCORE_WEIGHTS
+                    },
+                }
+                for j, row in enumerate(rows[i].tolist())
+                if picked_feasible is None or picked_feasible[i][j]
+            ]
+
+
+def rank_with_breakdown(user_profile, catalog, top_k=None):
+    """按匹配度排序，并附带各部分得分，供接口和导出使用"""
+    return next(iter_scores([user_profile], catalog, top_k))[1]
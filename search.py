@@ -0,0 +1,138 @@
+# 利基目录全文检索：中文字符n-gram倒排索引
+import heapq
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+
+from semantic import char_ngrams
+
+# 参与检索的字段及权重
+SEARCH_FIELDS = {
+    "名称": 1.5,
+    "description": 1.0,
+    "适合人群": 0.8,
+    "工具推荐": 0.8,
+    "学习资源": 0.8,
+    "启动步骤": 0.6,
+}
+
+# 多个n-gram的查询，至少命中这个比例才算结果
+MIN_COVERAGE = 0.5
+
+
+def _field_items(niche_name, niche_info, field):
+    if field == "名称":
+        return [niche_name]
+    value = niche_info[field]
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _query_grams(query):
+    query = query.strip().lower()
+    if not query:
+        return []
+    # 单字查询用一元组，其余用二元组
+    grams = char_ngrams(query, 1) if len(query.replace(" ", "")) < 2 else char_ngrams(query, 2)
+    return list(dict.fromkeys(grams))
+
+
+def _niche_terms(niche_name, niche_info):
+    """单个利基各n-gram的加权词频"""
+    terms = defaultdict(float)
+    for field, weight in SEARCH_FIELDS.items():
+        counts = defaultdict(int)
+        for item in _field_items(niche_name, niche_info, field):
+            text = item.lower()
+            for n in (1, 2):
+                for gram in char_ngrams(text, n):
+                    counts[gram] += 1
+        for gram, tf in counts.items():
+            terms[gram] += weight * (1 + math.log(tf))
+    return dict(terms)
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """一条检索结果，matches是命中的 (字段, 条目) 列表"""
+    niche_name: str
+    score: float
+    matches: tuple
+
+
+class SearchIndex:
+    """倒排表：n-gram -> [(行号, 加权词频)]，查询只遍历命中的倒排表"""
+
+    def __init__(self, names, niches, previous=None, reused=None):
+        """reused[i]是第i个利基在previous中的行号（内容没变），直接复用它的加权词频"""
+        self.names = names
+        self._niches = niches
+        # 从目录快照加载的索引没有保留词频，只能全部重新切分
+        if previous is None or previous._row_terms is None:
+            reused = None
+        self._row_terms = tuple(
+            previous._row_terms[reused[row]] if reused is not None and reused[row] is not None
+            else _niche_terms(name, niches[name])
+            for row, name in enumerate(names)
+        )
+
+        # IDF与文档总数有关，倒排表整体重建，但不再重新切分文本
+        postings = defaultdict(dict)
+        for row, terms in enumerate(self._row_terms):
+            for gram, tf in terms.items():
+                postings[gram][row] = tf
+
+        doc_count = len(names)
+        self._postings = {}
+        for gram, rows in postings.items():
+            idf = math.log((1 + doc_count) / (1 + len(rows))) + 1
+            self._postings[gram] = tuple((row, tf * idf) for row, tf in rows.items())
+
+    @classmethod
+    def from_postings(cls, names, niches, postings):
+        """由现成的倒排表直接构建，不再切分文本（加载目录快照时使用）
+
+        postings是 {n-gram: ((行号, 权重), ...)} 的映射，可以是按需读取的映射。
+        """
+        index = cls.__new__(cls)
+        index.names = names
+        index._niches = niches
+        index._row_terms = None
+        index._postings = postings
+        return index
+
+    def postings(self):
+        """倒排表 {n-gram: ((行号, 权重), ...)}"""
+        return self._postings
+
+    def _matches(self, row, grams):
+        # 只对返回的结果找出具体命中的条目
+        name = self.names[row]
+        matches = []
+        for field in SEARCH_FIELDS:
+            for item in _field_items(name, self._niches[name], field):
+                text = item.lower()
+                if any(gram in text for gram in grams):
+                    matches.append((field, item))
+        return tuple(matches)
+
+    def search(self, query, limit=10):
+        """返回按相关度排序的SearchHit列表"""
+        grams = _query_grams(query)
+        if not grams:
+            return []
+
+        scores = defaultdict(float)
+        hits = defaultdict(int)
+        for gram in grams:
+            for row, weight in self._postings.get(gram, ()):
+                scores[row] += weight
+                hits[row] += 1
+
+        required = math.ceil(len(grams) * MIN_COVERAGE)
+        ranked = heapq.nlargest(
+            limit, (row for row in scores if hits[row] >= required), key=scores.get
+        )
+        return [
+            SearchHit(self.names[row], round(scores[row], 3), self._matches(row, grams))
+            for row in ranked
+        ]
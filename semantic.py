@@ -0,0 +1,247 @@
+# 离线语义匹配：中文字符n-gram的TF-IDF向量
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+
+# 中文兴趣词一般2-4个字，二元组区分度最好
+NGRAM_SIZE = 2
+
+# 查询向量缓存的条目上限
+QUERY_CACHE_SIZE = 4096
+
+# 参与匹配的利基文本字段
+NICHE_TEXT_FIELDS = ["description", "适合人群", "学习资源"]
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    """切出文本的字符n-gram，过短的文本整体作为一项"""
+    grams = []
+    for part in text.split():
+        if len(part) < n:
+            grams.append(part)
+        else:
+            grams.extend(part[i:i + n] for i in range(len(part) - n + 1))
+    return grams
+
+
+def niche_text_parts(niche_name, niche_info):
+    """利基市场参与语义匹配的文本片段"""
+    parts = [niche_name]
+    for field in NICHE_TEXT_FIELDS:
+        value = niche_info[field]
+        parts.extend([value] if isinstance(value, str) else value)
+    return parts
+
+
+@dataclass(frozen=True)
+class NgramVectorIndex:
+    """预先计算好的文档向量矩阵，每行已归一化；vocabulary是n-gram到列号的映射"""
+    vocabulary: dict
+    idf: np.ndarray
+    matrix: np.ndarray
+    # 每篇文档的n-gram词频，增量重建时复用未变的文档
+    doc_counts: tuple = field(default=(), compare=False, repr=False)
+    # 兴趣选项有限，编码结果按文本缓存
+    _query_cache: dict = field(default_factory=dict, compare=False, repr=False)
+
+    def _vector(self, text):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for gram in char_ngrams(text):
+            col = self.vocabulary.get(gram)
+            if col is not None:
+                vector[col] += 1
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def _encode(self, text):
+        vector = self._query_cache.get(text)
+        if vector is None:
+            vector = self._vector(text)
+            if len(self._query_cache) < QUERY_CACHE_SIZE:
+                self._query_cache[text] = vector
+        return vector
+
+    def vectorize(self, texts):
+        """把若干文本编码为归一化的TF-IDF向量（词表外的n-gram忽略）"""
+        if not texts:
+            return np.zeros((0, len(self.vocabulary)), dtype=np.float64)
+        return np.stack([self._encode(text) for text in texts])
+
+    def similarity(self, texts, rows=None):
+        """文本与每篇文档的余弦相似度，形状为 (len(texts), 文档数)；rows给出时只算这些文档"""
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return self.vectorize(texts) @ matrix.T
+
+
+def count_ngrams(parts):
+    """一篇文档各n-gram的出现次数，保持首次出现的顺序"""
+    counts = {}
+    for part in parts:
+        for gram in char_ngrams(part):
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def build_vector_index(documents, previous=None, reused=None):
+    """documents是每篇文档的文本片段列表
+
+    reused[i]是第i篇文档在previous中的行号（内容没变），这些文档直接复用
+    已切分好的词频，documents中对应位置可以是None；IDF和归一化整体重算。
+    """
+    doc_counts = []
+    for row, parts in enumerate(documents):
+        old_row = reused[row] if reused is not None else None
+        doc_counts.append(previous.doc_counts[old_row] if old_row is not None else count_ngrams(parts))
+
+    vocabulary = {}
+    for grams in doc_counts:
+        for gram in grams:
+            vocabulary.setdefault(gram, len(vocabulary))
+
+    counts = np.zeros((len(documents), len(vocabulary)), dtype=np.float64)
+    for row, grams in enumerate(doc_counts):
+        if grams:
+            counts[row, [vocabulary[gram] for gram in grams]] = list(grams.values())
+
+    # 平滑IDF，避免只出现在所有文档里的n-gram权重为0
+    doc_freq = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(documents)) / (1 + doc_freq)) + 1
+    matrix = counts * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+    idf.setflags(write=False)
+    matrix.setflags(write=False)
+    return NgramVectorIndex(vocabulary=vocabulary, idf=idf, matrix=matrix, doc_counts=tuple(doc_counts))
+
+
+class InterestMatcher:
+    """兴趣匹配：字面命中或语义相似度达到阈值都算匹配"""
+
+    def __init__(self, index, audiences, descriptions, threshold):
+        self.index = index
+        self.threshold = threshold
+        self.audiences = [set(audience) for audience in audiences]
+        self.descriptions = list(descriptions)
+        self._literal_cache = {}
+
+    @classmethod
+    def from_niches(cls, index, names, niches, threshold):
+        """字面匹配用的人群和描述第一次用到时才从niches读取（加载目录快照时使用）"""
+        matcher = cls.__new__(cls)
+        matcher.index = index
+        matcher.threshold = threshold
+        matcher._names = names
+        matcher._niches = niches
+        matcher._literal_cache = {}
+        return matcher
+
+    # 由__init__直接赋值时不会用到下面两个属性
+    @cached_property
+    def audiences(self):
+        return [set(self._niches[name]["适合人群"]) for name in self._names]
+
+    @cached_property
+    def descriptions(self):
+        return [self._niches[name]["description"] for name in self._names]
+
+    @property
+    def size(self):
+        """利基数"""
+        return self.index.matrix.shape[0]
+
+    @classmethod
+    def build(cls, names, niches, threshold, previous=None, reused=None):
+        """为目录中的利基构建向量矩阵，传入上一版匹配器时只重新切分变化的利基"""
+        # 从目录快照加载的索引没有保留词频，只能全部重新切分
+        if previous is None or not previous.index.doc_counts:
+            previous, reused = None, None
+        documents = [
+            None if reused is not None and reused[row] is not None else niche_text_parts(name, niches[name])
+            for row, name in enumerate(names)
+        ]
+        index = build_vector_index(documents, previous.index if previous is not None else None, reused)
+        return cls(
+            index,
+            [niches[name]["适合人群"] for name in names],
+            [niches[name]["description"] for name in names],
+            threshold,
+        )
+
+    def for_niches(self, names, niches):
+        """用本匹配器的词表和IDF为另一批利基构建匹配器
+
+        与match_count_for处理目录外利基的方式一致：词表外的n-gram忽略，
+        查询向量缓存与本匹配器共用。
+        """
+        vectors = [self.index._vector(" ".join(niche_text_parts(name, niches[name]))) for name in names]
+        matrix = np.stack(vectors) if vectors else np.zeros((0, len(self.index.vocabulary)))
+        matrix.setflags(write=False)
+        index = NgramVectorIndex(
+            vocabulary=self.index.vocabulary, idf=self.index.idf, matrix=matrix,
+            _query_cache=self.index._query_cache,
+        )
+        return InterestMatcher(
+            index,
+            [niches[name]["适合人群"] for name in names],
+            [niches[name]["description"] for name in names],
+            self.threshold,
+        )
+
+    def _literal_mask(self, interest):
+        # 兴趣选项有限，字面匹配结果按兴趣缓存
+        mask = self._literal_cache.get(interest)
+        if mask is None:
+            mask = np.array([
+                interest in audience or interest in description
+                for audience, description in zip(self.audiences, self.descriptions)
+            ])
+            self._literal_cache[interest] = mask
+        return mask
+
+    def match_counts(self, interests):
+        """每个利基市场匹配到的兴趣数量，语义部分是一次矩阵乘法"""
+        if not interests:
+            return np.zeros(self.size)
+        matched = self.index.similarity(interests) >= self.threshold
+        matched |= np.array([self._literal_mask(interest) for interest in interests])
+        return matched.sum(axis=0)
+
+    def match_counts_batch(self, interest_lists, rows=None):
+        """一批用户各自匹配到的兴趣数量，形状为 (用户数, 利基数)；rows给出时只算这些利基
+
+        所有用户的兴趣拼在一起只做一次矩阵乘法，再按用户累加。
+        """
+        width = self.size if rows is None else len(rows)
+        counts = np.zeros((len(interest_lists), width), dtype=np.int64)
+        owners = [user for user, interests in enumerate(interest_lists) for _ in interests]
+        if not owners:
+            return counts
+        interests = [interest for interest_list in interest_lists for interest in interest_list]
+        matched = self.index.similarity(interests, rows) >= self.threshold
+        literal = np.array([self._literal_mask(interest) for interest in interests])
+        matched |= literal if rows is None else literal[:, rows]
+        np.add.at(counts, np.array(owners), matched)
+        return counts
+
+    def match_count_for(self, interests, niche_info, niche_name="", row=None):
+        """单个利基市场匹配到的兴趣数量
+
+        row是该利基在目录中的行号；不在目录中的利基临时编码文本。
+        """
+        if not interests:
+            return 0
+        if row is not None:
+            return int(self.match_counts(interests)[row])
+        niche_vector = self.index.vectorize([" ".join(niche_text_parts(niche_name, niche_info))])
+        similarity = self.index.vectorize(interests) @ niche_vector[0]
+        count = 0
+        for interest, score in zip(interests, similarity):
+            if (score >= self.threshold or interest in niche_info["适合人群"]
+                    or interest in niche_info["description"]):
+                count += 1
+        return count
@@ -0,0 +1,387 @@
+# 独立的JSON评分服务：asyncio HTTP服务器 + 进程池评分
+#
+# 用法：
+#   python service.py --port 8080 --workers 4
+#
+# 接口：
+#   POST /v1/score         {"profile": {...}, "top_k": 3}
+#   POST /v1/score/batch   {"profiles": [{...}, ...], "top_k": 3}
+#   POST /v1/score/batch.arrow  同上，以Arrow IPC流（分块传输）返回列式结果
+#   评分接口的请求体可带 "tenant": "<租户id>"，使用该租户的目录（见tenants.py）
+#   GET  /metrics          各接口的请求数和延迟分位数
+#   GET  /healthz
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog_store import load_catalog_snapshot, snapshot_tempfile
+from scoring import iter_scores
+from tenants import TenantRegistry
+
+logger = logging.getLogger(__name__)
+
+# 单个请求体上限，防止异常请求占满内存
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+# 批量请求拆分给工作进程时每块的画像数
+BATCH_CHUNK_SIZE = 256
+
+# 空闲连接的保持时间（秒）
+KEEP_ALIVE_TIMEOUT = 15
+
+# 延迟统计保留的最近样本数
+LATENCY_WINDOW = 10000
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class StreamResponse:
+    """分块传输的响应，chunks是异步生成的字节块"""
+
+    def __init__(self, content_type, chunks):
+        self.content_type = content_type
+        self.chunks = chunks
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ---- 工作进程 ----
+
+_worker_catalog = None
+_worker_tenants = None
+
+
+def _init_worker(path, version, tenant_dir):
+    """工作进程启动时映射目录快照，所有工作进程共享同一份矩阵内存"""
+    global _worker_catalog, _worker_tenants
+    _worker_catalog = load_catalog_snapshot(path, version)
+    _worker_tenants = TenantRegistry(tenant_dir)
+
+
+def _catalog_for(tenant):
+    # 租户目录在工作进程中按需叠加，基础部分仍是共享的内存映射
+    if tenant is None:
+        return _worker_catalog
+    return _worker_tenants.catalog_for(tenant, _worker_catalog)
+
+
+def _score_chunk(profiles, top_k, tenant=None):
+    return [ranked for _, ranked in iter_scores(profiles, _catalog_for(tenant), top_k, len(profiles))]
+
+
+def _score_arrow_chunk(profiles, top_k, start, tenant=None):
+    # 在工作进程中直接序列化为IPC消息，主进程只转发字节
+    from arrow_io import score_record_batch, serialize_batch
+    return serialize_batch(score_record_batch(profiles, _catalog_for(tenant), top_k, start))
+
+
+# ---- 指标 ----
+
+class LatencyStats:
+    """按接口统计请求数、错误数和最近请求的延迟分位数"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.routes = {}
+
+    def record(self, route, seconds, error=False):
+        stats = self.routes.setdefault(route, {"count": 0, "errors": 0, "samples": deque(maxlen=self.window)})
+        stats["count"] += 1
+        stats["errors"] += int(error)
+        stats["samples"].append(seconds * 1000)
+
+    def summary(self):
+        result = {}
+        for route, stats in self.routes.items():
+            samples = sorted(stats["samples"])
+
+            def percentile(p):
+                return round(samples[min(len(samples) - 1, int(len(samples) * p))], 3) if samples else 0.0
+
+            result[route] = {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": round(samples[-1], 3) if samples else 0.0,
+            }
+        return result
+
+
+# ---- 服务 ----
+
+class ScoringService:
+    """评分服务：连接处理在事件循环中，评分计算交给进程池"""
+
+    def __init__(self, catalog, workers=None, tenants=None):
+        self.catalog = catalog
+        self.workers = workers or os.cpu_count() or 1
+        self.metrics = LatencyStats()
+        self.tenants = tenants or TenantRegistry()
+        self.snapshot_path = snapshot_tempfile(catalog)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.snapshot_path, catalog.version, self.tenants.directory),
+        )
+        self.routes = {
+            ("POST", "/v1/score"): self.handle_score,
+            ("POST", "/v1/score/batch"): self.handle_batch,
+            ("POST", "/v1/score/batch.arrow"): self.handle_batch_arrow,
+            ("GET", "/metrics"): self.handle_metrics,
+            ("GET", "/healthz"): self.handle_health,
+        }
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    @staticmethod
+    def _top_k(payload):
+        top_k = payload.get("top_k")
+        if top_k is not None and (not isinstance(top_k, int) or top_k < 1):
+            raise HTTPError(400, "top_k必须是正整数")
+        return top_k
+
+    def _tenant(self, payload):
+        """请求指定的租户和对应目录，不指定时为 (None, 基础目录)"""
+        tenant = payload.get("tenant")
+        if tenant is None:
+            return None, self.catalog
+        if not isinstance(tenant, str):
+            raise HTTPError(400, "tenant必须是字符串")
+        try:
+            return tenant, self.tenants.catalog_for(tenant, self.catalog)
+        except KeyError:
+            raise HTTPError(404, f"未知租户：{tenant}")
+
+    async def handle_score(self, payload):
+        profile = payload.get("profile")
+        if not isinstance(profile, dict):
+            raise HTTPError(400, "缺少profile对象")
+        tenant, catalog = self._tenant(payload)
+        results = await self._run(_score_chunk, [profile], self._top_k(payload), tenant)
+        return {"catalog_version": catalog.version, "results": results[0]}
+
+    async def handle_batch(self, payload):
+        profiles = payload.get("profiles")
+        if not isinstance(profiles, list) or not all(isinstance(p, dict) for p in profiles):
+            raise HTTPError(400, "profiles必须是对象数组")
+        top_k = self._top_k(payload)
+        tenant, catalog = self._tenant(payload)
+        chunks = [profiles[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(profiles), BATCH_CHUNK_SIZE)]
+        scored = await asyncio.gather(*(self._run(_score_chunk, chunk, top_k, tenant) for chunk in chunks))
+        return {
+            "catalog_version": catalog.version,
+            "results": [ranked for chunk in scored for ranked in chunk],
+        }
+
+    async def handle_batch_arrow(self, payload):
+        from arrow_io import ARROW_BATCH_PROFILES, IPC_STREAM_EOS, serialize_schema
+        profiles = payload.get("profiles")
+        if not isinstance(profiles, list) or not all(isinstance(p, dict) for p in profiles):
+            raise HTTPError(400, "profiles必须是对象数组")
+        top_k = self._top_k(payload)
+        tenant, _ = self._tenant(payload)
+        starts = range(0, len(profiles), ARROW_BATCH_PROFILES)
+
+        async def chunks():
+            yield serialize_schema()
+            # 同时在算的批次数有上限，按顺序写出，内存占用与总行数无关
+            window = []
+            try:
+                for start in starts:
+                    window.append(asyncio.ensure_future(self._run(
+                        _score_arrow_chunk, profiles[start:start + ARROW_BATCH_PROFILES], top_k, start, tenant
+                    )))
+                    if len(window) >= self.workers * 2:
+                        yield await window.pop(0)
+                while window:
+                    yield await window.pop(0)
+                yield IPC_STREAM_EOS
+            finally:
+                # 中途出错或客户端断开时，不再等待还没开始的批次
+                for pending in window:
+                    pending.cancel()
+
+        return StreamResponse("application/vnd.apache.arrow.stream", chunks())
+
+    async def handle_metrics(self, payload):
+        return {"catalog_version": self.catalog.version, "workers": self.workers, "routes": self.metrics.summary()}
+
+    async def handle_health(self, payload):
+        return {"status": "ok"}
+
+    async def _read_request(self, reader):
+        request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "请求行格式错误")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Content-Length格式错误")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "请求体过大")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        # HTTP/1.0客户端不认识分块传输
+        chunked = version == "HTTP/1.1"
+        return method, target.split("?", 1)[0], body, keep_alive, chunked
+
+    async def _dispatch(self, method, path, body):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(405, "不支持的请求方法")
+            raise HTTPError(404, "接口不存在")
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "请求体不是合法的JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "请求体必须是JSON对象")
+        return await handler(payload)
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+    @staticmethod
+    async def _write_stream(writer, status, response, keep_alive, chunked=True):
+        """写出流式响应；不分块时以关闭连接表示响应结束，调用方不能再复用连接"""
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            + ("Transfer-Encoding: chunked\r\n" if chunked else "")
+            + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        try:
+            async for chunk in response.chunks:
+                if chunk:
+                    writer.write((f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n") if chunked else chunk)
+                    # 等待客户端读走再生成下一块，慢客户端自然形成背压
+                    await writer.drain()
+        finally:
+            await response.chunks.aclose()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+
+    async def handle_connection(self, reader, writer):
+        """一个连接上按顺序处理多个请求（HTTP/1.1 keep-alive）"""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as exc:
+                    self._write_response(writer, exc.status, {"error": exc.message}, False)
+                    break
+                if request is None:
+                    break
+
+                method, path, body, keep_alive, chunked = request
+                started = time.perf_counter()
+                try:
+                    status, payload = 200, await self._dispatch(method, path, body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {"error": exc.message}
+                except Exception:
+                    logger.exception("处理请求失败: %s %s", method, path)
+                    status, payload = 500, {"error": "服务器内部错误"}
+                # 未知路径统一归类，避免指标的键无限增长
+                route = f"{method} {path}" if (method, path) in self.routes else "unmatched"
+                try:
+                    if isinstance(payload, StreamResponse):
+                        keep_alive = keep_alive and chunked
+                        await self._write_stream(writer, status, payload, keep_alive, chunked)
+                    else:
+                        self._write_response(writer, status, payload, keep_alive)
+                    await writer.drain()
+                except ConnectionError:
+                    self.metrics.record(route, time.perf_counter() - started, True)
+                    break
+                except Exception:
+                    # 分块响应的状态行已经发出，只能记为失败并断开连接；
+                    # 客户端收不到结束块（不分块时收不到Arrow流的结束标记），能据此知道响应不完整
+                    logger.exception("写出响应失败: %s %s", method, path)
+                    self.metrics.record(route, time.perf_counter() - started, True)
+                    break
+                self.metrics.record(route, time.perf_counter() - started, status >= 500)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        logger.info("评分服务已启动：http://%s:%d", host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown()
+        try:
+            os.remove(self.snapshot_path)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI副业利基市场评分服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="评分进程数，默认等于CPU核数")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from refresh import build_snapshot
+    service = ScoringService(build_snapshot(version=1).catalog, args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
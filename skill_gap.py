@@ -0,0 +1,89 @@
+# 技能差距敏感度：学会每个尚未掌握的技能后，各利基匹配度和推荐排名的变化
+from dataclasses import dataclass
+
+import numpy as np
+
+from experiments import served_totals
+from scoring import SCORE_WEIGHTS, feasible_rows, score_breakdown, top_k_rows
+
+
+@dataclass(frozen=True)
+class SkillUplift:
+    """学会一个技能带来的变化，top_k是学会后的前k名 ((利基名称, 匹配度), ...)"""
+    skill: str
+    top_k_gain: float
+    total_uplift: float
+    best_niche: str
+    best_uplift: float
+    benefited: int
+    top_k: tuple
+    new_entries: tuple
+
+
+def uplift_matrix(user_profile, catalog, variant=None):
+    """每个候选技能学会后各利基的总分，返回 (候选技能, 列对应的利基名称, 当前总分, 新总分)
+
+    只包含满足画像硬性条件的利基。技能得分是已掌握技能数除以要求数，其余部分与技能无关，
+    所以所有候选技能一次算成 (技能数, 利基数) 的矩阵，不需要逐个重新评分；
+    总分与推荐页相同：按实验变体的权重合成，再混合协同过滤得分（学会的技能也是画像属性）。
+    """
+    rows = feasible_rows(user_profile, catalog)
+    names = catalog.names if rows is None else [catalog.names[row] for row in rows.tolist()]
+    breakdown = score_breakdown(user_profile, catalog, rows)
+    skill_matrix = catalog.skill_matrix if rows is None else catalog.skill_matrix[rows]
+    skill_counts = catalog.skill_counts if rows is None else catalog.skill_counts[rows]
+    owned = set(user_profile.get("skills", []))
+    owned_cols = [col for col, skill in enumerate(catalog.skills) if skill in owned]
+    candidate_cols = [col for col, skill in enumerate(catalog.skills) if skill not in owned]
+    candidates = tuple(catalog.skills[col] for col in candidate_cols)
+
+    matched = skill_matrix[:, owned_cols].sum(axis=1)
+    new_matched = matched[None, :] + skill_matrix[:, candidate_cols].T
+    learned = {**breakdown, "skills": new_matched / skill_counts * SCORE_WEIGHTS["skills"]}
+    learned_profiles = [
+        {**user_profile, "skills": [*user_profile.get("skills", []), skill]} for skill in candidates
+    ]
+    base = served_totals(breakdown, [user_profile], names, variant)[0]
+    totals = served_totals(learned, learned_profiles, names, variant)
+    return candidates, names, base, totals
+
+
+def skill_uplift(user_profile, catalog=None, top_k=3, variant=None):
+    """按学会后前k名平均匹配度的提升从高到低返回 [SkillUplift]
+
+    提升相同时按所有利基的匹配度提升总和排序；variant是会话分到的实验变体。
+    """
+    if catalog is None:
+        from refresh import get_snapshot
+        catalog = get_snapshot().catalog
+    candidates, names, base, totals = uplift_matrix(user_profile, catalog, variant)
+    if not candidates or not names:
+        return []
+
+    k = min(top_k, len(names))
+    base = np.round(base, 1)
+    totals = np.round(totals, 1)
+    base_rows = top_k_rows(base, k)
+    rows = top_k_rows(totals, k)
+    uplift = totals - base
+
+    top_k_gain = np.take_along_axis(totals, rows, axis=1).mean(axis=1) - base[base_rows].mean()
+    total_uplift = uplift.sum(axis=1)
+    best = uplift.argmax(axis=1)
+    benefited = (uplift > 0).sum(axis=1)
+    order = np.lexsort((-total_uplift, -np.round(top_k_gain, 1)))
+
+    base_set = set(base_rows.tolist())
+    return [
+        SkillUplift(
+            skill=candidates[i],
+            top_k_gain=round(float(top_k_gain[i]), 1),
+            total_uplift=round(float(total_uplift[i]), 1),
+            best_niche=names[best[i]],
+            best_uplift=round(float(uplift[i, best[i]]), 1),
+            benefited=int(benefited[i]),
+            top_k=tuple((names[row], float(totals[i, row])) for row in rows[i].tolist()),
+            new_entries=tuple(names[row] for row in rows[i].tolist() if row not in base_set),
+        )
+        for i in order.tolist()
+    ]
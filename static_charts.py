@@ -0,0 +1,183 @@
+# 轻量模式的静态图表：服务端直接生成紧凑的SVG，客户端不需要加载plotly.js
+#
+# 只画页面需要的三种图（气泡矩阵、折线图、雷达图），坐标保留一位小数，
+# 单张图一般只有几KB，而交互式图表的JSON加上plotly.js运行时有数MB。
+import math
+from html import escape
+
+# 与plotly默认配色一致，切换模式时颜色含义不变
+PALETTE = ["#636efa", "#EF553B", "#00cc96", "#ab63fa", "#FFA15A", "#19d3f3", "#FF6692", "#B6E880"]
+
+WIDTH = 640
+HEIGHT = 400
+
+# 绘图区四周留白：上、右、下、左
+_MARGIN = (48, 150, 48, 56)
+
+_FONT = 'font-family="sans-serif"'
+
+
+def _svg(body, width=WIDTH, height=HEIGHT):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'width="{width}" height="{height}" {_FONT} font-size="12">{"".join(body)}</svg>'
+    )
+
+
+def _text(x, y, text, anchor="start", size=None, weight=None, color="#444"):
+    attrs = f' font-size="{size}"' if size else ""
+    attrs += f' font-weight="{weight}"' if weight else ""
+    return f'<text x="{x:.1f}" y="{y:.1f}" text-anchor="{anchor}" fill="{color}"{attrs}>{escape(str(text))}</text>'
+
+
+def _title(title, width=WIDTH):
+    return _text(width / 2, 24, title, anchor="middle", size=16, weight="bold", color="#222")
+
+
+def _text_width(text, size=12):
+    """估算文字宽度：中日韩字符按一个字号宽，其余按0.6个字号宽"""
+    return sum(size if ord(char) >= 0x2E80 else size * 0.6 for char in str(text))
+
+
+def _legend(entries, x, y):
+    """右侧图例，entries是 [(名称, 颜色)]，返回图形元素和图例右边缘的x坐标"""
+    body = []
+    for i, (name, color) in enumerate(entries):
+        row_y = y + i * 20
+        body.append(f'<rect x="{x}" y="{row_y - 9}" width="12" height="12" fill="{color}"/>')
+        body.append(_text(x + 18, row_y + 1, name))
+    right = x + 18 + max((_text_width(name) for name, _ in entries), default=0)
+    return body, right
+
+
+def _legend_width(right):
+    # 译名较长时加宽画布放下图例，绘图区大小不变
+    return max(WIDTH, math.ceil(right + 8))
+
+
+def _axes(x_ticks, y_ticks, x_title, y_title, to_x, to_y):
+    """坐标轴、刻度和网格线，ticks是 [(数值, 文字)]"""
+    top, right, bottom, left = _MARGIN
+    plot_right, plot_bottom = WIDTH - right, HEIGHT - bottom
+    body = []
+    for value, label in y_ticks:
+        y = to_y(value)
+        body.append(f'<line x1="{left}" y1="{y:.1f}" x2="{plot_right}" y2="{y:.1f}" stroke="#e5e5e5"/>')
+        body.append(_text(left - 6, y + 4, label, anchor="end"))
+    for value, label in x_ticks:
+        x = to_x(value)
+        body.append(_text(x, plot_bottom + 16, label, anchor="middle"))
+    body.append(f'<line x1="{left}" y1="{plot_bottom}" x2="{plot_right}" y2="{plot_bottom}" stroke="#999"/>')
+    body.append(f'<line x1="{left}" y1="{top}" x2="{left}" y2="{plot_bottom}" stroke="#999"/>')
+    body.append(_text((left + plot_right) / 2, HEIGHT - 10, x_title, anchor="middle"))
+    body.append(
+        f'<text x="14" y="{(top + plot_bottom) / 2:.1f}" text-anchor="middle" fill="#444" '
+        f'transform="rotate(-90 14 {(top + plot_bottom) / 2:.1f})">{escape(y_title)}</text>'
+    )
+    return body
+
+
+def _scale(low, high, start, end):
+    span = (high - low) or 1
+    return lambda value: start + (value - low) / span * (end - start)
+
+
+def bubble_svg(points, title, x_title, y_title, x_range=(0, 3.5), y_range=(0, 3.5)):
+    """气泡矩阵，points是 [(名称, x, y, 大小, 分组)]，同一分组同一颜色，名称直接标在气泡旁"""
+    top, right, bottom, left = _MARGIN
+    to_x = _scale(x_range[0], x_range[1], left, WIDTH - right)
+    to_y = _scale(y_range[0], y_range[1], HEIGHT - bottom, top)
+    groups = list(dict.fromkeys(group for *_, group in points))
+    colors = {group: PALETTE[i % len(PALETTE)] for i, group in enumerate(groups)}
+    largest = max((size for _, _, _, size, _ in points), default=1) or 1
+
+    ticks = [(value, f"{value:g}") for value in (0.5, 1, 1.5, 2, 2.5, 3)]
+    body = [_title(title)] + _axes(ticks, ticks, x_title, y_title, to_x, to_y)
+    # 静态图没有悬停提示，位置相同的气泡把名称依次往上排，避免文字重叠
+    stacked = {}
+    for name, x, y, size, group in points:
+        radius = 8 + 14 * size / largest
+        cx, cy = to_x(x), to_y(y)
+        body.append(
+            f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{radius:.1f}" fill="{colors[group]}" '
+            f'fill-opacity="0.6" stroke="{colors[group]}"/>'
+        )
+        label_y = min(stacked.get((x, y), cy - radius - 4), cy - radius - 4)
+        stacked[(x, y)] = label_y - 14
+        body.append(_text(cx, label_y, name, anchor="middle", size=11))
+    legend, legend_right = _legend([(group, colors[group]) for group in groups], WIDTH - right + 16, top + 10)
+    return _svg(body + legend, _legend_width(legend_right))
+
+
+def line_svg(x_labels, series, title, x_title, y_title):
+    """多条折线，series是 {名称: 数值列表}，数值与x_labels一一对应"""
+    top, right, bottom, left = _MARGIN
+    values = [value for points in series.values() for value in points]
+    high = max(values, default=1)
+    step = _nice_step(high)
+    y_max = math.ceil(high / step) * step
+    to_x = _scale(0, max(len(x_labels) - 1, 1), left + 10, WIDTH - right - 10)
+    to_y = _scale(0, y_max, HEIGHT - bottom, top)
+
+    y_ticks = [(value, f"{value:g}") for value in range(0, int(y_max) + 1, int(step))]
+    x_ticks = list(enumerate(x_labels))
+    body = [_title(title)] + _axes(x_ticks, y_ticks, x_title, y_title, to_x, to_y)
+    entries = []
+    for i, (name, points) in enumerate(series.items()):
+        color = PALETTE[i % len(PALETTE)]
+        path = " ".join(f"{to_x(j):.1f},{to_y(value):.1f}" for j, value in enumerate(points))
+        body.append(f'<polyline points="{path}" fill="none" stroke="{color}" stroke-width="2.5"/>')
+        body += [
+            f'<circle cx="{to_x(j):.1f}" cy="{to_y(value):.1f}" r="3" fill="{color}"/>'
+            for j, value in enumerate(points)
+        ]
+        entries.append((name, color))
+    legend, legend_right = _legend(entries, WIDTH - right + 16, top + 10)
+    return _svg(body + legend, _legend_width(legend_right))
+
+
+def _nice_step(high, ticks=5):
+    """让刻度落在1、2、5乘以10的幂上"""
+    raw = max(high, 1) / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def radar_svg(categories, values, title, max_value=100, color="rgb(32, 201, 151)"):
+    """单组数据的雷达图，各轴从圆心的0到边缘的max_value"""
+    size = 420
+    radius = 140
+    count = max(len(categories), 1)
+    # 轴标签写在左右两侧时，按最长的标签向两边加宽画布
+    label_reach = [
+        abs(radius * 1.15 * math.cos(-math.pi / 2 + 2 * math.pi * i / count)) + _text_width(category)
+        for i, category in enumerate(categories)
+    ]
+    width = max(size, math.ceil(2 * max(label_reach, default=0) + 16))
+    cx, cy = width / 2, size / 2 + 12
+
+    def point(i, value):
+        angle = -math.pi / 2 + 2 * math.pi * i / count
+        distance = radius * min(max(value, 0), max_value) / max_value
+        return cx + distance * math.cos(angle), cy + distance * math.sin(angle)
+
+    body = [_title(title, width)]
+    for level in (0.25, 0.5, 0.75, 1):
+        ring = " ".join(f"{x:.1f},{y:.1f}" for x, y in (point(i, max_value * level) for i in range(count)))
+        body.append(f'<polygon points="{ring}" fill="none" stroke="#e5e5e5"/>')
+        body.append(_text(cx + 4, cy - radius * level + 4, f"{max_value * level:g}", size=10, color="#999"))
+    for i, category in enumerate(categories):
+        x, y = point(i, max_value)
+        body.append(f'<line x1="{cx:.1f}" y1="{cy:.1f}" x2="{x:.1f}" y2="{y:.1f}" stroke="#e5e5e5"/>')
+        label_x, label_y = point(i, max_value * 1.15)
+        anchor = "middle" if abs(label_x - cx) < 10 else ("start" if label_x > cx else "end")
+        body.append(_text(label_x, label_y + 4, category, anchor=anchor))
+    shape = " ".join(f"{x:.1f},{y:.1f}" for x, y in (point(i, value) for i, value in enumerate(values)))
+    body.append(f'<polygon points="{shape}" fill="{color}" fill-opacity="0.35" stroke="{color}" stroke-width="2"/>')
+    for i, value in enumerate(values):
+        x, y = point(i, value)
+        body.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="{color}"/>')
+    return _svg(body, width, size)
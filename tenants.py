@@ -0,0 +1,310 @@
+# 多租户目录：各合作机构的改动作为覆盖层，写时复制地叠加在共享的基础目录上
+#
+# 每个租户一个JSON文件，放在 TENANT_OVERLAY_DIR（默认 tenants/）下，文件名就是租户id：
+#   {
+#     "added": {"本地利基名称": {...与AI_NICHES相同结构的完整数据...}},
+#     "patches": {"已有利基名称": {"收入潜力": "高", "市场需求": "中等"}}
+#   }
+# 页面链接带 ?tenant=<租户id> 时使用该租户的目录，评分服务的请求体中可带 "tenant" 字段。
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import ChainMap
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+
+import numpy as np
+
+from catalog import (
+    LEVEL_FIELDS, LEVEL_MAP, SCORE_LEVEL_FIELDS, SCORE_LEVEL_MAP, CompiledCatalog,
+    compile_catalog, niche_fingerprint,
+)
+
+logger = logging.getLogger(__name__)
+
+TENANT_OVERLAY_DIR = os.getenv("TENANT_OVERLAY_DIR", "tenants")
+
+# 覆盖层只能修改评级字段，文本和列表字段的改动请以新增利基的方式提供
+PATCHABLE_FIELDS = LEVEL_FIELDS
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+@dataclass(frozen=True)
+class TenantOverlay:
+    """一个租户对基础目录的改动"""
+    tenant: str
+    added: MappingProxyType
+    patches: MappingProxyType
+    digest: str
+
+    def __reduce__(self):
+        # MappingProxyType不能pickle，按普通字典传给工作进程后重新包装
+        patches = {name: dict(patch) for name, patch in self.patches.items()}
+        return _rebuild_overlay, (self.tenant, dict(self.added), patches, self.digest)
+
+
+def _rebuild_overlay(tenant, added, patches, digest):
+    return TenantOverlay(tenant, MappingProxyType(added), MappingProxyType(patches), digest)
+
+
+@dataclass(frozen=True)
+class OverlayInfo:
+    """租户目录与基础目录的关系，评分时只重算rescored_rows和新增的利基"""
+    tenant: str
+    digest: str
+    base: CompiledCatalog
+    # 改过时间投入或投资成本评级的基础目录行号
+    rescored_rows: np.ndarray
+    # 新增利基单独编译的小目录，没有新增时为None
+    extension: CompiledCatalog
+    # 叠加的覆盖层，其他进程映射基础目录的快照后用它重新叠加
+    source: TenantOverlay
+
+
+def parse_overlay(tenant, payload):
+    """把覆盖层JSON转成TenantOverlay，结构不对时抛出ValueError"""
+    if not TENANT_ID_PATTERN.match(tenant):
+        raise ValueError(f"租户id只能包含字母、数字、下划线和连字符：{tenant}")
+    if not isinstance(payload, dict):
+        raise ValueError(f"{tenant}：覆盖层必须是JSON对象")
+    added = payload.get("added", {})
+    patches = payload.get("patches", {})
+    if not isinstance(added, dict) or not isinstance(patches, dict):
+        raise ValueError(f"{tenant}：added和patches必须是对象")
+    problems = []
+    for name, patch in patches.items():
+        if not isinstance(patch, dict):
+            problems.append(f"{name}：修改内容必须是对象")
+            continue
+        for field, value in patch.items():
+            if field not in PATCHABLE_FIELDS:
+                problems.append(f"{name}：不能修改字段 {field}")
+            elif value not in LEVEL_MAP:
+                problems.append(f"{name}：{field} 必须是 {'/'.join(LEVEL_MAP)} 之一")
+    if problems:
+        raise ValueError(f"{tenant}：覆盖层有误：" + "；".join(problems))
+    digest = hashlib.sha1(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    return TenantOverlay(
+        tenant=tenant,
+        added=MappingProxyType(dict(added)),
+        patches=MappingProxyType({name: dict(patch) for name, patch in patches.items()}),
+        digest=digest,
+    )
+
+
+def load_overlay(path):
+    """读取覆盖层文件，租户id取文件名"""
+    tenant = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding="utf-8") as f:
+        return parse_overlay(tenant, json.load(f))
+
+
+class _OverlayInterestMatcher:
+    """基础目录的匹配器后面接上新增利基的匹配器，两者共用词表和IDF"""
+
+    def __init__(self, base, extension, offset):
+        self.base = base
+        self.extension = extension
+        self.offset = offset
+        self.threshold = base.threshold
+
+    def match_counts(self, interests):
+        return np.concatenate([self.base.match_counts(interests), self.extension.match_counts(interests)])
+
+    def match_counts_batch(self, interest_lists, rows=None):
+        counts = np.hstack([
+            self.base.match_counts_batch(interest_lists), self.extension.match_counts_batch(interest_lists)
+        ])
+        return counts if rows is None else counts[:, rows]
+
+    def match_count_for(self, interests, niche_info, niche_name="", row=None):
+        if row is not None and row >= self.offset:
+            return self.extension.match_count_for(interests, niche_info, niche_name, row - self.offset)
+        return self.base.match_count_for(interests, niche_info, niche_name, row)
+
+
+class _OverlaySearchIndex:
+    """基础目录和新增利基各自检索后按相关度合并"""
+
+    def __init__(self, base, extension):
+        self.base = base
+        self.extension = extension
+
+    def search(self, query, limit=10):
+        hits = self.base.search(query, limit) + self.extension.search(query, limit)
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return hits[:limit]
+
+
+def _overlay_problems(base, overlay):
+    problems = [f"{name}：基础目录中没有这个利基" for name in overlay.patches if name not in base.niches]
+    problems += [f"{name}：与基础目录中的利基重名" for name in overlay.added if name in base.niches]
+    return problems
+
+
+def apply_overlay(base, overlay):
+    """在基础目录上叠加租户的改动，返回租户的CompiledCatalog
+
+    没改动的部分直接引用基础目录：利基数据、指纹用ChainMap叠加，
+    评级数组只复制被改过的字段，检索和语义索引只为新增的利基另建一份小索引。
+    覆盖层与基础目录冲突时抛出ValueError。
+    """
+    problems = _overlay_problems(base, overlay)
+    if problems:
+        raise ValueError(f"{overlay.tenant}：覆盖层与基础目录冲突：" + "；".join(problems))
+
+    extension = None
+    added_names = tuple(overlay.added)
+    if added_names:
+        extension = compile_catalog(dict(overlay.added), version=base.version)
+        # 新增利基用基础目录的词表和IDF编码，基础目录各利基的语义得分不受影响
+        extension = replace(
+            extension, interest_matcher=base.interest_matcher.for_niches(added_names, overlay.added)
+        )
+
+    rows = {name: row for row, name in enumerate(base.names)}
+    overrides = {name: {**base.niches[name], **patch} for name, patch in overlay.patches.items()}
+    overrides.update(overlay.added)
+    names = base.names + added_names
+    niches = ChainMap(overrides, base.niches)
+    fingerprints = ChainMap({name: niche_fingerprint(info) for name, info in overrides.items()}, base.fingerprints)
+
+    def patched_levels(base_levels, extension_levels, level_map):
+        levels = {}
+        for field, values in base_levels.items():
+            changed = [(rows[name], patch[field]) for name, patch in overlay.patches.items() if field in patch]
+            if not changed and extension is None:
+                levels[field] = values
+                continue
+            values = np.concatenate([values, extension_levels[field]]) if extension is not None else values.copy()
+            for row, label in changed:
+                values[row] = level_map.get(label, 2)
+            values.setflags(write=False)
+            levels[field] = values
+        return levels
+
+    levels = patched_levels(base.levels, extension.levels if extension else None, LEVEL_MAP)
+    score_levels = patched_levels(
+        base.score_levels, extension.score_levels if extension else None, SCORE_LEVEL_MAP
+    )
+    rescored_rows = np.array(sorted(
+        rows[name] for name, patch in overlay.patches.items()
+        if any(field in patch for field in SCORE_LEVEL_FIELDS)
+    ), dtype=np.intp)
+
+    skills, skill_matrix, skill_counts = base.skills, base.skill_matrix, base.skill_counts
+    interest_matcher, search_index = base.interest_matcher, base.search_index
+    if extension is not None:
+        base_skills = set(base.skills)
+        skills = base.skills + tuple(skill for skill in extension.skills if skill not in base_skills)
+        skill_matrix = np.zeros((len(names), len(skills)), dtype=np.float64)
+        skill_matrix[:len(base.names), :len(base.skills)] = base.skill_matrix
+        columns = [skills.index(skill) for skill in extension.skills]
+        skill_matrix[len(base.names):, columns] = extension.skill_matrix
+        skill_matrix.setflags(write=False)
+        skill_counts = np.concatenate([base.skill_counts, extension.skill_counts])
+        skill_counts.setflags(write=False)
+        interest_matcher = _OverlayInterestMatcher(base.interest_matcher, extension.interest_matcher, len(base.names))
+        search_index = _OverlaySearchIndex(base.search_index, extension.search_index)
+
+    return CompiledCatalog(
+        # 版本号带上租户和覆盖层摘要，以版本为键的缓存自动按租户区分
+        version=f"{base.version}/{overlay.tenant}@{overlay.digest[:8]}",
+        names=names,
+        niches=MappingProxyType(niches),
+        fingerprints=MappingProxyType(fingerprints),
+        levels=MappingProxyType(levels),
+        score_levels=MappingProxyType(score_levels),
+        skills=skills,
+        skill_matrix=skill_matrix,
+        skill_counts=skill_counts,
+        interest_matcher=interest_matcher,
+        search_index=search_index,
+        overlay=OverlayInfo(overlay.tenant, overlay.digest, base, rescored_rows, extension, overlay),
+    )
+
+
+class TenantRegistry:
+    """从覆盖层目录加载租户
+
+    覆盖层文件按修改时间重新读取；租户目录在基础目录换版本或覆盖层变化时才重新叠加，
+    数百个租户共用同一份基础目录。
+    """
+
+    def __init__(self, directory=TENANT_OVERLAY_DIR):
+        self.directory = directory
+        self._overlays = {}
+        self._catalogs = {}
+        self._lock = threading.Lock()
+
+    def tenants(self):
+        """覆盖层目录中的租户id"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def overlay(self, tenant):
+        """租户的覆盖层，租户不存在时返回None，文件有误时抛出ValueError"""
+        if not TENANT_ID_PATTERN.match(tenant):
+            return None
+        path = os.path.join(self.directory, f"{tenant}.json")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._overlays.get(tenant)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        overlay = load_overlay(path)
+        with self._lock:
+            self._overlays[tenant] = (mtime, overlay)
+        return overlay
+
+    def catalog_for(self, tenant, base):
+        """租户在当前基础目录上的目录，租户不存在时抛出KeyError"""
+        overlay = self.overlay(tenant)
+        if overlay is None:
+            raise KeyError(tenant)
+        with self._lock:
+            catalog = self._catalogs.get(tenant)
+        if catalog is not None and catalog.overlay.base is base and catalog.overlay.digest == overlay.digest:
+            return catalog
+        catalog = apply_overlay(base, overlay)
+        with self._lock:
+            self._catalogs[tenant] = catalog
+        return catalog
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tenant_registry():
+    """进程内共享的租户注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TenantRegistry()
+        return _registry
+
+
+def current_catalog(tenant=None):
+    """当前快照的目录；指定租户时叠加该租户的改动，租户不存在或覆盖层有误时退回基础目录"""
+    from refresh import get_snapshot
+    base = get_snapshot().catalog
+    if not tenant:
+        return base
+    try:
+        return get_tenant_registry().catalog_for(tenant, base)
+    except KeyError:
+        logger.warning("未知租户：%s", tenant)
+    except (OSError, ValueError):
+        logger.exception("加载租户 %s 的覆盖层失败", tenant)
+    return base
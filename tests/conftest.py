@@ -0,0 +1,52 @@
+# 测试直接导入仓库根目录下的模块
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+def _niche(**fields):
+    niche_info = {
+        "description": "测试方向",
+        "市场需求": "中等", "竞争程度": "中等", "收入潜力": "中等", "投资成本": "低", "时间投入": "中等",
+        "技能要求": ["写作能力"], "适合人群": ["学生"], "工具推荐": ["ChatGPT"],
+        "学习资源": ["入门教程"], "启动步骤": ["注册账号"],
+    }
+    niche_info.update(fields)
+    return niche_info
+
+
+@pytest.fixture
+def make_niche():
+    """构造一个字段齐全的利基数据，关键字参数覆盖默认字段"""
+    return _niche
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    """用仓库自带的AI_NICHES编译的目录"""
+    from catalog import compile_catalog
+    from data import AI_NICHES
+    return compile_catalog(AI_NICHES, version=1)
+
+
+@pytest.fixture
+def cf_model(catalog, monkeypatch):
+    """覆盖目录全部利基和技能属性的随机因子模型，替换评分时使用的协同过滤模型"""
+    import numpy as np
+    import scoring
+    from cf_model import CF_FACTORS, CFModel
+    rng = np.random.default_rng(0)
+    features = [f"skills={skill}" for skill in catalog.skills]
+    model = CFModel(
+        version="test",
+        feedback=1000,
+        features={feature: row for row, feature in enumerate(features)},
+        niches={name: row for row, name in enumerate(catalog.names)},
+        feature_factors=rng.random((len(features), CF_FACTORS)) / 4,
+        niche_factors=rng.random((len(catalog.names), CF_FACTORS)) / 4,
+    )
+    monkeypatch.setattr(scoring, "get_cf_model", lambda: model)
+    return model
@@ -0,0 +1,32 @@
+import action_plan
+from action_plan import action_plan_for, build_action_plan
+from catalog import compile_catalog
+from scoring import rank_niches
+
+
+def test_plan_uses_best_ranked_niche(catalog):
+    user_profile = {"skills": ["编程基础"], "interests": [], "time_availability": "10-20小时"}
+    plan = action_plan_for(user_profile, catalog)
+    assert (plan.niche, plan.score) == rank_niches(user_profile, catalog)[0]
+    assert len(plan.weeks) == 4
+
+
+def test_infeasible_profile_is_cached(make_niche, monkeypatch):
+    expensive = compile_catalog({"贵的方向": make_niche(投资成本="高")}, version=101)
+    user_profile = {"investment_capacity": "1000元以下", "hard_constraints": ["budget"]}
+    calls = []
+
+    def counting_rank(*args):
+        calls.append(args)
+        return rank_niches(*args)
+
+    monkeypatch.setattr(action_plan, "rank_niches", counting_rank)
+    assert action_plan_for(user_profile, expensive) is None
+    assert action_plan_for(user_profile, expensive) is None
+    assert len(calls) == 1
+
+
+def test_build_action_plan_weeks(make_niche):
+    plan = build_action_plan("测试", make_niche(工具推荐=["A", "B"]))
+    assert plan.weeks[1].tasks == ("注册并试用A", "注册并试用B")
+    assert plan.to_dict()["weeks"][0]["tasks"] == ["学习入门教程"]
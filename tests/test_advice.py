@@ -0,0 +1,120 @@
+import threading
+from types import MappingProxyType, SimpleNamespace
+
+from advice import AdviceCache, AdviceGenerator, build_messages, fallback_advice
+from llm_stub import make_server
+from locales import LocaleBundle, get_bundle
+from outbound import OutboundGateway
+
+USER_PROFILE = {"skills": ["写作能力"], "interests": ["内容创作"]}
+
+
+class FakeClient:
+    """按固定token流式返回的聊天接口，记录调用次数"""
+
+    def __init__(self, tokens, error=None):
+        self.tokens = tokens
+        self.error = error
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+
+        async def stream():
+            for token in self.tokens:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+        return stream()
+
+
+def _recommendation(catalog, name, score=70.0):
+    return {"利基市场": name, "匹配度": score, "info": catalog.niches[name]}
+
+
+def test_fallback_levels():
+    assert fallback_advice(85)[0] == "success"
+    assert fallback_advice(60)[0] == "info"
+    assert fallback_advice(59.9)[0] == "warning"
+
+
+def test_stream_then_cache(catalog, tmp_path):
+    client = FakeClient(["先", "学", "写作"])
+    generator = AdviceGenerator(AdviceCache(str(tmp_path)), client, OutboundGateway())
+    recs = [_recommendation(catalog, "内容创作")]
+    assert "".join(generator.stream_batch(USER_PROFILE, recs)[0]) == "先学写作"
+    # 第二次直接读磁盘缓存，不再请求
+    assert list(generator.stream_batch(USER_PROFILE, recs)[0]) == ["先学写作"]
+    assert client.calls == 1
+
+
+def test_against_stub_server(catalog, tmp_path, monkeypatch):
+    server = make_server(port=0, token_delay=0.01)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    try:
+        generator = AdviceGenerator(AdviceCache(str(tmp_path)), gateway=OutboundGateway())
+        recs = [_recommendation(catalog, "内容创作"), _recommendation(catalog, "AI教育培训")]
+        streams = generator.stream_batch(USER_PROFILE, recs)
+        texts = []
+        for rec, stream in zip(recs, streams):
+            tokens = list(stream)
+            assert len(tokens) > 1 and rec["利基市场"] in "".join(tokens)
+            texts.append("".join(tokens))
+        assert len(server.requests) == 2 and all(request["stream"] for request in server.requests)
+        # 之后的请求命中磁盘缓存
+        assert [list(stream) for stream in generator.stream_batch(USER_PROFILE, recs)] == [[text] for text in texts]
+        assert len(server.requests) == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_identical_requests_share_one_call(catalog, tmp_path, monkeypatch):
+    server = make_server(port=0, token_delay=0.02)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    try:
+        generator = AdviceGenerator(AdviceCache(str(tmp_path)), gateway=OutboundGateway())
+        recs = [_recommendation(catalog, "内容创作")]
+        # 第二个会话在第一个还在流式接收时发出相同请求，只等完整结果
+        leader = generator.stream_batch(USER_PROFILE, recs)[0]
+        follower = generator.stream_batch(USER_PROFILE, recs)[0]
+        tokens = list(leader)
+        assert len(tokens) > 1
+        assert list(follower) == ["".join(tokens)]
+        assert len(server.requests) == 1
+        assert generator.gateway.metrics()["openai"]["coalesced"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_error_yields_translated_fallback(catalog, tmp_path):
+    client = FakeClient([], error=RuntimeError("down"))
+    generator = AdviceGenerator(AdviceCache(str(tmp_path)), client, OutboundGateway())
+    recs = [_recommendation(catalog, "内容创作", score=90)]
+    source = fallback_advice(90)[1]
+    bundle = LocaleBundle("en", MappingProxyType({source: "Great fit"}), MappingProxyType({}))
+    stream = generator.stream_batch(USER_PROFILE, recs, bundle)[0]
+    assert list(stream) == ["Great fit"]
+    assert AdviceCache(str(tmp_path)).get(AdviceCache().key(USER_PROFILE, "内容创作", recs[0]["info"], "en")) is None
+
+
+def test_prompt_and_cache_follow_locale(catalog, tmp_path):
+    info = catalog.niches["内容创作"]
+    prompt = build_messages(USER_PROFILE, "内容创作", info, 80, "en")[1]["content"]
+    assert "Reply in English" in prompt and "请用中文" not in prompt
+    assert get_bundle("en").niche("内容创作", info)["description"] in prompt
+    assert "请用中文" in build_messages(USER_PROFILE, "内容创作", info, 80)[1]["content"]
+
+    client = FakeClient(["先学写作"])
+    generator = AdviceGenerator(AdviceCache(str(tmp_path)), client, OutboundGateway())
+    recs = [_recommendation(catalog, "内容创作")]
+    assert "".join(generator.stream_batch(USER_PROFILE, recs)[0]) == "先学写作"
+    # 英文会话不会拿到中文缓存，另行生成并分开缓存
+    client.tokens = ["Practice writing"]
+    assert "".join(generator.stream_batch(USER_PROFILE, recs, get_bundle("en"))[0]) == "Practice writing"
+    assert list(generator.stream_batch(USER_PROFILE, recs)[0]) == ["先学写作"]
+    assert client.calls == 2
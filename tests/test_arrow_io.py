@@ -0,0 +1,42 @@
+import pyarrow as pa
+
+from arrow_io import SCORE_SCHEMA, ipc_stream_chunks, iter_record_batches, write_ipc_file
+from scoring import rank_niches
+
+PROFILES = [
+    {"id": "a", "skills": ["写作能力"], "interests": ["内容创作"], "time_availability": "5-10小时"},
+    {"skills": ["编程基础"], "investment_capacity": "1000元以下", "hard_constraints": ["budget"]},
+    {"id": "c"},
+]
+
+
+def _table(catalog, top_k=None, batch_profiles=2):
+    return pa.Table.from_batches(list(iter_record_batches(PROFILES, catalog, top_k, batch_profiles)), SCORE_SCHEMA)
+
+
+def test_rows_match_rank_niches(catalog):
+    rows = _table(catalog, top_k=3).to_pylist()
+    for profile_id, user_profile in zip(["a", "1", "c"], PROFILES):
+        ranked = [(row["niche"], row["score"]) for row in rows if row["profile_id"] == profile_id]
+        assert ranked == rank_niches(user_profile, catalog)[:3]
+        assert [row["rank"] for row in rows if row["profile_id"] == profile_id] == [1, 2, 3]
+
+
+def test_infeasible_niches_are_dropped(catalog):
+    table = _table(catalog)
+    constrained = [row for row in table.to_pylist() if row["profile_id"] == "1"]
+    assert len(constrained) == len(rank_niches(PROFILES[1], catalog)) < len(catalog.names)
+    assert [row["rank"] for row in constrained] == list(range(1, len(constrained) + 1))
+
+
+def test_ipc_stream_round_trip(catalog):
+    data = b"".join(ipc_stream_chunks(iter_record_batches(PROFILES, catalog, 2, batch_profiles=1)))
+    table = pa.ipc.open_stream(data).read_all()
+    assert table.equals(_table(catalog, top_k=2))
+
+
+def test_ipc_file(catalog, tmp_path):
+    path = str(tmp_path / "scores.arrow")
+    assert write_ipc_file(path, iter_record_batches(PROFILES, catalog, 2)) == 6
+    with pa.memory_map(path) as source:
+        assert pa.ipc.open_file(source).read_all().equals(_table(catalog, top_k=2))
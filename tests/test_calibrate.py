@@ -0,0 +1,60 @@
+import numpy as np
+
+from calibrate import COMPONENTS, calibrate, evaluate_weights, grid_weights, load_calibration_set, random_weights
+from scoring import SCORE_WEIGHTS, score_breakdown_batch
+
+RECORDS = [
+    {"skills": ["写作能力"], "interests": ["内容创作"], "chosen_niche": "内容创作"},
+    {"skills": ["编程基础"], "interests": ["技术开发"], "chosen_niche": "AI应用开发"},
+    {"skills": ["沟通能力"], "time_availability": "5小时以下", "chosen_niche": "AI数据标注"},
+    {"skills": [], "chosen_niche": "不存在的方向"},
+]
+WEIGHTS = np.array([[40, 20, 20, 20], [100, 0, 0, 0], [10, 30, 30, 30]], dtype=np.float32)
+
+
+def _brute_force_ranks(records, catalog, weights):
+    """逐个画像、逐组权重排序，标签方向前面的同分利基算领先"""
+    breakdown = score_breakdown_batch(records, catalog)
+    ranks = []
+    for i, record in enumerate(records):
+        label = catalog.names.index(record["chosen_niche"])
+        units = np.stack(
+            [breakdown[component][i] / SCORE_WEIGHTS[component] for component in COMPONENTS], axis=-1
+        ).astype(np.float32)
+        row = []
+        for weight in weights:
+            scores = units @ weight
+            row.append(sum(
+                1 for j, score in enumerate(scores)
+                if score > scores[label] + 1e-9 or (j < label and score >= scores[label] - 1e-9)
+            ))
+        ranks.append(row)
+    return np.array(ranks)
+
+
+def test_metrics_match_brute_force(catalog):
+    deltas, before, skipped = load_calibration_set(iter(RECORDS), catalog, batch_size=2)
+    assert skipped == 1 and deltas.shape == (3, len(catalog.names), len(COMPONENTS))
+    ranks = _brute_force_ranks(RECORDS[:3], catalog, WEIGHTS)
+    metrics = evaluate_weights(WEIGHTS, deltas, before, k=1)
+    assert np.allclose(metrics["hit@1"], (ranks < 1).mean(axis=0))
+    assert np.allclose(metrics["mrr"], (1 / (ranks + 1)).mean(axis=0))
+    assert np.allclose(metrics["ndcg"], (1 / np.log2(ranks + 2)).mean(axis=0))
+    # 分块大小不影响结果
+    small = evaluate_weights(WEIGHTS, deltas, before, k=1, block_elements=1)
+    assert all(np.allclose(small[name], values) for name, values in metrics.items())
+
+
+def test_weight_candidates():
+    grid = grid_weights(step=25)
+    assert len(grid) == 35 and (grid.sum(axis=1) == 100).all()
+    assert np.allclose(random_weights(10, seed=1).sum(axis=1), 100, atol=1e-3)
+
+
+def test_calibrate_includes_current_weights(catalog):
+    deltas, before, _ = load_calibration_set(RECORDS, catalog)
+    results = calibrate(deltas, before, WEIGHTS[1:])
+    assert len(results) == 3
+    assert {"skills": 40.0, "time": 20.0, "investment": 20.0, "interests": 20.0} in [w for w, _ in results]
+    ndcg = [metrics["ndcg"] for _, metrics in results]
+    assert ndcg == sorted(ndcg, reverse=True)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from catalog import compile_catalog, diff_catalog, validate_catalog
+from data import AI_NICHES
+from scoring import score_breakdown_batch
+
+PROFILES = [
+    {"skills": ["写作能力", "编程基础"], "interests": ["视频制作", "有声书"], "time_availability": "10-20小时"},
+    {"skills": ["设计能力"], "interests": ["教育培训"], "investment_capacity": "5000-20000元"},
+]
+
+
+def _edited(make_niche):
+    niches = dict(AI_NICHES)
+    first, second = list(niches)[:2]
+    niches[first] = {**niches[first], "description": "用AI制作有声书和播客"}
+    del niches[second]
+    niches["AI播客"] = make_niche(description="AI配音和有声书", 技能要求=["写作能力", "配音"])
+    return niches, first, second
+
+
+def test_validate_catalog(make_niche):
+    assert validate_catalog({"好的": make_niche()}) == []
+    problems = validate_catalog({"坏的": make_niche(投资成本="很高", 技能要求=[])})
+    assert len(problems) == 2
+    with pytest.raises(ValueError):
+        compile_catalog({}, version=1)
+
+
+def test_diff_catalog(catalog, make_niche):
+    niches, changed, removed = _edited(make_niche)
+    assert diff_catalog(catalog, niches) == (["AI播客"], [changed], [removed])
+
+
+def test_incremental_compile_matches_full(catalog, make_niche):
+    niches, _, _ = _edited(make_niche)
+    incremental = compile_catalog(niches, version=2, previous=catalog)
+    full = compile_catalog(niches, version=2)
+    assert incremental.names == full.names and incremental.skills == full.skills
+    for component, values in score_breakdown_batch(PROFILES, full).items():
+        assert np.allclose(score_breakdown_batch(PROFILES, incremental)[component], values)
+    for query in ("有声书", "视频", "AI"):
+        assert [(hit.niche_name, hit.matches) for hit in incremental.search_index.search(query)] == \
+            [(hit.niche_name, hit.matches) for hit in full.search_index.search(query)]
+
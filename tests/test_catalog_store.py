@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import catalog_store
+from catalog_store import load_catalog_snapshot, load_startup_catalog, read_snapshot_meta, write_catalog_snapshot
+from data import AI_NICHES, load_market_trends
+from scoring import calculate_compatibility_score, score_breakdown_batch
+
+PROFILES = [
+    {"skills": ["写作能力", "编程基础"], "interests": ["视频制作", "编程", "学生"], "time_availability": "5-10小时"},
+    {"skills": [], "interests": ["数据"], "investment_capacity": "5000-20000元"},
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, catalog):
+    path = str(tmp_path / "catalog.snapshot")
+    write_catalog_snapshot(catalog, path, "digest", load_market_trends())
+    return path
+
+
+class _Source:
+    AI_NICHES = AI_NICHES
+
+    @staticmethod
+    def load_market_trends():
+        return load_market_trends()
+
+
+def test_snapshot_round_trip(catalog, snapshot_path):
+    loaded = load_catalog_snapshot(snapshot_path)
+    assert loaded.names == catalog.names
+    expected = score_breakdown_batch(PROFILES, catalog)
+    actual = score_breakdown_batch(PROFILES, loaded)
+    for component, values in expected.items():
+        np.testing.assert_array_equal(actual[component], values)
+    for query in ("视频", "AI", "数据 标注", "写"):
+        assert loaded.search_index.search(query) == catalog.search_index.search(query)
+    assert dict(loaded.fingerprints) == dict(catalog.fingerprints)
+    assert loaded.analysis_frame.equals(catalog.analysis_frame)
+
+
+def test_mapped_vocabulary_matches_dict(catalog, snapshot_path):
+    vocabulary = load_catalog_snapshot(snapshot_path).interest_matcher.index.vocabulary
+    assert len(vocabulary) == len(catalog.interest_matcher.index.vocabulary)
+    assert dict(vocabulary.items()) == dict(catalog.interest_matcher.index.vocabulary)
+    assert vocabulary.get("不存在的词") is None
+
+
+def test_scalar_path_uses_row_lookup(catalog, snapshot_path):
+    loaded = load_catalog_snapshot(snapshot_path)
+    for name in catalog.names:
+        assert loaded.row_of(loaded.niches[name]) == loaded.index_of(name)
+        assert calculate_compatibility_score(PROFILES[0], loaded.niches[name], loaded) == \
+            calculate_compatibility_score(PROFILES[0], catalog.niches[name], catalog)
+    # 内容相同但不是目录中的对象
+    assert loaded.row_of(dict(catalog.niches[catalog.names[0]])) is None
+
+
+def _source_file(tmp_path):
+    path = tmp_path / "data.py"
+    path.write_text("AI_NICHES = {}\n", encoding="utf-8")
+    return str(path)
+
+
+def test_startup_maps_valid_snapshot_without_loading_source(tmp_path):
+    source_path = _source_file(tmp_path)
+    path = str(tmp_path / "catalog.snapshot")
+    first = load_startup_catalog(source_path, _Source, path)
+
+    def fail():
+        raise AssertionError("快照有效时不应执行源文件")
+
+    second = load_startup_catalog(source_path, fail, path)
+    assert second.catalog.names == first.catalog.names
+    assert second.content_digest == first.content_digest
+    assert second.trends == load_market_trends()
+
+
+def test_startup_rebuilds_when_build_parameters_change(tmp_path, monkeypatch):
+    source_path = _source_file(tmp_path)
+    path = str(tmp_path / "catalog.snapshot")
+    load_startup_catalog(source_path, _Source, path)
+    old_digest = read_snapshot_meta(path)["build_digest"]
+
+    monkeypatch.setattr(catalog_store, "NGRAM_SIZE", 3)
+    loads = []
+    load_startup_catalog(source_path, lambda: loads.append(1) or _Source, path)
+    assert loads == [1]
+    assert read_snapshot_meta(path)["build_digest"] != old_digest
+
+
+def test_startup_rebuilds_when_source_changes(tmp_path):
+    source_path = _source_file(tmp_path)
+    path = str(tmp_path / "catalog.snapshot")
+    load_startup_catalog(source_path, _Source, path)
+    with open(source_path, "a", encoding="utf-8") as f:
+        f.write("# 修改\n")
+    loads = []
+    load_startup_catalog(source_path, lambda: loads.append(1) or _Source, path)
+    assert loads == [1]
@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+
+from cf_model import PROGRESS_EVENT, FeedbackStore, load_model, read_new_progress, train
+from event_log import EventLog, list_segments
+
+WRITER = {"skills": ["写作能力"], "interests": ["内容创作"]}
+CODER = {"skills": ["编程基础"], "interests": ["软件开发"]}
+
+
+def _log_progress(directory, items):
+    log = EventLog(directory)
+    for user_profile, niche, gain in items:
+        log.append(PROGRESS_EVENT, {"profile": user_profile, "unit": "u", "niche": niche, "gain": gain})
+    log.close()
+
+
+def _train(tmp_path, **kwargs):
+    store = FeedbackStore(str(tmp_path / "cf.sqlite3"))
+    return store, train(store, str(tmp_path / "cf.npz"), event_dir=str(tmp_path / "events"), **kwargs)
+
+
+def test_train_learns_preferences(tmp_path):
+    events = str(tmp_path / "events")
+    _log_progress(events, [(WRITER, "内容创作", 0.5)] * 20 + [(CODER, "AI应用开发", 0.5)] * 20)
+    store, (added, model) = _train(tmp_path)
+    assert added == 40 and model.feedback == 40 == store.feedback_count()
+    scores, mask = model.score_batch([WRITER, CODER, {"skills": ["未知技能"]}], ["内容创作", "AI应用开发", "新方向"])
+    assert scores[0, 0] > scores[0, 1] and scores[1, 1] > scores[1, 0]
+    # 没有已知属性的画像和模型没见过的利基不参与混合
+    assert mask.tolist() == [[True, True, False], [True, True, False], [False, False, False]]
+
+    loaded = load_model(str(tmp_path / "cf.npz"))
+    assert loaded.niches == model.niches and loaded.features == model.features
+    assert np.allclose(loaded.feature_factors, model.feature_factors)
+
+
+def test_incremental_training_reads_only_new_events(tmp_path):
+    events = str(tmp_path / "events")
+    _log_progress(events, [(WRITER, "内容创作", 0.5)] * 10)
+    _train(tmp_path)
+    store, (added, model) = _train(tmp_path)
+    # 没有新反馈时直接返回上次的模型
+    assert added == 0 and model.feedback == 10
+
+    _log_progress(events, [(CODER, "AI应用开发", 0.5)] * 5)
+    store, (added, model) = _train(tmp_path)
+    assert added == 5 and model.feedback == 15
+    assert set(model.niches) == {"内容创作", "AI应用开发"}
+    assert dict(store.offsets()) == {
+        f"events:{os.path.basename(path)}": os.path.getsize(path) for path in list_segments(events)
+    }
+
+
+def test_half_written_line_is_read_later(tmp_path):
+    events = str(tmp_path / "events")
+    _log_progress(events, [(WRITER, "内容创作", 0.5)])
+    line = json.dumps({"type": PROGRESS_EVENT, "data": {"profile": CODER, "niche": "AI应用开发", "gain": 1}})
+    segment = list_segments(events)[-1]
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write(line[:30])
+    feedback, positions = read_new_progress({}, events)
+    assert [niche for _, niche, _ in feedback] == ["内容创作"]
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write(line[30:] + "\n")
+    feedback, _ = read_new_progress(positions, events)
+    assert [niche for _, niche, _ in feedback] == ["AI应用开发"]
+
+
+def test_reverted_progress_drops_feedback(tmp_path):
+    store = FeedbackStore(str(tmp_path / "cf.sqlite3"))
+    store.add([(WRITER, "内容创作", 0.5), (WRITER, "AI应用开发", 0.3)], {"a": 1})
+    store.add([(WRITER, "AI应用开发", -0.3)], {"a": 2})
+    assert {niche for _, niche, _ in store.entries()} == {"内容创作"}
+    assert store.offsets() == {"a": 2}
@@ -0,0 +1,60 @@
+import sqlite3
+
+from cohorts import CohortRecorder, CohortStats, replay_events, score_bucket
+
+USER_PROFILE = {"age": "25-35岁", "skills": ["写作能力", "写作能力", "编程基础"], "interests": []}
+
+
+def test_score_bucket():
+    assert score_bucket(0) == 0
+    assert score_bucket(59.9) == 50
+    assert score_bucket(100) == 90
+
+
+def test_record_counts_attributes(tmp_path):
+    stats = CohortStats(str(tmp_path / "cohorts.sqlite3"))
+    stats.record(USER_PROFILE, "AI写作", 72.5)
+    stats.record({"age": "25-35岁"}, "AI绘画", 45)
+    assert stats.niche_totals() == {"AI写作": 1, "AI绘画": 1}
+    assert stats.breakdown("age") == [("25-35岁", "AI写作", 1), ("25-35岁", "AI绘画", 1)]
+    # 多选字段中重复的选项只计一次
+    assert stats.breakdown("skills") == [("写作能力", "AI写作", 1), ("编程基础", "AI写作", 1)]
+    assert stats.score_histogram() == [("AI写作", 70, 1), ("AI绘画", 40, 1)]
+
+
+def test_replay_uses_served_top(tmp_path):
+    stats = CohortStats(str(tmp_path / "cohorts.sqlite3"))
+    stats.record(USER_PROFILE, "旧记录", 10)
+    results = [{"niche": "规则第一", "score": 80.0}, {"niche": "展示第一", "score": 78.0}]
+    events = [
+        {"type": "assessment_submitted", "data": {"assessment_id": "a", "profile": USER_PROFILE}},
+        {"type": "recommendations", "data": {"assessment_id": "a", "results": results,
+                                             "top": {"niche": "展示第一", "score": 78.0}}},
+        # 旧事件没有top字段
+        {"type": "assessment_submitted", "data": {"assessment_id": "b", "profile": USER_PROFILE}},
+        {"type": "recommendations", "data": {"assessment_id": "b", "results": results}},
+        # 没有可行方向的评估不计入
+        {"type": "assessment_submitted", "data": {"assessment_id": "c", "profile": USER_PROFILE}},
+        {"type": "recommendations", "data": {"assessment_id": "c", "results": [], "top": None}},
+    ]
+    assert replay_events(events, stats) == 2
+    assert stats.niche_totals() == {"展示第一": 1, "规则第一": 1}
+
+
+def test_recorder_writes_in_background(tmp_path):
+    stats = CohortStats(str(tmp_path / "cohorts.sqlite3"))
+    recorder = CohortRecorder(stats)
+    # 另一个连接持有写锁时，record 仍立即返回
+    blocker = sqlite3.connect(stats.path)
+    blocker.execute("BEGIN IMMEDIATE")
+    for i in range(50):
+        assert recorder.record(USER_PROFILE, "AI写作", 70 + i % 10)
+    assert stats.niche_totals() == {}
+    blocker.rollback()
+    blocker.close()
+    assert recorder.flush(10)
+    assert stats.niche_totals() == {"AI写作": 50}
+    assert recorder.counts["recorded"] == 50 and recorder.counts["batches"] < 50
+    recorder.record({"age": "25-35岁"}, "AI绘画", 45)
+    recorder.close()
+    assert stats.niche_totals()["AI绘画"] == 1
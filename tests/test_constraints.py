@@ -0,0 +1,42 @@
+import numpy as np
+
+from catalog import compile_catalog
+from constraints import RangeIndex
+from scoring import rank_niches, score_feasible_batch
+
+
+def test_range_index_bounds():
+    index = RangeIndex.build(np.array([5.0, 1.0, 3.0, 3.0]))
+    assert sorted(index.at_most(3).tolist()) == [1, 2, 3]
+    assert index.above(3).tolist() == [0]
+    assert index.at_most(0).size == 0
+
+
+def test_infeasible_niches_are_pruned(make_niche):
+    catalog = compile_catalog(
+        {"低成本": make_niche(投资成本="低"), "高成本": make_niche(投资成本="高"), "中成本": make_niche(投资成本="中等")},
+        version=201,
+    )
+    user_profile = {"investment_capacity": "1000-5000元", "hard_constraints": ["budget"]}
+    assert {name for name, _ in rank_niches(user_profile, catalog)} == {"低成本", "中成本"}
+    # 未启用条件时结果与以前相同
+    assert len(rank_niches({"investment_capacity": "1000-5000元"}, catalog)) == 3
+
+
+def test_feasible_batch_masks_per_profile(catalog):
+    profiles = [
+        {"investment_capacity": "1000元以下", "hard_constraints": ["budget"]},
+        {"investment_capacity": "1000元以下"},
+    ]
+    _, totals, columns, feasible = score_feasible_batch(profiles, catalog)
+    assert feasible[1].all()
+    for user_profile, row in zip(profiles, totals):
+        ranked = rank_niches(user_profile, catalog)
+        scored = {catalog.names[column]: total for column, total in zip(columns.tolist(), row.tolist())}
+        assert {name for name, total in scored.items() if total != -np.inf} == {name for name, _ in ranked}
+        assert all(round(scored[name], 1) == score for name, score in ranked)
+
+
+def test_unknown_option_disables_constraint(catalog):
+    user_profile = {"investment_capacity": "自定义", "hard_constraints": ["budget"]}
+    assert len(rank_niches(user_profile, catalog)) == len(catalog.names)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from catalog import compile_catalog
+from diversity import diversify_ranking, mmr_order, niche_similarity_matrix
+
+
+def test_similarity_matrix(make_niche):
+    niches = {
+        "a": make_niche(技能要求=["写作能力", "编程基础"]),
+        "b": make_niche(技能要求=["写作能力", "编程基础"]),
+        "c": make_niche(技能要求=["设计能力"], 适合人群=["设计师"], 工具推荐=["Midjourney"]),
+    }
+    similarity = niche_similarity_matrix(list(niches), niches)
+    assert np.allclose(np.diag(similarity), 1) and np.allclose(similarity, similarity.T)
+    assert similarity[0, 1] == 1 and similarity[0, 2] == 0
+
+
+def test_mmr_order_skips_near_duplicates():
+    similarity = np.array([[1, 0.95, 0.1], [0.95, 1, 0.1], [0.1, 0.1, 1]])
+    scores = [90, 89, 70]
+    assert mmr_order([0, 1, 2], scores, similarity, 3, weight=0.7) == [0, 2, 1]
+    # 权重为1时就是按匹配度排序
+    assert mmr_order([0, 1, 2], scores, similarity, 3, weight=1) == [0, 1, 2]
+    assert mmr_order([0, 1, 2], scores, similarity, 5) == [0, 2, 1]
+
+
+def test_diversify_ranking_keeps_every_niche(make_niche):
+    niches = {
+        "视频A": make_niche(技能要求=["视频剪辑"], 工具推荐=["剪映"]),
+        "视频B": make_niche(技能要求=["视频剪辑"], 工具推荐=["剪映"]),
+        "编程": make_niche(技能要求=["编程基础"], 适合人群=["程序员"], 工具推荐=["Cursor"]),
+        "写作": make_niche(技能要求=["写作能力"], 适合人群=["作者"], 工具推荐=["ChatGPT"]),
+    }
+    catalog = compile_catalog(niches, version=1)
+    ranked = [("视频A", 90.0), ("视频B", 89.0), ("编程", 80.0), ("写作", 60.0)]
+    diversified = diversify_ranking(ranked, catalog, k=2)
+    assert [name for name, _ in diversified[:2]] == ["视频A", "编程"]
+    assert sorted(diversified) == sorted(ranked)
+    # 其余利基保持原来的顺序，分数不变
+    assert diversified[2:] == [("视频B", 89.0), ("写作", 60.0)]
+    assert diversify_ranking(ranked, catalog, k=2, weight=1) == ranked
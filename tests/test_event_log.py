@@ -0,0 +1,40 @@
+import json
+
+from event_log import EventLog, iter_events, list_segments
+
+
+def test_events_are_durable_after_flush(tmp_path):
+    log = EventLog(str(tmp_path))
+    ids = [log.append("assessment_submitted", {"n": n}) for n in range(100)]
+    assert log.flush(5)
+    events = list(iter_events(str(tmp_path)))
+    assert [event["id"] for event in events] == ids
+    assert [event["data"]["n"] for event in events] == list(range(100))
+    # 组提交：事件数不少于批次数
+    assert log.stats["events"] == 100 and log.stats["batches"] <= 100
+    log.close()
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append("recommendations", {"n": 1})
+    log.close()
+    # 模拟进程崩溃时只写了一半的最后一行
+    with open(list_segments(str(tmp_path))[-1], "ab") as f:
+        f.write(json.dumps({"type": "recommendations", "data": {"n": 2}}).encode()[:20])
+
+    restarted = EventLog(str(tmp_path))
+    restarted.append("recommendations", {"n": 3})
+    restarted.close()
+    assert len(list_segments(str(tmp_path))) == 2
+    assert [event["data"]["n"] for event in iter_events(str(tmp_path))] == [1, 3]
+
+
+def test_segments_rotate_and_filter_by_type(tmp_path):
+    log = EventLog(str(tmp_path), segment_max_bytes=200)
+    for n in range(10):
+        log.append("a" if n % 2 else "b", {"n": n, "padding": "x" * 100})
+        log.flush(5)
+    log.close()
+    assert log.stats["segments_rotated"] >= 4
+    assert [event["data"]["n"] for event in iter_events(str(tmp_path), types={"a"})] == [1, 3, 5, 7, 9]
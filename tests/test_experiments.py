@@ -0,0 +1,104 @@
+import json
+from collections import Counter
+
+import pytest
+
+import experiments
+from cf_model import PROGRESS_EVENT
+from experiments import (
+    BUCKETS, EXPOSURE_EVENT, bucket_of, parse_experiment, rank_variants, serve_ranking, served_totals, summarize,
+)
+from scoring import rank_niches, score_breakdown_batch
+
+PROFILE = {
+    "skills": ["写作能力", "创意思维", "编程基础"], "interests": ["视频制作", "内容创作"],
+    "time_availability": "5-10小时", "investment_capacity": "1000元以下", "income_goal": "每月1000-3000元",
+}
+
+DEFINITION = {
+    "name": "skills-weight",
+    "variants": [
+        {"name": "control", "share": 50},
+        {"name": "skills60", "share": 50, "weights": {"skills": 60, "time": 10, "investment": 10, "interests": 20}},
+        {"name": "rules-only", "share": 0, "cf": False},
+    ],
+}
+
+
+def test_bucketing_is_stable_and_proportional():
+    experiment = parse_experiment(DEFINITION)
+    assert bucket_of("a", "user-1") == bucket_of("a", "user-1")
+    assert 0 <= bucket_of("a", "user-1") < BUCKETS
+    served = Counter(experiment.assign(f"user-{i}").name for i in range(4000))
+    # 影子变体不展示给用户，其余按share分流
+    assert set(served) == {"control", "skills60"}
+    assert abs(served["control"] - 2000) < 200
+    # 实验名参与哈希，换一个实验分组不同
+    other = parse_experiment({**DEFINITION, "name": "other"})
+    assert any(experiment.assign(f"user-{i}") != other.assign(f"user-{i}") for i in range(20))
+
+
+@pytest.mark.parametrize("payload", [
+    [],
+    {"name": "x"},
+    {"name": "x", "variants": [{"share": 1}]},
+    {"name": "x", "variants": [{"name": "a", "weights": {"luck": 10}}]},
+    {"name": "x", "variants": [{"name": "a", "weights": {"skills": -1}}]},
+    {"name": "x", "variants": [{"name": "a", "share": True}]},
+    {"name": "x", "variants": [{"name": "a", "cf": "yes"}]},
+    {"name": "x", "variants": [{"name": "a"}, {"name": "a"}]},
+])
+def test_invalid_experiment(payload):
+    with pytest.raises(ValueError):
+        parse_experiment(payload)
+
+
+@pytest.mark.parametrize("with_cf", [False, True])
+def test_control_matches_rank_niches(catalog, request, monkeypatch, with_cf):
+    if with_cf:
+        monkeypatch.setattr(experiments, "get_cf_model", lambda: request.getfixturevalue("cf_model"))
+    experiment = parse_experiment(DEFINITION)
+    rankings = rank_variants(PROFILE, catalog, experiment.variants)
+    assert rankings["control"] == rank_niches(PROFILE, catalog)
+    assert rankings["skills60"] != rankings["control"]
+
+    breakdown = score_breakdown_batch([PROFILE], catalog)
+    totals = served_totals(breakdown, [PROFILE], list(catalog.names))
+    expected = dict(rank_niches(PROFILE, catalog))
+    for name, total in zip(catalog.names, totals[0].tolist()):
+        if name in expected:
+            assert round(total, 1) == expected[name]
+
+
+def test_serve_ranking_logs_every_variant(catalog, tmp_path, monkeypatch):
+    monkeypatch.setattr(experiments, "EXPERIMENT_PATH", str(tmp_path / "experiment.json"))
+    monkeypatch.setattr(experiments, "_experiment_mtime", None)
+    assert serve_ranking(PROFILE, catalog, "user-1") == (rank_niches(PROFILE, catalog), None)
+
+    (tmp_path / "experiment.json").write_text(json.dumps(DEFINITION), encoding="utf-8")
+    ranked, exposure = serve_ranking(PROFILE, catalog, "user-1")
+    assert exposure["variant"] == parse_experiment(DEFINITION).assign("user-1").name
+    assert set(exposure["rankings"]) == {"control", "skills60", "rules-only"}
+    assert exposure["rankings"][exposure["variant"]] == [name for name, _ in ranked[:3]]
+
+
+def test_summarize():
+    def exposure(unit, variant):
+        rankings = {"control": ["a", "b", "c"], "shadow": ["d", "e", "f"]}
+        return {"type": EXPOSURE_EVENT, "data": {
+            "experiment": "x", "unit": unit, "variant": variant, "rankings": rankings,
+        }}
+
+    def progress(unit, niche, gain):
+        return {"type": PROGRESS_EVENT, "data": {"unit": unit, "niche": niche, "gain": gain}}
+
+    events = [
+        progress("u1", "a", 0.5),
+        exposure("u1", "control"), exposure("u2", "control"), exposure("u1", "control"),
+        progress("u1", "a", 0.25), progress("u2", "d", 0.1), progress("u3", "a", 1),
+    ]
+    report = summarize(events)["x"]
+    assert report["control"]["served"] == 2 and report["control"]["progressed"] == 2
+    assert report["control"]["mean_gain"] == pytest.approx(0.175)
+    assert report["control"]["hit_rate"] == 0.5 and report["shadow"]["hit_rate"] == 0.5
+    assert report["shadow"]["served"] == 0
@@ -0,0 +1,60 @@
+import csv
+import gzip
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+from export import ExportJob, detect_format, export_recommendations, iter_jsonl
+from scoring import rank_niches
+
+PROFILES = [
+    {"id": "a", "skills": ["写作能力"], "interests": ["内容创作"]},
+    {"skills": ["编程基础"]},
+    {"id": "none", "investment_capacity": "1000元以下", "time_availability": "5小时以下",
+     "income_goal": "每月8000元以上", "hard_constraints": ["budget", "hours", "income"]},
+]
+
+
+def test_detect_format():
+    assert detect_format("out.CSV.gz") == ("csv", True)
+    assert detect_format("out.parquet") == ("parquet", False)
+    with pytest.raises(ValueError):
+        detect_format("out.txt")
+
+
+def test_jsonl_records(catalog, tmp_path):
+    path = str(tmp_path / "out.jsonl.gz")
+    progress = []
+    assert export_recommendations(iter(PROFILES), path, catalog=catalog, chunk_size=2, progress=progress.append) == 3
+    assert progress == [2, 3]
+    records = list(iter_jsonl(path))
+    assert [record["profile_id"] for record in records] == ["a", "1", "none"]
+    first = records[0]
+    assert [(rec["niche"], rec["score"]) for rec in first["recommendations"]] == rank_niches(PROFILES[0], catalog)[:3]
+    assert first["action_plan"]["niche"] == first["recommendations"][0]["niche"]
+    # 没有可行方向时推荐为空，也没有行动计划
+    assert records[2]["recommendations"] == [] and records[2]["action_plan"] is None
+
+
+def test_csv_and_parquet_rows_agree(catalog, tmp_path):
+    csv_path, parquet_path = str(tmp_path / "out.csv.gz"), str(tmp_path / "out.parquet")
+    export_recommendations(PROFILES, csv_path, top_k=2, catalog=catalog)
+    export_recommendations(PROFILES, parquet_path, top_k=2, catalog=catalog)
+    with gzip.open(csv_path, "rt", encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    table = pq.read_table(parquet_path).to_pylist()
+    assert len(rows) == len(table) == 4
+    for row, record in zip(rows, table):
+        assert (row["profile_id"], int(row["rank"]), row["niche"], float(row["score"])) == \
+            (record["profile_id"], record["rank"], record["niche"], record["score"])
+    # 行动计划只写在每个用户的第一行
+    assert json.loads(rows[0]["action_plan"])["niche"] == rows[0]["niche"]
+    assert rows[1]["action_plan"] == ""
+
+
+def test_export_job_reports_errors(catalog, tmp_path):
+    job = ExportJob(PROFILES, str(tmp_path / "out.xml"), catalog=catalog)
+    job.start()
+    job.join(10)
+    assert isinstance(job.error, ValueError)
@@ -0,0 +1,46 @@
+import json
+import re
+
+from action_plan import action_plan_for, localize_plan
+from advice import fallback_advice
+from locales import get_bundle, load_bundle
+
+CJK = re.compile(r"[一-鿿]")
+
+
+def test_missing_entries_fall_back_to_source(tmp_path):
+    (tmp_path / "en.json").write_text(json.dumps({"messages": {"第{week}周": "Week {week}"}}), encoding="utf-8")
+    bundle = load_bundle("en", str(tmp_path))
+    assert bundle.text("第{week}周", week=2) == "Week 2"
+    assert bundle.text("没有译文") == "没有译文"
+    assert bundle.niche_name("内容创作") == "内容创作"
+    assert load_bundle("fr", str(tmp_path)).text("首页") == "首页"
+
+
+def test_unknown_locale_uses_default():
+    assert get_bundle("xx").locale == get_bundle().locale
+
+
+def test_niche_translation_keeps_levels(catalog):
+    bundle = get_bundle("en")
+    niche = bundle.niche("内容创作", catalog.niches["内容创作"])
+    assert niche["description"] != catalog.niches["内容创作"]["description"]
+    assert niche["投资成本"] == catalog.niches["内容创作"]["投资成本"]
+
+
+def test_action_plan_is_translated(catalog):
+    user_profile = {"skills": ["写作能力"], "interests": ["内容创作"]}
+    plan = action_plan_for(user_profile, catalog)
+    localized = localize_plan(plan, catalog, get_bundle("en"))
+    assert (localized.niche, localized.score) == (plan.niche, plan.score)
+    text = json.dumps(localized.to_dict()["weeks"], ensure_ascii=False)
+    assert not CJK.search(text), text
+    # 缓存的原计划仍是中文原文，导出和接口使用
+    assert CJK.search(json.dumps(plan.to_dict()["weeks"], ensure_ascii=False))
+
+
+def test_fallback_advice_is_translated():
+    bundle = get_bundle("en")
+    for score in (90, 70, 30):
+        _, text = fallback_advice(score)
+        assert not CJK.search(bundle.text(text))
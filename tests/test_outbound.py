@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+from outbound import OutboundGateway, TokenBucket
+
+
+def test_concurrent_identical_requests_are_coalesced():
+    gateway = OutboundGateway()
+    release = threading.Event()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.get_running_loop().run_in_executor(None, release.wait)
+        return "结果"
+
+    first, first_leader = gateway.submit("same", fetch)
+    second, second_leader = gateway.submit("same", fetch)
+    release.set()
+    assert (first_leader, second_leader) == (True, False)
+    assert first.result(5) == second.result(5) == "结果"
+    assert len(calls) == 1
+    metrics = gateway.metrics()["default"]
+    assert (metrics["requests"], metrics["coalesced"], metrics["upstream_calls"]) == (2, 1, 1)
+
+
+def test_finished_request_is_sent_again():
+    gateway = OutboundGateway()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert gateway.call("key", fetch, timeout=5) == 1
+    assert gateway.call("key", fetch, timeout=5) == 2
+
+
+def test_concurrency_limit():
+    gateway = OutboundGateway()
+    gateway.configure("api", rate=1000, burst=100, concurrency=2)
+    active = []
+    peak = []
+
+    async def fetch():
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.02)
+        active.pop()
+
+    futures = [gateway.submit(i, fetch, limit_key="api")[0] for i in range(6)]
+    for future in futures:
+        future.result(5)
+    assert max(peak) == 2
+
+
+def test_errors_are_counted():
+    gateway = OutboundGateway()
+
+    async def fail():
+        raise ValueError("boom")
+
+    future, _ = gateway.submit("bad", fail)
+    try:
+        future.result(5)
+    except ValueError:
+        pass
+    assert gateway.metrics()["default"]["errors"] == 1
+
+
+def test_token_bucket_rate():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=2)
+        started = time.monotonic()
+        for _ in range(7):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 突发2个，其余5个按每秒50个发放，约0.1秒
+    assert 0.08 <= asyncio.run(run()) < 1
@@ -0,0 +1,37 @@
+import numpy as np
+
+from parallel import ParallelScorer, score_cohort
+from scoring import rank_niches
+
+PROFILES = [
+    {"skills": ["写作能力"], "interests": ["教育"], "time_availability": "5-10小时", "investment_capacity": "1000元以下"},
+    {"skills": ["编程基础"], "investment_capacity": "1000元以下", "hard_constraints": ["budget"]},
+    {"skills": [], "time_availability": "5小时以下", "risk_tolerance": "保守型",
+     "income_goal": "每月8000元以上", "hard_constraints": ["hours", "risk", "income"]},
+]
+
+
+def test_parallel_matches_rank_niches(catalog):
+    k = 5
+    rows, scores = score_cohort(PROFILES * 3, catalog, k=k, workers=2)
+    assert rows.shape == scores.shape == (len(PROFILES) * 3, k)
+    for user_profile, profile_rows, profile_scores in zip(PROFILES * 3, rows, scores):
+        expected = rank_niches(user_profile, catalog)[:k]
+        served = [
+            (catalog.names[row], float(score))
+            for row, score in zip(profile_rows.tolist(), profile_scores.tolist()) if row >= 0
+        ]
+        assert served == expected
+        # 可行方向不足k个时补-1和-inf
+        assert np.isneginf(profile_scores[len(expected):]).all()
+
+
+def test_shards_keep_input_order(catalog):
+    profiles = [{"skills": [skill]} for skill in catalog.skills]
+    with ParallelScorer(catalog, workers=2, shard_size=3) as scorer:
+        rows, scores = scorer.top_k(iter(profiles), k=2)
+        empty_rows, _ = scorer.top_k([], k=2)
+    for user_profile, profile_rows, profile_scores in zip(profiles, rows, scores):
+        served = [(catalog.names[row], float(score)) for row, score in zip(profile_rows.tolist(), profile_scores.tolist())]
+        assert served == rank_niches(user_profile, catalog)[:2]
+    assert empty_rows.shape == (0, 2)
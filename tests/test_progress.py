@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from progress import ProgressStore, ProgressTracker
+
+
+def test_slider_changes_are_coalesced(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.sqlite3"))
+    tracker = ProgressTracker(store, debounce=60, max_delay=60)
+    for value in range(0, 101, 10):
+        tracker.update("u", "内容创作", 1, value)
+    tracker.update("u", "内容创作", 2, 30)
+    # 未写入的改动读取时可见，存储中还没有
+    assert tracker.load("u", "内容创作") == {1: 100, 2: 30}
+    assert store.load("u", "内容创作") == {}
+    tracker.close()
+    assert store.load("u", "内容创作") == {1: 100, 2: 30}
+    assert tracker.stats["rows_written"] == 2 and tracker.stats["batches"] == 1
+
+
+def test_debounced_write(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.sqlite3"))
+    tracker = ProgressTracker(store, debounce=0.05, max_delay=1)
+    tracker.update("u", "内容创作", 1, 50)
+    deadline = time.monotonic() + 5
+    while store.load("u", "内容创作") != {1: 50} and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.load("u", "内容创作") == {1: 50}
+    # 与当前值相同的更新不再排队
+    tracker.update("u", "内容创作", 1, 50)
+    assert tracker.stats["updates"] == 1
+    tracker.close()
+
+
+def test_failed_write_is_retried(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.sqlite3"))
+    tracker = ProgressTracker(store, debounce=60, max_delay=60)
+    save_batch = store.save_batch
+    calls = []
+
+    def flaky(rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        save_batch(rows)
+
+    store.save_batch = flaky
+    tracker.update("u", "内容创作", 1, 40)
+    tracker.flush()
+    tracker.update("u", "内容创作", 1, 60)
+    tracker.close()
+    # 重试时使用失败期间更新的值
+    assert store.load("u", "内容创作") == {1: 60}
+    assert ProgressTracker(store).load("u", "内容创作") == {1: 60}
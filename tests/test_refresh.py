@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+from refresh import RefreshScheduler, compute_trend_insights
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE = textwrap.dedent("""
+    AI_NICHES = {
+        "测试方向": {
+            "description": "测试", "市场需求": "高", "竞争程度": "低", "收入潜力": "中等",
+            "投资成本": "低", "时间投入": "中等", "技能要求": ["写作能力"], "适合人群": ["学生"],
+            "工具推荐": ["ChatGPT"], "学习资源": ["教程"], "启动步骤": ["注册"],
+        },
+    }
+
+    def load_market_trends():
+        return {"月份": ["2024-01", "2024-02"], "测试方向": [100, %d]}
+""")
+
+
+def _scheduler(tmp_path, monkeypatch, growth=150):
+    monkeypatch.chdir(tmp_path)
+    source_path = tmp_path / "source.py"
+    source_path.write_text(SOURCE % growth, encoding="utf-8")
+    return RefreshScheduler(source_path=str(source_path)), source_path
+
+
+def test_refresh_without_changes_keeps_version(tmp_path, monkeypatch):
+    scheduler, _ = _scheduler(tmp_path, monkeypatch)
+    assert scheduler.refresh() is scheduler.snapshot
+    # 第二次启动映射快照文件，指纹与编译出的一致
+    restarted = RefreshScheduler(source_path=scheduler._source_path)
+    assert restarted.snapshot.fingerprint == scheduler.snapshot.fingerprint
+    assert restarted.refresh().version == 1
+
+
+def test_refresh_publishes_changed_trends(tmp_path, monkeypatch):
+    scheduler, source_path = _scheduler(tmp_path, monkeypatch)
+    source_path.write_text(SOURCE % 300, encoding="utf-8")
+    assert scheduler.source_changed()
+    snapshot = scheduler.refresh()
+    assert snapshot.version == 2
+    assert snapshot.insights["growth"]["测试方向"] == 200
+
+
+def test_background_thread_follows_source(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source_path = tmp_path / "source.py"
+    source_path.write_text(SOURCE % 150, encoding="utf-8")
+    scheduler = RefreshScheduler(interval=3600, watch_interval=0.01, source_path=str(source_path))
+    scheduler.start()
+    try:
+        # 保存到一半的源文件加载失败，继续使用旧快照
+        source_path.write_text("AI_NICHES = {", encoding="utf-8")
+        os.utime(source_path, ns=(0, os.stat(source_path).st_mtime_ns + 10**9))
+        time.sleep(0.1)
+        assert scheduler.is_alive() and scheduler.snapshot.version == 1
+        source_path.write_text(SOURCE % 300, encoding="utf-8")
+        os.utime(source_path, ns=(0, os.stat(source_path).st_mtime_ns + 2 * 10**9))
+        deadline = time.monotonic() + 5
+        while scheduler.snapshot.version == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert scheduler.snapshot.version == 2
+        assert scheduler.snapshot.insights["growth"]["测试方向"] == 200
+    finally:
+        scheduler.stop()
+        scheduler.join(5)
+
+
+def test_startup_from_snapshot_does_not_import_data(tmp_path):
+    env = {**os.environ, "CATALOG_SNAPSHOT_PATH": str(tmp_path / "catalog.snapshot"), "PYTHONPATH": ROOT}
+    script = "import sys; from refresh import RefreshScheduler; RefreshScheduler(); print('data' in sys.modules)"
+    outputs = [
+        subprocess.run([sys.executable, "-c", script], env=env, cwd=tmp_path,
+                       capture_output=True, text=True, check=True).stdout.strip()
+        for _ in range(2)
+    ]
+    assert outputs == ["False", "False"]
+
+
+def test_trend_insights():
+    insights = compute_trend_insights({"月份": ["a", "b"], "甲": [100, 150], "乙": [100, 300], "丙": [0, 10]})
+    assert insights["growth"] == {"甲": 50, "乙": 200}
+    assert insights["fast"] == ("乙", "甲")
@@ -0,0 +1,55 @@
+import itertools
+
+from scoring import (
+    calculate_compatibility_score, iter_scores, micro_batches, profile_key, rank_niches, rank_with_breakdown,
+    score_breakdown_batch,
+)
+
+PROFILES = [
+    {"skills": ["写作能力", "创意思维"], "interests": ["视频制作", "内容创作"], "time_availability": "5-10小时",
+     "investment_capacity": "1000元以下"},
+    {"skills": ["编程基础", "数据分析"], "interests": ["技术开发"], "time_availability": "20小时以上",
+     "investment_capacity": "5000-20000元"},
+    {},
+]
+
+
+def test_scalar_and_vectorized_scores_agree(catalog):
+    totals = score_breakdown_batch(PROFILES, catalog)["total"]
+    for user_profile, row in zip(PROFILES, totals):
+        for name, total in zip(catalog.names, row.tolist()):
+            assert calculate_compatibility_score(user_profile, catalog.niches[name], catalog) == round(total, 1)
+
+
+def test_rank_with_breakdown_matches_rank_niches(catalog):
+    for user_profile in PROFILES:
+        ranked = rank_with_breakdown(user_profile, catalog)
+        assert [(item["niche"], item["score"]) for item in ranked] == rank_niches(user_profile, catalog)
+        for item in ranked:
+            assert round(sum(item["breakdown"].values()), 1) == item["score"]
+
+
+def test_iter_scores_reads_input_lazily(catalog):
+    consumed = []
+
+    def profiles():
+        for i in itertools.count():
+            consumed.append(i)
+            yield PROFILES[i % len(PROFILES)]
+
+    stream = iter_scores(profiles(), catalog, top_k=2, batch_size=4)
+    results = list(itertools.islice(stream, 5))
+    assert len(consumed) == 8
+    assert all(len(ranked) == 2 for _, ranked in results)
+
+
+def test_micro_batches():
+    assert list(micro_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(micro_batches([], 2)) == []
+
+
+def test_profile_key_ignores_order_and_extra_fields():
+    first = {"skills": ["写作能力", "编程基础"], "name": "甲"}
+    second = {"skills": ["编程基础", "写作能力"], "name": "乙"}
+    assert profile_key(first) == profile_key(second)
+    assert profile_key(first) != profile_key({**first, "hard_constraints": ["budget"]})
@@ -0,0 +1,47 @@
+from search import SearchIndex
+
+NICHES_FIELDS = {
+    "视频剪辑": dict(description="用AI剪辑短视频", 工具推荐=["剪映"]),
+    "文章写作": dict(description="用AI写公众号文章", 学习资源=["写作课"]),
+    "编程外包": dict(description="承接小程序开发", 适合人群=["程序员"]),
+}
+
+
+def _index(make_niche):
+    niches = {name: make_niche(**fields) for name, fields in NICHES_FIELDS.items()}
+    return SearchIndex(list(niches), niches), niches
+
+
+def test_search_ranks_and_reports_matches(make_niche):
+    index, _ = _index(make_niche)
+    hits = index.search("视频")
+    assert [hit.niche_name for hit in hits] == ["视频剪辑"]
+    assert ("名称", "视频剪辑") in hits[0].matches
+    assert ("description", "用AI剪辑短视频") in hits[0].matches
+
+
+def test_single_character_and_empty_query(make_niche):
+    index, _ = _index(make_niche)
+    assert {hit.niche_name for hit in index.search("写")} == {"文章写作"}
+    assert index.search("  ") == []
+    assert index.search("不存在的词") == []
+
+
+def test_partial_coverage(make_niche):
+    index, _ = _index(make_niche)
+    # 三个二元组命中两个，达到最低覆盖比例
+    assert [hit.niche_name for hit in index.search("程序员们")] == ["编程外包"]
+
+
+def test_incremental_rebuild_matches_full(make_niche):
+    index, niches = _index(make_niche)
+    niches = {**niches, "文章写作": make_niche(description="用AI写小说")}
+    full = SearchIndex(list(niches), niches)
+    incremental = SearchIndex(list(niches), niches, previous=index, reused=[0, None, 2])
+    assert incremental.postings() == full.postings()
+
+
+def test_from_postings_matches_built_index(make_niche):
+    index, niches = _index(make_niche)
+    loaded = SearchIndex.from_postings(list(niches), niches, index.postings())
+    assert loaded.search("AI") == index.search("AI")
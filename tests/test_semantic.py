@@ -0,0 +1,51 @@
+import numpy as np
+
+from semantic import InterestMatcher, build_vector_index, char_ngrams
+
+INTERESTS = [["视频制作", "内容创作"], [], ["编程", "教育培训", "电商运营"]]
+
+
+def test_char_ngrams():
+    assert char_ngrams("视频制作") == ["视频", "频制", "制作"]
+    assert char_ngrams("学 视频") == ["学", "视频"]
+
+
+def test_index_rows_are_normalized():
+    index = build_vector_index([["视频剪辑"], ["文章写作", "写作"], []])
+    norms = np.linalg.norm(index.matrix, axis=1)
+    assert np.allclose(norms[:2], 1) and norms[2] == 0
+    similarity = index.similarity(["写作"])[0]
+    assert similarity[1] > similarity[0] == 0
+
+
+def test_batch_matches_per_user(catalog):
+    matcher = catalog.interest_matcher
+    batch = matcher.match_counts_batch(INTERESTS)
+    for interests, counts in zip(INTERESTS, batch):
+        assert counts.tolist() == matcher.match_counts(interests).tolist()
+    rows = np.array([0, 3, 5])
+    assert (matcher.match_counts_batch(INTERESTS, rows) == batch[:, rows]).all()
+
+
+def test_out_of_catalog_niche_matches_row_path(catalog):
+    matcher = catalog.interest_matcher
+    for row, name in enumerate(catalog.names):
+        niche = catalog.niches[name]
+        for interests in INTERESTS:
+            assert matcher.match_count_for(interests, niche, name) == matcher.match_count_for(interests, niche, row=row)
+
+
+def test_incremental_build_matches_full(catalog, make_niche):
+    names = list(catalog.names)
+    niches = dict(catalog.niches)
+    niches[names[0]] = make_niche(description="用AI做播客和有声书")
+    full = InterestMatcher.build(names, niches, catalog.interest_matcher.threshold)
+    reused = [None] + list(range(1, len(names)))
+    incremental = InterestMatcher.build(
+        names, niches, catalog.interest_matcher.threshold, previous=catalog.interest_matcher, reused=reused
+    )
+    assert incremental.index.vocabulary.keys() == full.index.vocabulary.keys()
+    assert np.allclose(
+        incremental.index.similarity(["有声书", "视频"]),
+        full.index.similarity(["有声书", "视频"]),
+    )
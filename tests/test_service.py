@@ -0,0 +1,88 @@
+import asyncio
+
+from service import LatencyStats, ScoringService, StreamResponse
+
+
+def _service(routes):
+    # 不启动进程池，只测连接处理
+    service = ScoringService.__new__(ScoringService)
+    service.metrics = LatencyStats()
+    service.routes = routes
+    return service
+
+
+async def _request(service, path, connection="keep-alive", version="HTTP/1.1"):
+    server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"POST {path} {version}\r\nConnection: {connection}\r\nContent-Length: 2\r\n\r\n{{}}".encode("latin-1"))
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    return response
+
+
+def test_stream_error_is_recorded_and_connection_closed():
+    async def broken(payload):
+        async def chunks():
+            yield b"first"
+            raise RuntimeError("worker crashed")
+        return StreamResponse("application/octet-stream", chunks())
+
+    service = _service({("POST", "/stream"): broken})
+    response = asyncio.run(_request(service, "/stream"))
+    assert response.startswith(b"HTTP/1.1 200")
+    assert b"first" in response
+    # 请求要求保持连接，但出错后服务端关闭了连接，也没有发出结束块
+    assert not response.endswith(b"0\r\n\r\n")
+    assert service.metrics.summary()["POST /stream"]["errors"] == 1
+
+
+def test_stream_success_is_recorded():
+    async def ok(payload):
+        async def chunks():
+            yield b"data"
+        return StreamResponse("application/octet-stream", chunks())
+
+    service = _service({("POST", "/stream"): ok})
+    response = asyncio.run(_request(service, "/stream", "close"))
+    assert response.endswith(b"4\r\ndata\r\n0\r\n\r\n")
+    stats = service.metrics.summary()["POST /stream"]
+    assert stats["count"] == 1 and stats["errors"] == 0
+
+
+def test_http10_stream_is_not_chunked():
+    async def ok(payload):
+        async def chunks():
+            yield b"part1"
+            yield b"part2"
+        return StreamResponse("application/octet-stream", chunks())
+
+    service = _service({("POST", "/stream"): ok})
+    # HTTP/1.0客户端要求保持连接也不行，响应以关闭连接结束
+    response = asyncio.run(_request(service, "/stream", "keep-alive", "HTTP/1.0"))
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding" not in head and b"Connection: close" in head
+    assert body == b"part1part2"
+
+
+def test_handler_error_returns_500():
+    async def fails(payload):
+        raise ValueError("boom")
+
+    service = _service({("POST", "/fail"): fails})
+    response = asyncio.run(_request(service, "/fail", "close"))
+    assert response.startswith(b"HTTP/1.1 500")
+    assert service.metrics.summary()["POST /fail"]["errors"] == 1
+
+
+def test_unserialisable_result_is_recorded_and_connection_closed():
+    async def broken(payload):
+        return {"value": object()}
+
+    service = _service({("POST", "/broken"): broken})
+    # 请求要求保持连接，但写出失败后服务端关闭了连接
+    response = asyncio.run(_request(service, "/broken"))
+    assert response == b""
+    assert service.metrics.summary()["POST /broken"]["errors"] == 1
@@ -0,0 +1,52 @@
+from experiments import Variant, served_totals
+from scoring import SCORE_WEIGHTS, rank_niches, score_breakdown
+from skill_gap import skill_uplift, uplift_matrix
+
+USER_PROFILE = {
+    "skills": ["写作能力"], "interests": ["教育"], "time_availability": "5-10小时",
+    "investment_capacity": "1000元以下", "hard_constraints": ["budget"],
+}
+
+
+def test_uplift_matches_rescoring(catalog, cf_model):
+    candidates, names, base, totals = uplift_matrix(USER_PROFILE, catalog)
+    assert dict(zip(names, base.round(1).tolist())) == dict(rank_niches(USER_PROFILE, catalog))
+    for i, skill in enumerate(candidates[:5]):
+        learned = {**USER_PROFILE, "skills": [*USER_PROFILE["skills"], skill]}
+        assert dict(zip(names, totals[i].round(1).tolist())) == dict(rank_niches(learned, catalog))
+
+
+def test_uplift_only_ranks_feasible_niches(catalog):
+    feasible = {name for name, _ in rank_niches(USER_PROFILE, catalog)}
+    assert len(feasible) < len(catalog.names)
+    for item in skill_uplift(USER_PROFILE, catalog):
+        assert item.best_niche in feasible
+        assert {name for name, _ in item.top_k} <= feasible
+
+
+def test_uplift_uses_variant_weights(catalog):
+    skills_only = Variant("skills", 1, (100, 0, 0, 0), cf=False)
+    uplifts = skill_uplift(USER_PROFILE, catalog, variant=skills_only)
+    assert uplifts[0].top_k_gain > 0
+    _, names, _, totals = uplift_matrix(USER_PROFILE, catalog, variant=skills_only)
+    assert (totals <= 100).all()
+
+
+def test_control_served_totals_match_rank_niches(catalog, cf_model):
+    control = Variant("control", 1, tuple(SCORE_WEIGHTS.values()))
+    breakdown = score_breakdown(USER_PROFILE, catalog)
+    totals = served_totals(breakdown, [USER_PROFILE], catalog.names, control)[0]
+    assert (totals == served_totals(breakdown, [USER_PROFILE], catalog.names)[0]).all()
+
+
+def test_uplifts_are_ordered_and_report_new_entries(catalog):
+    user_profile = {"skills": ["沟通能力"], "interests": []}
+    uplifts = skill_uplift(user_profile, catalog)
+    assert {item.skill for item in uplifts} == set(catalog.skills) - {"沟通能力"}
+    gains = [item.top_k_gain for item in uplifts]
+    assert gains == sorted(gains, reverse=True)
+    base_top = {name for name, _ in rank_niches(user_profile, catalog)[:3]}
+    for item in uplifts:
+        learned = {**user_profile, "skills": [*user_profile["skills"], item.skill]}
+        assert list(item.top_k) == rank_niches(learned, catalog)[:3]
+        assert set(item.new_entries) == {name for name, _ in item.top_k} - base_top
@@ -0,0 +1,52 @@
+import re
+import xml.etree.ElementTree as ET
+
+from static_charts import WIDTH, bubble_svg, line_svg, radar_svg
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def _parse(svg):
+    root = ET.fromstring(svg)
+    assert root.tag == f"{SVG}svg"
+    return root
+
+
+def _texts(root):
+    return [node.text for node in root.iter(f"{SVG}text")]
+
+
+def test_bubble_svg():
+    points = [("内容创作", 2, 3, 3, "高"), ("AI咨询<服务>", 2, 3, 1, "中等"), ("数据标注", 1, 2, 2, "高")]
+    root = _parse(bubble_svg(points, "机会矩阵", "竞争程度", "市场需求"))
+    assert len(root.findall(f"{SVG}circle")) == 3
+    texts = _texts(root)
+    # 名称需要转义，同一位置的气泡名称不重叠
+    assert "AI咨询<服务>" in texts and texts.count("高") == 1
+    labels = {node.text: float(node.get("y")) for node in root.iter(f"{SVG}text")}
+    assert labels["内容创作"] != labels["AI咨询<服务>"]
+    assert len(bubble_svg(points, "机会矩阵", "竞争程度", "市场需求")) < 8000
+
+
+def test_line_svg_widens_for_long_legend():
+    series = {"内容创作": [10, 40, 90], "AI教育培训": [5, 20, 35]}
+    root = _parse(line_svg(["1月", "2月", "3月"], series, "趋势", "月份", "热度"))
+    assert len(root.findall(f"{SVG}polyline")) == 2
+    assert int(root.get("width")) == WIDTH
+    # y轴刻度落在整数步长上并覆盖最大值
+    ticks = [int(text) for text in _texts(root) if re.fullmatch(r"\d+", text)]
+    assert max(ticks) >= 90 and ticks == sorted(ticks)
+    long_name = {"A very long translated niche name for the legend": [1, 2, 3]}
+    assert int(_parse(line_svg(["a", "b", "c"], long_name, "t", "x", "y")).get("width")) > WIDTH
+
+
+def test_radar_svg_clamps_values():
+    root = _parse(radar_svg(["技能", "兴趣", "时间", "投资"], [50, 150, -10, 100], "匹配度"))
+    shape = root.findall(f"{SVG}polygon")[-1]
+    points = [tuple(map(float, pair.split(","))) for pair in shape.get("points").split()]
+    rings = root.findall(f"{SVG}polygon")[3]
+    outer = [tuple(map(float, pair.split(","))) for pair in rings.get("points").split()]
+    # 超过上限的值画在最外圈，负值画在圆心
+    assert points[1] == outer[1] and points[3] == outer[3]
+    cx = float(root.get("width")) / 2
+    assert points[2][0] == round(cx, 1)
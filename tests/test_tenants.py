@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from catalog import compile_catalog
+from catalog_store import snapshot_tempfile, write_catalog_snapshot
+from data import AI_NICHES
+from export import export_recommendations
+from parallel import score_cohort
+from scoring import rank_niches, score_breakdown_batch, score_feasible_batch
+from tenants import TenantRegistry, apply_overlay, parse_overlay
+
+PROFILES = [
+    {"skills": ["写作能力", "编程基础"], "interests": ["视频制作", "有声书"],
+     "time_availability": "10-20小时", "investment_capacity": "1000元以下"},
+    {"skills": ["设计能力"], "interests": ["教育培训"], "investment_capacity": "5000-20000元"},
+]
+
+
+def _payload(make_niche):
+    first, second = list(AI_NICHES)[:2]
+    return {
+        "patches": {first: {"投资成本": "高", "收入潜力": "高"}, second: {"市场需求": "低"}},
+        "added": {"AI播客": make_niche(description="AI配音和有声书", 技能要求=["写作能力", "配音"])},
+    }
+
+
+def _recompiled(payload):
+    niches = {name: {**info, **payload["patches"].get(name, {})} for name, info in AI_NICHES.items()}
+    niches.update(payload["added"])
+    return compile_catalog(niches, version=1)
+
+
+def test_overlay_matches_recompile(catalog, make_niche):
+    payload = _payload(make_niche)
+    tenant = apply_overlay(catalog, parse_overlay("acme", payload))
+    full = _recompiled(payload)
+    assert tenant.names == full.names
+    assert tenant.overlay.rescored_rows.tolist() == [0]
+    for component, values in score_breakdown_batch(PROFILES, full).items():
+        assert np.allclose(score_breakdown_batch(PROFILES, tenant)[component], values)
+    _, tenant_totals, _, tenant_feasible = score_feasible_batch(PROFILES, tenant)
+    _, full_totals, _, full_feasible = score_feasible_batch(PROFILES, full)
+    assert np.array_equal(tenant_feasible, full_feasible)
+    assert np.allclose(tenant_totals, full_totals)
+    # 基础目录不受覆盖层影响
+    assert catalog.niches[catalog.names[0]]["投资成本"] == AI_NICHES[catalog.names[0]]["投资成本"]
+    assert "AI播客" not in catalog.niches
+
+
+def test_invalid_overlay(catalog, make_niche):
+    with pytest.raises(ValueError):
+        parse_overlay("../etc", {})
+    with pytest.raises(ValueError):
+        parse_overlay("acme", {"patches": {"内容创作": {"description": "改文本"}}})
+    with pytest.raises(ValueError):
+        parse_overlay("acme", {"patches": {"内容创作": {"投资成本": "很高"}}})
+    with pytest.raises(ValueError):
+        apply_overlay(catalog, parse_overlay("acme", {"patches": {"不存在": {"投资成本": "低"}}}))
+    with pytest.raises(ValueError):
+        apply_overlay(catalog, parse_overlay("acme", {"added": {"内容创作": make_niche()}}))
+
+
+def test_registry_reuses_and_reloads(catalog, make_niche, tmp_path):
+    registry = TenantRegistry(str(tmp_path))
+    path = tmp_path / "acme.json"
+    path.write_text(json.dumps(_payload(make_niche), ensure_ascii=False), encoding="utf-8")
+    assert registry.tenants() == ["acme"]
+    with pytest.raises(KeyError):
+        registry.catalog_for("other", catalog)
+    first = registry.catalog_for("acme", catalog)
+    assert registry.catalog_for("acme", catalog) is first
+    assert first.version != catalog.version
+    path.write_text(json.dumps({"patches": {"内容创作": {"市场需求": "低"}}}, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    second = registry.catalog_for("acme", catalog)
+    assert second is not first and "AI播客" not in second.niches
+
+
+def test_overlay_catalog_is_not_written_as_snapshot(catalog, make_niche, tmp_path):
+    tenant = apply_overlay(catalog, parse_overlay("acme", _payload(make_niche)))
+    with pytest.raises(TypeError):
+        write_catalog_snapshot(tenant, str(tmp_path / "tenant.snapshot"))
+    assert os.listdir(tmp_path) == []
+    with pytest.raises(TypeError):
+        snapshot_tempfile(tenant)
+
+
+def test_tenant_cohort_in_worker_processes(catalog, make_niche, tmp_path):
+    tenant = apply_overlay(catalog, parse_overlay("acme", _payload(make_niche)))
+    # 工作进程映射基础目录的快照，再叠加同一份覆盖层
+    rows, scores = score_cohort(PROFILES * 2, tenant, k=4, workers=2)
+    for user_profile, profile_rows, profile_scores in zip(PROFILES * 2, rows, scores):
+        served = [
+            (tenant.names[row], float(score))
+            for row, score in zip(profile_rows.tolist(), profile_scores.tolist()) if row >= 0
+        ]
+        assert served == rank_niches(user_profile, tenant)[:4]
+    path = str(tmp_path / "tenant.jsonl")
+    assert export_recommendations(PROFILES, path, catalog=tenant) == len(PROFILES)